@@ -0,0 +1,278 @@
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from typing import Any, Dict, List
+
+from backend.lazy import available, optional
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(__file__)
+
+# Views snapshotted from the VDP "hackudc" database (see denodo/elementExport.vql)
+DEFAULT_VIEWS = (
+    "barcelonarentdataset",
+    "booksdatasetbaseview",
+    "booksdatasetbaseview2",
+    "carsdatasetbaseview",
+    "laptopsdatasetbasicview",
+    "ratingsdatasetbaseview",
+    "stocksdatasetbaseview",
+    "usersdatasetbaseview",
+    "barcelonarentdataset_neighbourhood_price",
+    "barcelonarentdataset_neighbourhood_price_year",
+    "booksdatasetbaseview2_j_ratingsdatasetbaseview_j_usersdatasetbaseview",
+    "booksdatasetbaseview_j_booksdatasetbaseview2_j_ratingsdatasetbaseview_j_usersdatasetbaseview",
+    "carsdatasetbaseview_companynames_0_carsnames_0_horsepower_carsprices_0",
+    "carsdatasetbaseview_companynames_0_carsnames_0_horsepower_torque",
+    "carsdatasetbaseview_companynames_0_carsnames_0_horsepower_totalspeed_0_fueltypes_0",
+    "carsdatasetbaseview_performance0100kmh_0_ccbatterycapacity_0_totalspeed_0_engines",
+    "carsdatasetbaseview_weight_to_horsepower_ratio",
+    "laptopsdatasetbasicview_brand_name_price_ram_ram_type",
+    "laptopsdatasetbasicview_cpu_gpu_processor_price",
+    "stocksdatasetbaseview_index_date_open_high_low_close",
+)
+
+# Functions whose semantics are identical in VQL and DuckDB
+_SAFE_FUNCTIONS = {
+    "count",
+    "sum",
+    "avg",
+    "min",
+    "max",
+    "round",
+    "abs",
+    "upper",
+    "lower",
+    "coalesce",
+    "cast",
+}
+
+# Constructs that make a query unsafe to run locally (joins, subqueries,
+# set operations, VQL-only clauses, anything that writes)
+_UNSAFE_KEYWORDS = re.compile(
+    r"\b(join|union|intersect|minus|except|with|context|trace|into|insert|"
+    r"update|delete|create|drop|alter|call|exec|over|partition)\b",
+    re.IGNORECASE,
+)
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_FUNCTION_CALL = re.compile(r"\b([a-z_][a-z0-9_]*)\s*\(", re.IGNORECASE)
+_FROM_CLAUSE = re.compile(
+    r"\bfrom\s+((?:\"?[a-z0-9_]+\"?\.)?\"?([a-z0-9_]+)\"?)(?=\s|$)",
+    re.IGNORECASE,
+)
+
+
+class LocalAccelerator:
+    """Optional local query accelerator over snapshotted VDP views.
+
+    Views are snapshotted through the VDP RESTful web service into an
+    embedded DuckDB file (columnar), refreshed whenever the AI SDK metadata
+    is synced, and simple single-view VQL (select / filter / aggregate /
+    order / limit) is executed locally.  Anything that cannot be translated
+    safely returns None so the caller falls back to the AI SDK."""
+
+    def __init__(
+        self,
+        rest_url: str = os.environ.get(
+            "DENODO_REST_URL", "http://localhost:9090/denodo-restfulws/hackudc"
+        ),
+        db_file: str = os.environ.get(
+            "ACCELERATOR_DB_FILE", os.path.join(BASE_DIR, "accelerator.duckdb")
+        ),
+        views: tuple[str, ...] = DEFAULT_VIEWS,
+        auth_user: str = "admin",
+        auth_pass: str = "admin",
+        timeout: int = 120,
+    ):
+        self.enabled = (
+            # Optional dependency: the accelerator is disabled without it
+            available("duckdb")
+            and os.environ.get("LOCAL_ACCELERATOR", "0") == "1"
+        )
+        self.rest_url = rest_url
+        self.db_file = db_file
+        self.views = views
+        self.auth = (auth_user, auth_pass)
+        self.timeout = timeout
+        self._connection = None
+        self._tables: set[str] = set()
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+
+    # -----------------------------
+    # SNAPSHOT
+    # -----------------------------
+    def _fetch_view(self, view: str) -> List[Dict[str, Any]]:
+        import requests
+
+        response = requests.get(
+            f"{self.rest_url}/views/{view}",
+            params={"$format": "json"},
+            headers={"accept": "application/json"},
+            auth=self.auth,
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json().get("elements", [])
+
+    def refresh(self) -> None:
+        """Snapshot every view into a new DuckDB file and atomically swap it
+        in. Views that fail to download are skipped (queries on them fall
+        back to the AI SDK)."""
+        if not self.enabled or not self._refreshing.acquire(blocking=False):
+            return
+        try:
+            tmp_file = f"{self.db_file}.tmp"
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            tables = set()
+            duckdb = optional("duckdb")
+            with duckdb.connect(tmp_file) as connection:
+                for view in self.views:
+                    try:
+                        rows = self._fetch_view(view)
+                    except Exception as exc:
+                        logger.warning("[Accelerator] Skipping view %s: %s", view, exc)
+                        continue
+                    if not rows:
+                        continue
+                    with tempfile.NamedTemporaryFile(
+                        "w", suffix=".json", delete=False
+                    ) as fh:
+                        json.dump(rows, fh)
+                    try:
+                        connection.execute(
+                            f'CREATE TABLE "{view}" AS '
+                            "SELECT * FROM read_json_auto(?, format='array')",
+                            [fh.name],
+                        )
+                    finally:
+                        os.remove(fh.name)
+                    tables.add(view)
+
+            with self._lock:
+                if self._connection is not None:
+                    self._connection.close()
+                os.replace(tmp_file, self.db_file)
+                self._connection = duckdb.connect(self.db_file, read_only=True)
+                self._tables = tables
+            logger.info("[Accelerator] Snapshot refreshed: %d views.", len(tables))
+        except Exception as exc:
+            logger.error("[Accelerator] Snapshot refresh failed: %s", exc)
+        finally:
+            self._refreshing.release()
+
+    def refresh_background(self) -> None:
+        """Refresh the snapshot in a daemon thread."""
+        if self.enabled:
+            threading.Thread(target=self.refresh, daemon=True).start()
+
+    # -----------------------------
+    # VQL TRANSLATION
+    # -----------------------------
+    def translate(self, vql: str | None) -> str | None:
+        """Translate a generated VQL query into DuckDB SQL, or return None if
+        it is not a simple single-view query over a snapshotted view."""
+        if not vql:
+            return None
+        query = vql.strip().rstrip(";").strip()
+        without_literals = _STRING_LITERAL.sub("''", query)
+        if ";" in without_literals or not re.match(
+            r"select\b", without_literals, re.IGNORECASE
+        ):
+            return None
+        if len(re.findall(r"\bselect\b", without_literals, re.IGNORECASE)) != 1:
+            return None
+        if _UNSAFE_KEYWORDS.search(without_literals) or "," in _from_tail(
+            without_literals
+        ):
+            return None
+        for function in _FUNCTION_CALL.findall(without_literals):
+            if function.lower() not in _SAFE_FUNCTIONS:
+                return None
+
+        from_match = _FROM_CLAUSE.search(query)
+        if from_match is None or from_match.group(2).lower() not in self._tables:
+            return None
+
+        # Drop the database prefix (e.g. hackudc.view) and quote the table
+        return (
+            query[: from_match.start(1)]
+            + f'"{from_match.group(2).lower()}"'
+            + query[from_match.end(1) :]
+        )
+
+    # -----------------------------
+    # EXECUTION
+    # -----------------------------
+    def execute(
+        self, vql: str | None, max_rows: int | None = None
+    ) -> Dict[str, Any] | None:
+        """Run *vql* against the local snapshot, returning at most *max_rows*
+        rows like VDP's vql_execute_rows_limit. Returns a response shaped
+        like answerDataQuestion's, or None if the query cannot run locally."""
+        if not self.enabled or self._connection is None:
+            return None
+        sql = self.translate(vql)
+        if sql is None:
+            return None
+        if max_rows is not None:
+            # Outer LIMIT, so DuckDB stops early and keeps the query's order
+            sql = f"SELECT * FROM ({sql}) LIMIT {int(max_rows)}"
+        try:
+            with self._lock:
+                cursor = self._connection.cursor()
+            try:
+                cursor.execute(sql)
+                columns = [d[0] for d in cursor.description]
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+        except Exception as exc:
+            logger.info("[Accelerator] Local execution failed, falling back: %s", exc)
+            return None
+
+        return {
+            "answer": _markdown_table(columns, rows),
+            "vql": vql,
+            "execution_result": {
+                f"Row {i}": [
+                    {"columnName": column, "value": value}
+                    for column, value in zip(columns, row)
+                ]
+                for i, row in enumerate(rows, start=1)
+            },
+            "accelerated": True,
+        }
+
+
+def _from_tail(query: str) -> str:
+    """Text between FROM and the next clause, used to reject multi-table FROMs."""
+    match = re.search(
+        r"\bfrom\b(.*?)(\bwhere\b|\bgroup\b|\border\b|\bhaving\b|\blimit\b|\boffset\b|$)",
+        query,
+        re.IGNORECASE | re.DOTALL,
+    )
+    return match.group(1) if match else ""
+
+
+def _markdown_table(columns: List[str], rows: List[tuple]) -> str:
+    if not rows:
+        return "The query returned no rows."
+    lines = [
+        "| " + " | ".join(columns) + " |",
+        "|" + "|".join("---" for _ in columns) + "|",
+    ]
+    for row in rows:
+        lines.append(
+            "| " + " | ".join("" if v is None else str(v) for v in row) + " |"
+        )
+    return "\n".join(lines)
+
+
+# Shared per-process accelerator
+accelerator = LocalAccelerator()
@@ -0,0 +1,157 @@
+"""Database size and question-table scan times with answers inline vs. moved
+to answer_blob (migration m0006).
+
+Builds a scratch SQLite database of questions with generated multi-kilobyte
+markdown reports (a quarter of them repeating a small set of cached
+answers) and their search entries, measures it with the bodies inline,
+moves them out of line with backend.questions.blobs.move_answers, VACUUMs
+and measures again.  The FTS5 tables are listed too: question_fts is
+contentless (m0008), so the bodies are not kept a second time there.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.answer_blobs --questions 20000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlmodel import SQLModel
+
+from backend.db import create_db_engine
+from backend.lazy import available
+from backend.migrations import upgrade
+from backend.questions import blobs
+
+SCANS = {
+    "dashboard aggregate (full scan)": (
+        "SELECT model_llm, COUNT(*), AVG(time_out), SUM(used_tokens) "
+        "FROM question GROUP BY model_llm"
+    ),
+    "title LIKE (full scan)": (
+        "SELECT COUNT(*) FROM question WHERE title LIKE '%ventas%'"
+    ),
+    "history page (index + rows)": (
+        'SELECT id, title, folder_id, "like", model_llm, date_time FROM question '
+        "WHERE user_id = 7 ORDER BY date_time DESC LIMIT 50"
+    ),
+}
+
+WORDS = (
+    "ventas coche precio modelo región trimestre cliente margen stock tienda "
+    "eléctrico media total crecimiento análisis recomendación dato tabla"
+).split()
+
+
+def report(rng: random.Random) -> str:
+    """A markdown report like the ones the decision engine writes."""
+    lines = [
+        "## Resumen",
+        " ".join(rng.choices(WORDS, k=60)),
+        "",
+        "| modelo | ventas | precio |",
+        "|---|---|---|",
+    ]
+    for _ in range(rng.randint(20, 60)):
+        lines.append(
+            f"| {rng.choice(WORDS).upper()}-{rng.randint(1, 999)} "
+            f"| {rng.randint(10, 99999)} | {rng.uniform(9_000, 90_000):.2f} |"
+        )
+    for _ in range(rng.randint(3, 8)):
+        lines += [
+            "",
+            "### " + " ".join(rng.choices(WORDS, k=4)),
+            " ".join(rng.choices(WORDS, k=80)),
+        ]
+    return "\n".join(lines)
+
+
+def build(path: str, questions: int) -> None:
+    engine = create_db_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    upgrade(engine)
+    engine.dispose()
+
+    rng = random.Random(2026)
+    cached = [report(rng) for _ in range(50)]
+    start = datetime(2026, 1, 1)
+    connection = sqlite3.connect(path)
+    rows = (
+        (
+            f"Consulta {i} sobre {rng.choice(WORDS)}",
+            rng.choice(cached) if rng.random() < 0.25 else report(rng),
+            rng.randint(1, 150),
+            rng.uniform(0.5, 60),
+            rng.randint(100, 5000),
+            (start + timedelta(minutes=i)).isoformat(" "),
+            rng.choice(["gemma-3-27b-it", "gemini-2.5-flash"]),
+        )
+        for i in range(questions)
+    )
+    # Rows as written before m0006: body inline, answer_size NULL
+    connection.executemany(
+        "INSERT INTO question (title, answer, user_id, time_out, used_tokens, "
+        'date_time, model_llm, "like") VALUES (?, ?, ?, ?, ?, ?, ?, 1)',
+        rows,
+    )
+    connection.execute(
+        "INSERT INTO question_fts (rowid, title, answer, restrictions) "
+        "SELECT (user_id << 32) | id, title, answer, '' FROM question"
+    )
+    connection.commit()
+    connection.execute("VACUUM")
+    connection.close()
+
+
+def measure(path: str, label: str) -> None:
+    connection = sqlite3.connect(path)
+    page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+    print(f"\n{label}: {os.path.getsize(path) / 2**20:.1f} MiB")
+    try:
+        for name, pages in connection.execute(
+            "SELECT name, SUM(pgsize) / ? FROM dbstat "
+            "WHERE name IN ('question', 'answer_blob') OR name LIKE 'question_fts%' "
+            "GROUP BY name",
+            (page_size,),
+        ):
+            print(f"  {name:<34}{pages:>9} pages")
+    except sqlite3.OperationalError:
+        pass  # SQLite built without the dbstat table
+    for name, sql in SCANS.items():
+        connection.execute(sql).fetchall()  # warm the page cache
+        start = time.perf_counter()
+        for _ in range(10):
+            connection.execute(sql).fetchall()
+        elapsed_ms = (time.perf_counter() - start) / 10 * 1000
+        print(f"  {name:<34}{elapsed_ms:>9.2f} ms")
+    connection.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=20_000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="answer_blobs_"), "blobs.db")
+    build(path, args.questions)
+    measure(path, "Answers inline")
+
+    engine = create_db_engine(f"sqlite:///{path}")
+    with engine.begin() as connection:
+        blobs.move_answers(connection)
+    engine.dispose()
+    connection = sqlite3.connect(path)
+    distinct = connection.execute("SELECT COUNT(*) FROM answer_blob").fetchone()[0]
+    connection.execute("VACUUM")
+    connection.close()
+    codec = "zstd" if available("zstandard") else "zlib"
+    measure(path, f"Answers in answer_blob ({distinct} distinct bodies, {codec})")
+
+
+if __name__ == "__main__":
+    main()
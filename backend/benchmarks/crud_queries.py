@@ -0,0 +1,128 @@
+"""SQL statements issued per mutating /questions endpoint.
+
+Calls the route functions directly (authentication excluded) against a
+scratch SQLite database, serializes the result with the route's response
+model like FastAPI does, and counts the statements sent to the database.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.crud_queries
+"""
+
+import asyncio
+import os
+import tempfile
+
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.db import create_async_db_engine, create_db_engine
+from backend.migrations import upgrade
+from backend.questions import routes
+from backend.questions.schemas import (
+    FolderBulkIds,
+    FolderCreate,
+    FolderUpdate,
+    QuestionBulkIds,
+    QuestionBulkLike,
+    QuestionBulkMove,
+    QuestionCreate,
+    QuestionMoveToFolder,
+)
+from backend.users.models import User
+
+RESPONSE_MODELS = {
+    route.endpoint: route.response_model for route in routes.router.routes
+}
+
+
+def main() -> None:
+    path = os.path.join(tempfile.mkdtemp(prefix="crud_bench_"), "crud.db")
+    engine = create_db_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    upgrade(engine)
+    async_engine = create_async_db_engine(f"sqlite+aiosqlite:///{path}")
+
+    statements = []
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with Session(engine) as session:
+        user = User(username="bench", email="bench@example.com", hashed_password="x")
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+
+    state = {}
+
+    async def run(endpoint, *args):
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            result = await endpoint(*args, session=session, current_user=user)
+            response_model = RESPONSE_MODELS.get(endpoint)
+            if response_model is not None:
+                response_model.model_validate(result, from_attributes=True)
+        return result
+
+    def call(endpoint, *args):
+        """Run one request's worth of work in a fresh session, configured
+        like backend.db.get_async_session."""
+        return asyncio.run(run(endpoint, *args))
+
+    # Rows for the bulk steps, created up front (not counted)
+    state["bulk_questions"] = [
+        call(routes.create, QuestionCreate(title=f"Question {i}", answer="A")).id
+        for i in range(3)
+    ]
+    state["bulk_folders"] = [
+        call(routes.create_folder_route, FolderCreate(name=f"Bulk {i}")).id
+        for i in range(3)
+    ]
+
+    steps = [
+        ("POST   /folders", lambda: state.update(
+            folder=call(routes.create_folder_route, FolderCreate(name="F")).id)),
+        ("PATCH  /folders/{id}", lambda: call(
+            routes.rename_folder, state["folder"], FolderUpdate(name="G"))),
+        ("POST   /questions/", lambda: state.update(question=call(
+            routes.create, QuestionCreate(title="Cheapest car", answer="A")).id)),
+        ("PATCH  /{id}/folder", lambda: call(
+            routes.move_to_folder, state["question"],
+            QuestionMoveToFolder(folder_id=state["folder"]))),
+        ("PATCH  /{id}/like", lambda: call(
+            routes.set_like, state["question"], False)),
+        ("DELETE /{id}", lambda: call(routes.remove_question, state["question"])),
+        ("DELETE /folders/{id}", lambda: call(routes.remove_folder, state["folder"])),
+        ("POST   /bulk/move", lambda: call(
+            routes.bulk_move_to_folder,
+            QuestionBulkMove(
+                question_ids=state["bulk_questions"],
+                folder_id=state["bulk_folders"][0],
+            ))),
+        ("POST   /bulk/like", lambda: call(
+            routes.bulk_set_like,
+            QuestionBulkLike(question_ids=state["bulk_questions"], like=False))),
+        ("POST   /bulk/delete", lambda: call(
+            routes.bulk_remove_questions,
+            QuestionBulkIds(question_ids=state["bulk_questions"]))),
+        ("POST   /folders/bulk/delete", lambda: call(
+            routes.bulk_remove_folders,
+            FolderBulkIds(folder_ids=state["bulk_folders"]))),
+    ]
+
+    total = 0
+    for name, step in steps:
+        statements.clear()
+        step()
+        # BEGIN/COMMIT are implicit on SQLite and not counted by the event
+        total += len(statements)
+        print(f"{name:<28} {len(statements):>2} statements")
+        for statement in statements:
+            print(f"    {' '.join(statement.split())[:100]}")
+    print(f"{'total':<28} {total:>2} statements")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Query plans of the hot history/folder/dashboard queries, before and after
+the schema migrations, on the sqlMockDataScript data scaled up.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.query_plans --scale 2000
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from sqlmodel import SQLModel
+
+from backend.db import BASE_DIR, create_db_engine
+from backend.migrations import upgrade
+
+MOCK_DATA_SCRIPT = os.path.join(BASE_DIR, "sqlMockDataScript")
+
+HOT_QUERIES = {
+    "get_questions_by_user": (
+        "SELECT * FROM question WHERE user_id = 42 ORDER BY date_time DESC"
+    ),
+    "get_folders_by_user": "SELECT * FROM folder WHERE user_id = 42",
+    "delete_folder (un-assign)": "SELECT id FROM question WHERE folder_id = 7",
+    "grafana time range": (
+        "SELECT time_out, used_tokens FROM question "
+        "WHERE date_time >= datetime('now', '-1 day') ORDER BY date_time DESC LIMIT 100"
+    ),
+}
+
+
+def build(path: str, scale: int) -> None:
+    engine = create_db_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    engine.dispose()
+
+    connection = sqlite3.connect(path)
+    # Start from the pre-migration schema: drop the indexes added by migrations
+    for (name,) in connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' "
+        "AND (name LIKE 'ix_question_%' OR name LIKE 'ix_folder_%')"
+    ).fetchall():
+        connection.execute(f'DROP INDEX "{name}"')
+    with open(MOCK_DATA_SCRIPT, encoding="utf-8") as fh:
+        connection.executescript(fh.read())
+    # Scale the ~300 mock questions up, spreading them over users and time
+    connection.execute(
+        f"""
+        INSERT INTO question (title, answer, user_id, folder_id, restrictions,
+                              time_out, used_tokens, date_time, model_llm, "like")
+        WITH RECURSIVE cnt(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM cnt WHERE x < {scale})
+        SELECT q.title, q.answer, (ABS(RANDOM()) % 150) + 1, q.folder_id, q.restrictions,
+               q.time_out, q.used_tokens,
+               DATETIME(q.date_time, '-' || (ABS(RANDOM()) % 365) || ' days'),
+               q.model_llm, q."like"
+        FROM question q, cnt
+        """
+    )
+    connection.commit()
+    connection.close()
+
+
+def explain(path: str) -> None:
+    connection = sqlite3.connect(path)
+    for label, sql in HOT_QUERIES.items():
+        plan = " / ".join(
+            row[3] for row in connection.execute(f"EXPLAIN QUERY PLAN {sql}")
+        )
+        start = time.perf_counter()
+        for _ in range(20):
+            connection.execute(sql).fetchall()
+        elapsed_ms = (time.perf_counter() - start) / 20 * 1000
+        print(f"  {label:<28}{elapsed_ms:>9.2f} ms   {plan}")
+    connection.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=2000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="query_plans_"), "plans.db")
+    build(path, args.scale)
+    count = sqlite3.connect(path).execute("SELECT COUNT(*) FROM question").fetchone()
+    print(f"{count[0]} questions\n\nBefore migrations:")
+    explain(path)
+
+    engine = create_db_engine(f"sqlite:///{path}")
+    upgrade(engine)
+    engine.dispose()
+    print("\nAfter migrations:")
+    explain(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Latency of /questions/search (FTS5) over a large synthetic history.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.search --rows 1000000
+"""
+
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from sqlmodel import Session, SQLModel
+
+from backend.db import create_db_engine
+from backend.migrations import upgrade
+from backend.questions.search import search_questions
+
+# Small domain vocabulary plus a long tail of rarer words, Zipf-distributed
+# like natural-language text.
+DOMAIN_WORDS = (
+    "car electric petrol hybrid price cheapest best fastest laptop ram gpu cpu "
+    "rent barcelona neighbourhood district average book author rating stock "
+    "index open close high low horsepower torque speed battery brand model "
+    "budget family city year trend comparison ranking recommendation euros"
+).split()
+WORDS = DOMAIN_WORDS + [f"term{i}" for i in range(20_000)]
+CUM_WEIGHTS = list(itertools.accumulate(1 / rank for rank in range(1, len(WORDS) + 1)))
+
+
+def build(path: str, rows: int, users: int) -> None:
+    engine = create_db_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    upgrade(engine)
+    engine.dispose()
+
+    connection = sqlite3.connect(path)
+    rng = random.Random(2026)
+    batch = []
+    for i in range(1, rows + 1):
+        user_id = rng.randint(1, users)
+        title = " ".join(rng.choices(WORDS, cum_weights=CUM_WEIGHTS, k=8))
+        answer = " ".join(rng.choices(WORDS, cum_weights=CUM_WEIGHTS, k=120))
+        batch.append((i, title, answer, user_id))
+        if len(batch) == 10_000 or i == rows:
+            connection.executemany(
+                "INSERT INTO question (id, title, answer, user_id, date_time, \"like\") "
+                "VALUES (?, ?, ?, ?, datetime('now'), 1)",
+                batch,
+            )
+            connection.executemany(
+                "INSERT INTO question_fts (rowid, title, answer, restrictions) "
+                "VALUES ((? << 32) | ?, ?, ?, '')",
+                [(u, i, t, a) for i, t, a, u in batch],
+            )
+            connection.commit()
+            batch.clear()
+    connection.execute("INSERT INTO question_fts (question_fts) VALUES ('optimize')")
+    connection.commit()
+    connection.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="search_bench_"), "search.db")
+    start = time.perf_counter()
+    build(path, args.rows, args.users)
+    print(f"Indexed {args.rows} questions in {time.perf_counter() - start:.1f} s")
+
+    engine = create_db_engine(f"sqlite:///{path}")
+    rng = random.Random(7)
+    latencies = []
+    with Session(engine) as session:
+        for _ in range(args.queries):
+            query = " ".join(rng.choices(WORDS, cum_weights=CUM_WEIGHTS, k=rng.randint(1, 3)))
+            start = time.perf_counter()
+            search_questions(session, rng.randint(1, args.users), query, 21, 0)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    print(
+        f"search: p50 {statistics.median(latencies):.2f} ms, "
+        f"p95 {statistics.quantiles(latencies, n=20)[-1]:.2f} ms, "
+        f"max {max(latencies):.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
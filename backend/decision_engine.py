@@ -1,12 +1,27 @@
+import hashlib
 import logging
 import os
+import re
 import threading
-import requests
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any
 
+from backend.accelerator import accelerator
+from backend.shared_cache import CacheError, shared_cache
+from backend.tracing import annotate, in_context, outgoing_headers, span, traced
+
 logger = logging.getLogger(__name__)
 
+# Requests per minute to the AI SDK across all workers sharing CACHE_URL
+# (0: no limit).  A call over the budget waits for the next minute, for at
+# most AI_SDK_RATE_LIMIT_WAIT_SECONDS, then fails.
+AI_SDK_RATE_LIMIT_RPM = int(os.environ.get("AI_SDK_RATE_LIMIT_RPM", "0"))
+AI_SDK_RATE_LIMIT_WAIT_SECONDS = float(
+    os.environ.get("AI_SDK_RATE_LIMIT_WAIT_SECONDS", "30")
+)
+VQL_MEMO_TTL_SECONDS = float(os.environ.get("VQL_MEMO_TTL_SECONDS", "86400"))
+
 
 class GenericDecisionEngine:
 
@@ -61,25 +76,61 @@ class GenericDecisionEngine:
         self.backoff_factor = backoff_factor
         self.headers = {"accept": "application/json"}
 
+    # -----------------------------
+    # AI SDK REQUEST BUDGET
+    # -----------------------------
+    def _acquire_budget(self) -> None:
+        """Count one AI SDK request against the fleet-wide per-minute budget
+        (a counter per minute in the shared cache), waiting for the next
+        minute when it is spent.  Without a reachable cache the request is
+        let through."""
+        if AI_SDK_RATE_LIMIT_RPM <= 0:
+            return
+        deadline = time.monotonic() + AI_SDK_RATE_LIMIT_WAIT_SECONDS
+        while True:
+            now = time.time()
+            window = int(now // 60)
+            try:
+                used = shared_cache.incr(f"ai_sdk:requests:{window}", ttl=120)
+            except CacheError as exc:
+                logger.warning("[Decision Engine] Request budget unavailable: %s", exc)
+                return
+            if used <= AI_SDK_RATE_LIMIT_RPM:
+                return
+            wait = (window + 1) * 60 - now
+            if time.monotonic() + wait > deadline:
+                raise RuntimeError(
+                    f"AI SDK request budget of {AI_SDK_RATE_LIMIT_RPM}/min spent, "
+                    "try again in a minute"
+                )
+            with span("ai_sdk.budget_wait", seconds=round(wait, 3)):
+                time.sleep(wait)
+
     # -----------------------------
     # INTERNAL SAFE REQUEST (GET)
     # -----------------------------
+    @traced("ai_sdk.request")
     def _get_with_retry(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        import requests  # deferred: not needed to start serving (backend/lazy.py)
 
         attempt = 0
         delay = 1
 
+        annotate(endpoint=endpoint)
         while attempt < self.max_retries:
+            self._acquire_budget()
             try:
-                response = requests.get(
-                    f"{self.base_url}/{endpoint}",
-                    params=params,
-                    headers=self.headers,
-                    auth=self.auth,
-                    timeout=self.timeout,
-                )
-
-                response.raise_for_status()
+                with span("ai_sdk.attempt", attempt=attempt + 1):
+                    response = requests.get(
+                        f"{self.base_url}/{endpoint}",
+                        params=params,
+                        # X-Request-ID / traceparent of the API request
+                        headers={**self.headers, **outgoing_headers()},
+                        auth=self.auth,
+                        timeout=self.timeout,
+                    )
+                    annotate(status_code=response.status_code)
+                    response.raise_for_status()
                 data = response.json()
 
                 if not isinstance(data, dict):
@@ -91,7 +142,8 @@ class GenericDecisionEngine:
                 attempt += 1
                 if attempt >= self.max_retries:
                     raise RuntimeError("AI SDK unreachable after multiple retries")
-                time.sleep(delay)
+                with span("ai_sdk.backoff", seconds=delay):
+                    time.sleep(delay)
                 delay *= self.backoff_factor
 
             except requests.exceptions.HTTPError as e:
@@ -124,6 +176,7 @@ class GenericDecisionEngine:
 
     def load_metadata(self) -> None:
         """Call /getMetadata at startup. Retries every 5 seconds on failure."""
+        import requests
         logger.info("[Decision Engine] Starting metadata load from AI SDK …")
         while True:
             try:
@@ -154,6 +207,7 @@ class GenericDecisionEngine:
                         "[Decision Engine] Metadata already up-to-date "
                         "(204 No Content). Done."
                     )
+                    accelerator.refresh_background()
                     return
 
                 # Non-empty JSON response with new metadata
@@ -175,6 +229,8 @@ class GenericDecisionEngine:
                         else type(data).__name__
                     ),
                 )
+                # Metadata synced: refresh the local view snapshots too
+                accelerator.refresh_background()
                 return
             except requests.exceptions.ConnectionError:
                 logger.warning(
@@ -199,8 +255,12 @@ class GenericDecisionEngine:
     # -----------------------------
     # PHASE 1 — METADATA DISCOVERY
     # -----------------------------
+    @traced("phase.metadata")
     def _discover_relevant_schema(
-        self, user_question: str, datasets: list[str] | None = None
+        self,
+        user_question: str,
+        datasets: list[str] | None = None,
+        llm_model: str | None = None,
     ) -> Dict[str, Any]:
 
         # If datasets are specified, enrich the question so the AI SDK
@@ -214,29 +274,110 @@ class GenericDecisionEngine:
                 f"Do not include metadata from any other sources."
             )
 
-        params = {**self.DEFAULT_PARAMS, "question": scoped_question}
+        params = self._params(llm_model, question=scoped_question)
 
         return self._get_with_retry("answerMetadataQuestion", params)
 
     # ----------------------------------------
     # PHASE 2 — DATA RETRIEVAL (raw query)
     # ----------------------------------------
+    FOLLOW_UP_DATA_TEMPLATE = (
+        "This is a follow-up to a previous question.\n\n"
+        'PREVIOUS QUESTION:\n"{previous_question}"\n\n'
+        "VQL QUERY USED FOR THE PREVIOUS QUESTION:\n"
+        "```sql\n{previous_vql}\n```\n\n"
+        "SUMMARY OF THE PREVIOUS RESULT:\n"
+        "```\n{previous_summary}\n```\n\n"
+        'FOLLOW-UP QUESTION:\n"{user_question}"\n\n'
+        "Answer the follow-up question, adapting the previous query where "
+        "appropriate (e.g. adding filters or changing the aggregation)."
+    )
+
+    # VQL generated for previously asked questions, keyed by normalised
+    # question text.  Kept in the shared cache (all workers, see
+    # backend/shared_cache.py) for VQL_MEMO_TTL_SECONDS; replayed against
+    # the local accelerator when the same question is asked again.
+
+    @staticmethod
+    def _normalize_question(user_question: str) -> str:
+        return re.sub(r"\s+", " ", user_question.strip().lower()).rstrip(" ?.!")
+
+    def _vql_memo_key(self, user_question: str) -> str:
+        normalized = self._normalize_question(user_question)
+        return "vql:" + hashlib.sha256(normalized.encode()).hexdigest()
+
+    def _remember_vql(self, user_question: str, vql: str | None) -> None:
+        if not vql or accelerator.translate(vql) is None:
+            return
+        try:
+            shared_cache.set(
+                self._vql_memo_key(user_question), vql, ttl=VQL_MEMO_TTL_SECONDS
+            )
+        except CacheError as exc:
+            logger.warning("[Decision Engine] Could not memoize VQL: %s", exc)
+
+    def _fetch_local_data(self, user_question: str) -> Dict[str, Any] | None:
+        """Answer the data phase from the local accelerator if the VQL for
+        this question is known and can be executed locally."""
+        if not accelerator.enabled:
+            return None
+        try:
+            with span("cache.vql_memo"):
+                vql = shared_cache.get(self._vql_memo_key(user_question))
+                annotate(hit=vql is not None)
+        except CacheError as exc:
+            logger.warning("[Decision Engine] VQL memo unavailable: %s", exc)
+            return None
+        if vql is None:
+            return None
+        response = accelerator.execute(
+            vql, max_rows=self.DATA_QUESTION_EXTRA_PARAMS["vql_execute_rows_limit"]
+        )
+        if response is not None:
+            logger.info("[Decision Engine] Data phase served by local accelerator.")
+        return response
+
+    @traced("phase.data")
     def _fetch_raw_data(
         self,
         user_question: str,
+        follow_up: Dict[str, Any] | None = None,
+        llm_model: str | None = None,
     ) -> Dict[str, Any]:
         """Send the user's question *as-is* to answerDataQuestion so the
         AI SDK focuses exclusively on generating the correct VQL, executing
         it and returning the raw data.  No formatting instructions are
-        injected here — that keeps the VQL generation clean."""
+        injected here — that keeps the VQL generation clean.
+
+        If *follow_up* (previous question, VQL and result summary of a
+        conversation) is provided, only that delta context is prepended.
+
+        When the local accelerator is enabled and the VQL previously generated
+        for the same question can run on the local snapshot, the AI SDK call
+        is skipped entirely."""
+
+        question = user_question
+        if follow_up:
+            question = self.FOLLOW_UP_DATA_TEMPLATE.format(
+                previous_question=follow_up.get("previous_question") or "N/A",
+                previous_vql=follow_up.get("previous_vql") or "N/A",
+                previous_summary=follow_up.get("previous_summary") or "N/A",
+                user_question=user_question,
+            )
 
-        params = {
-            **self.DEFAULT_PARAMS,
-            **self.DATA_QUESTION_EXTRA_PARAMS,
-            "question": user_question,
-        }
+        if not follow_up:
+            local_response = self._fetch_local_data(user_question)
+            if local_response is not None:
+                return local_response
 
-        return self._get_with_retry("answerDataQuestion", params)
+        params = self._params(
+            llm_model, **self.DATA_QUESTION_EXTRA_PARAMS, question=question
+        )
+
+        response = self._get_with_retry("answerDataQuestion", params)
+        if not follow_up and accelerator.enabled:
+            self._remember_vql(user_question, response.get("vql"))
+        return response
 
     # ----------------------------------------
     # PHASE 3 — ANALYTICAL REPORT GENERATION
@@ -321,13 +462,141 @@ class GenericDecisionEngine:
         "interests."
     )
 
+    # Appended when the caller forces a report language (e.g. re-rendering a
+    # stored answer for a different audience)
+    _LANGUAGE_OVERRIDE_INSTRUCTION = (
+        "\nLANGUAGE OVERRIDE: Ignore the language of the user question and "
+        "write the ENTIRE report — every heading, table header and sentence — "
+        "in {language}.\n"
+    )
+
+    # ----------------------------------------
+    # PHASE 3 (large results) — MAP-REDUCE
+    # ----------------------------------------
+    # Raw data above REPORT_CHUNK_CHARS is split into partitions that are
+    # summarised concurrently (map); the partial summaries then replace the
+    # raw data in the report prompt (reduce).
+    REPORT_CHUNK_CHARS = int(os.environ.get("REPORT_CHUNK_CHARS", "12000"))
+    REPORT_MAP_WORKERS = int(os.environ.get("REPORT_MAP_WORKERS", "4"))
+
+    PARTITION_SUMMARY_TEMPLATE = (
+        "You are a senior data analyst. The result of a database query was too "
+        "large to analyse at once, so it was split into {partition_count} "
+        "partitions. Below is partition {partition_number} of "
+        "{partition_count}.\n\n"
+        'USER QUESTION:\n"{user_question}"\n\n'
+        "DATA PARTITION:\n"
+        "```\n{partition}\n```\n\n"
+        "Summarise ONLY this partition for a later report: row count, the "
+        "rows most relevant to the question (keep them as a compact Markdown "
+        "table), minimums, maximums, totals/averages of the key numeric "
+        "columns, and any outliers. Keep every figure exact, do NOT invent "
+        "data, and do NOT write a full report — at most ~300 words."
+    )
+
     # DeepThink data and report templates are defined below _generate_report
 
+    def _partition_raw_data(self, raw_answer: str) -> list[str]:
+        """Split raw data into line-aligned chunks of ~REPORT_CHUNK_CHARS.
+        If the data is a Markdown table, its header is repeated in every
+        chunk so each partition stays self-describing."""
+        lines = raw_answer.splitlines()
+        header: list[str] = []
+        if (
+            len(lines) > 2
+            and lines[0].lstrip().startswith("|")
+            and "-" in lines[1]
+            and set(lines[1].replace("|", "").strip()) <= set("-: ")
+        ):
+            header, lines = lines[:2], lines[2:]
+        header_len = sum(len(line) + 1 for line in header)
+
+        partitions: list[str] = []
+        current: list[str] = []
+        current_len = header_len
+        for line in lines:
+            if current and current_len + len(line) + 1 > self.REPORT_CHUNK_CHARS:
+                partitions.append("\n".join(header + current))
+                current, current_len = [], header_len
+            current.append(line)
+            current_len += len(line) + 1
+        if current:
+            partitions.append("\n".join(header + current))
+        return partitions
+
+    @traced("report.summarize_partition")
+    def _summarize_partition(
+        self,
+        user_question: str,
+        partition: str,
+        partition_number: int,
+        partition_count: int,
+        llm_model: str | None = None,
+    ) -> str:
+        prompt = self.PARTITION_SUMMARY_TEMPLATE.format(
+            user_question=user_question,
+            partition=partition,
+            partition_number=partition_number,
+            partition_count=partition_count,
+        )
+        params = self._params(llm_model, question=prompt)
+        return self._get_with_retry("answerMetadataQuestion", params).get("answer", "")
+
+    @traced("report.condense")
+    def _condense_raw_data(
+        self,
+        user_question: str,
+        raw_data_response: Dict[str, Any],
+        llm_model: str | None = None,
+    ) -> Dict[str, Any]:
+        """Return *raw_data_response* unchanged if its answer fits in one
+        report prompt; otherwise map-reduce it into partition summaries."""
+        raw_answer = raw_data_response.get("answer", str(raw_data_response))
+        if len(raw_answer) <= self.REPORT_CHUNK_CHARS:
+            return raw_data_response
+
+        partitions = self._partition_raw_data(raw_answer)
+        count = len(partitions)
+        logger.info(
+            "[Decision Engine] Raw data too large (%d chars) — summarising %d "
+            "partitions …",
+            len(raw_answer),
+            count,
+        )
+        with ThreadPoolExecutor(
+            max_workers=min(self.REPORT_MAP_WORKERS, count)
+        ) as executor:
+            summaries = list(
+                executor.map(
+                    in_context(
+                        lambda item: self._summarize_partition(
+                            user_question, item[1], item[0], count, llm_model
+                        )
+                    ),
+                    enumerate(partitions, start=1),
+                )
+            )
+
+        merged = "\n\n".join(
+            f"### Partition {number}/{count}\n{summary}"
+            for number, summary in enumerate(summaries, start=1)
+        )
+        return {
+            **raw_data_response,
+            "answer": (
+                f"The full result ({len(raw_answer)} characters) was too large "
+                f"and is given as {count} partition summaries.\n\n{merged}"
+            ),
+        }
+
+    @traced("phase.report")
     def _generate_report(
         self,
         user_question: str,
         raw_data_response: Dict[str, Any],
         user_profile: Dict[str, Any] | None = None,
+        language: str | None = None,
+        llm_model: str | None = None,
     ) -> Dict[str, Any]:
         """Take the raw data returned by answerDataQuestion and ask the LLM
         (via answerMetadataQuestion, which does NOT execute VQL) to format
@@ -335,8 +604,13 @@ class GenericDecisionEngine:
         involved in this call, the LLM can focus 100 % on formatting.
 
         If *user_profile* is provided it is injected into the prompt so the
-        report is personalised for the user."""
+        report is personalised for the user.  If *language* is provided the
+        report is written in that language instead of the question's.
+        Results too large for a single prompt are map-reduced first."""
 
+        raw_data_response = self._condense_raw_data(
+            user_question, raw_data_response, llm_model
+        )
         raw_answer = raw_data_response.get("answer", str(raw_data_response))
         vql = raw_data_response.get("vql", "N/A")
 
@@ -360,8 +634,12 @@ class GenericDecisionEngine:
             user_profile_block=user_profile_block,
             personalisation_instruction=personalisation_instruction,
         )
+        if language:
+            report_prompt += self._LANGUAGE_OVERRIDE_INSTRUCTION.format(
+                language=language
+            )
 
-        params = {**self.DEFAULT_PARAMS, "question": report_prompt}
+        params = self._params(llm_model, question=report_prompt)
 
         return self._get_with_retry("answerMetadataQuestion", params)
 
@@ -387,13 +665,31 @@ class GenericDecisionEngine:
         "retrieval, not formatting."
     )
 
+    # The second data pass only needs to know what the first one found: its
+    # answer is cut to this many characters (whole lines) in the prompt.
+    DEEPTHINK_CONTEXT_CHARS = int(os.environ.get("DEEPTHINK_CONTEXT_CHARS", "4000"))
+
+    def _deepthink_context(self, raw_answer: str) -> str:
+        if len(raw_answer) <= self.DEEPTHINK_CONTEXT_CHARS:
+            return raw_answer
+        cut = raw_answer.rfind("\n", 0, self.DEEPTHINK_CONTEXT_CHARS)
+        if cut <= 0:
+            cut = self.DEEPTHINK_CONTEXT_CHARS
+        return (
+            f"{raw_answer[:cut].rstrip()}\n"
+            f"… ({len(raw_answer) - cut} more characters not shown)"
+        )
+
+    @traced("phase.deepthink_data")
     def _fetch_deepthink_data(
         self,
         user_question: str,
         first_raw_data_response: Dict[str, Any],
+        llm_model: str | None = None,
     ) -> Dict[str, Any]:
         """DeepThink second data pass: ask answerDataQuestion for deeper,
-        complementary data based on the first result."""
+        complementary data based on the first result (capped, see
+        DEEPTHINK_CONTEXT_CHARS)."""
 
         first_raw_answer = first_raw_data_response.get(
             "answer", str(first_raw_data_response)
@@ -401,14 +697,12 @@ class GenericDecisionEngine:
 
         deepthink_prompt = self.DEEPTHINK_DATA_TEMPLATE.format(
             user_question=user_question,
-            first_raw_data=first_raw_answer,
+            first_raw_data=self._deepthink_context(first_raw_answer),
         )
 
-        params = {
-            **self.DEFAULT_PARAMS,
-            **self.DATA_QUESTION_EXTRA_PARAMS,
-            "question": deepthink_prompt,
-        }
+        params = self._params(
+            llm_model, **self.DATA_QUESTION_EXTRA_PARAMS, question=deepthink_prompt
+        )
 
         return self._get_with_retry("answerDataQuestion", params)
 
@@ -484,16 +778,25 @@ class GenericDecisionEngine:
         "language of the user question.\n"
     )
 
+    @traced("phase.deepthink_report")
     def _generate_deepthink_report(
         self,
         user_question: str,
         raw_data_response_1: Dict[str, Any],
         raw_data_response_2: Dict[str, Any],
         user_profile: Dict[str, Any] | None = None,
+        language: str | None = None,
+        llm_model: str | None = None,
     ) -> Dict[str, Any]:
         """Generate a comprehensive report that integrates both data fetches
         into a single, deep analytical report via answerMetadataQuestion."""
 
+        raw_data_response_1 = self._condense_raw_data(
+            user_question, raw_data_response_1, llm_model
+        )
+        raw_data_response_2 = self._condense_raw_data(
+            user_question, raw_data_response_2, llm_model
+        )
         raw_answer_1 = raw_data_response_1.get("answer", str(raw_data_response_1))
         vql_1 = raw_data_response_1.get("vql", "N/A")
         raw_answer_2 = raw_data_response_2.get("answer", str(raw_data_response_2))
@@ -521,11 +824,38 @@ class GenericDecisionEngine:
             user_profile_block=user_profile_block,
             personalisation_instruction=personalisation_instruction,
         )
+        if language:
+            report_prompt += self._LANGUAGE_OVERRIDE_INSTRUCTION.format(
+                language=language
+            )
 
-        params = {**self.DEFAULT_PARAMS, "question": report_prompt}
+        params = self._params(llm_model, question=report_prompt)
 
         return self._get_with_retry("answerMetadataQuestion", params)
 
+    # ----------------------------------------
+    # LLM MODEL SELECTION
+    # ----------------------------------------
+    def _resolve_llm_model(self, llm_model: str | None) -> str:
+        """Return the model to use for a request, falling back to the default.
+        Raises ValueError if the requested model is not available."""
+        if llm_model is None:
+            return self.DEFAULT_PARAMS["llm_model"]
+        if llm_model not in self.AVAILABLE_MODELS:
+            raise ValueError(
+                f"Invalid LLM model. Available models: {', '.join(self.AVAILABLE_MODELS)}"
+            )
+        return llm_model
+
+    def _params(self, llm_model: str | None, **params) -> Dict[str, Any]:
+        """DEFAULT_PARAMS with *params* and, if given, the request's model.
+        Every phase takes the model as an argument: the engine is shared by
+        concurrent requests, so it is never stored on the engine itself."""
+        merged = {**self.DEFAULT_PARAMS, **params}
+        if llm_model is not None:
+            merged["llm_model"] = llm_model
+        return merged
+
     # -----------------------------
     # PUBLIC: METADATA DISCOVERY
     # -----------------------------
@@ -558,6 +888,7 @@ class GenericDecisionEngine:
     # -----------------------------
     # PUBLIC: FULL ANSWER
     # -----------------------------
+    @traced("engine.answer")
     def answer(
         self,
         user_question: str,
@@ -565,30 +896,27 @@ class GenericDecisionEngine:
         llm_model: str | None = None,
         user_profile: Dict[str, Any] | None = None,
         deepthink: bool = False,
+        follow_up: Dict[str, Any] | None = None,
     ) -> Dict[str, Any]:
         """If discovered_schema is provided, skip the metadata phase and go
         straight to execution. Otherwise run both phases as before.
         If llm_model is provided, use it instead of the default.
         If user_profile is provided, personalise the report for the user.
-        If deepthink is True, run an extra refinement iteration on the report."""
+        If deepthink is True, run an extra refinement iteration on the report.
+        If follow_up is provided (conversation mode), the previous turn's
+        question, VQL and result summary are sent along with the question."""
 
         # Use provided llm_model or fallback to default
-        if llm_model is None:
-            llm_model = self.DEFAULT_PARAMS["llm_model"]
-        elif llm_model not in self.AVAILABLE_MODELS:
-            return {
-                "status": "error",
-                "message": f"Invalid LLM model. Available models: {', '.join(self.AVAILABLE_MODELS)}",
-            }
-
-        # Create modified params with the selected llm_model
-        modified_params = {**self.DEFAULT_PARAMS, "llm_model": llm_model}
-        original_params = self.DEFAULT_PARAMS.copy()
-        self.__class__.DEFAULT_PARAMS = modified_params
+        try:
+            llm_model = self._resolve_llm_model(llm_model)
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
 
         try:
             if discovered_schema is None:
-                metadata_response = self._discover_relevant_schema(user_question)
+                metadata_response = self._discover_relevant_schema(
+                    user_question, llm_model=llm_model
+                )
                 discovered_schema = metadata_response.get("answer", "")
 
                 if not discovered_schema:
@@ -597,7 +925,17 @@ class GenericDecisionEngine:
                 metadata_response = {"answer": discovered_schema}
 
             # Phase 2 — retrieve raw data (clean question, no formatting noise)
-            raw_data_response = self._fetch_raw_data(user_question)
+            raw_data_response = self._fetch_raw_data(
+                user_question, follow_up=follow_up, llm_model=llm_model
+            )
+
+            # The report needs the previous question to make sense of
+            # terse follow-ups such as "and only electric cars?"
+            if follow_up and follow_up.get("previous_question"):
+                user_question = (
+                    f'{user_question} (follow-up to: "'
+                    f'{follow_up["previous_question"]}")'
+                )
 
             if deepthink:
                 # DeepThink flow: metadata → data → data → metadata
@@ -606,7 +944,7 @@ class GenericDecisionEngine:
                 )
                 # Phase 3 (deepthink) — second data fetch for deeper analysis
                 deepthink_data_response = self._fetch_deepthink_data(
-                    user_question, raw_data_response
+                    user_question, raw_data_response, llm_model
                 )
 
                 # Phase 4 (deepthink) — single metadata call combining both data sets
@@ -618,6 +956,7 @@ class GenericDecisionEngine:
                     raw_data_response,
                     deepthink_data_response,
                     user_profile=user_profile,
+                    llm_model=llm_model,
                 )
                 report_text = report_response.get("answer", "")
 
@@ -631,7 +970,10 @@ class GenericDecisionEngine:
             else:
                 # Standard flow: metadata → data → metadata
                 report_response = self._generate_report(
-                    user_question, raw_data_response, user_profile=user_profile
+                    user_question,
+                    raw_data_response,
+                    user_profile=user_profile,
+                    llm_model=llm_model,
                 )
                 report_text = report_response.get("answer", "")
 
@@ -647,6 +989,114 @@ class GenericDecisionEngine:
                 "status": "error",
                 "message": str(e),
             }
-        finally:
-            # Restore original params
-            self.__class__.DEFAULT_PARAMS = original_params
+
+    # ----------------------------------------
+    # PUBLIC: RE-RENDER FROM STORED DATA
+    # ----------------------------------------
+    @traced("engine.rerender")
+    def rerender(
+        self,
+        user_question: str,
+        execution_data: Dict[str, Any],
+        llm_model: str | None = None,
+        user_profile: Dict[str, Any] | None = None,
+        language: str | None = None,
+    ) -> Dict[str, Any]:
+        """Regenerate only the report phase from previously stored phase
+        payloads (see answer()).  No metadata discovery or VQL execution is
+        performed.  If the stored data contains a DeepThink pass, the combined
+        DeepThink report is regenerated instead of the standard one."""
+        try:
+            llm_model = self._resolve_llm_model(llm_model)
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+
+        try:
+            raw_data_response = execution_data.get("execution_phase")
+            if not raw_data_response:
+                raise RuntimeError("Stored data has no execution phase")
+            deepthink_data_response = execution_data.get("deepthink_phase")
+
+            if deepthink_data_response:
+                report_response = self._generate_deepthink_report(
+                    user_question,
+                    raw_data_response,
+                    deepthink_data_response,
+                    user_profile=user_profile,
+                    language=language,
+                    llm_model=llm_model,
+                )
+            else:
+                report_response = self._generate_report(
+                    user_question,
+                    raw_data_response,
+                    user_profile=user_profile,
+                    language=language,
+                    llm_model=llm_model,
+                )
+
+            return {
+                **execution_data,
+                "status": "success",
+                "report": report_response.get("answer", ""),
+            }
+
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": str(e),
+            }
+
+    # ----------------------------------------
+    # PUBLIC: DEEPEN A STORED ANSWER
+    # ----------------------------------------
+    @traced("engine.deepen")
+    def deepen(
+        self,
+        user_question: str,
+        execution_data: Dict[str, Any],
+        llm_model: str | None = None,
+        user_profile: Dict[str, Any] | None = None,
+        language: str | None = None,
+    ) -> Dict[str, Any]:
+        """Run the DeepThink passes (second data fetch + combined report)
+        starting from the stored first-pass data, skipping metadata discovery
+        and the first data fetch."""
+        try:
+            llm_model = self._resolve_llm_model(llm_model)
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+
+        try:
+            raw_data_response = execution_data.get("execution_phase")
+            if not raw_data_response:
+                raise RuntimeError("Stored data has no execution phase")
+
+            logger.info(
+                "[Decision Engine] Deepen — running second data pass from stored data …"
+            )
+            deepthink_data_response = self._fetch_deepthink_data(
+                user_question, raw_data_response, llm_model
+            )
+            report_response = self._generate_deepthink_report(
+                user_question,
+                raw_data_response,
+                deepthink_data_response,
+                user_profile=user_profile,
+                language=language,
+                llm_model=llm_model,
+            )
+
+            return {
+                "status": "success",
+                "metadata_phase": execution_data.get("metadata_phase", {}),
+                "execution_phase": raw_data_response,
+                "deepthink_phase": deepthink_data_response,
+                "report": report_response.get("answer", ""),
+            }
+
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": str(e),
+            }
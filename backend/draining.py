@@ -0,0 +1,91 @@
+"""Graceful draining of decision pipelines on shutdown.
+
+A /decide (or rerender / deepen) request runs several AI SDK calls and can
+take minutes; killing it on a redeploy means paying for the same LLM work
+again.  DrainDecisions counts the decision requests in flight.  Once
+draining has begun (decision_drain.begin(), called by backend/serve.py as
+soon as the worker is asked to stop), new ones are answered with 503 and
+Retry-After so the client retries on another worker, while those in flight
+run to completion.  The lifespan shutdown then waits for them, for at most
+DRAIN_TIMEOUT_SECONDS, before the history writer is flushed.
+"""
+
+import asyncio
+import os
+import re
+import time
+
+from fastapi.responses import JSONResponse
+
+from . import metrics
+
+DRAIN_TIMEOUT_SECONDS = float(os.environ.get("DRAIN_TIMEOUT_SECONDS", "300"))
+DRAIN_RETRY_AFTER_SECONDS = os.environ.get("DRAIN_RETRY_AFTER_SECONDS", "5")
+
+# POST paths of the decision pipelines
+DECISION_PATHS = re.compile(r"^/questions/(decide|\d+/rerender|\d+/deepen)/?$")
+
+
+class DecisionDrain:
+    """In-flight decision count and draining flag of this worker (only
+    touched from the event loop)."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.draining = False
+
+    def begin(self) -> None:
+        """Stop accepting new decisions."""
+        self.draining = True
+
+    async def wait(self, timeout: float = DRAIN_TIMEOUT_SECONDS) -> int:
+        """Wait up to *timeout* seconds for the decisions in flight to finish
+        and return how many are still running."""
+        deadline = time.monotonic() + timeout
+        while self.in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        return self.in_flight
+
+
+decision_drain = DecisionDrain()
+
+metrics.register(
+    "decisions_in_flight",
+    "gauge",
+    "Decision pipelines being processed by this worker.",
+    lambda: decision_drain.in_flight,
+)
+
+
+class DrainDecisions:
+    """ASGI middleware counting decision requests and rejecting new ones
+    while draining (see module docstring)."""
+
+    def __init__(self, app, drain: DecisionDrain = decision_drain):
+        self.app = app
+        self.drain = drain
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not DECISION_PATHS.match(scope["path"])
+        ):
+            await self.app(scope, receive, send)
+            return
+        if self.drain.draining:
+            response = JSONResponse(
+                {"detail": "Server is restarting, please retry"},
+                status_code=503,
+                headers={
+                    "Retry-After": DRAIN_RETRY_AFTER_SECONDS,
+                    "Connection": "close",
+                },
+            )
+            await response(scope, receive, send)
+            return
+        self.drain.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.drain.in_flight -= 1
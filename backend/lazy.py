@@ -0,0 +1,63 @@
+"""Deferred imports of heavy and optional dependencies.
+
+Modules such as duckdb, zstandard, Pillow, jose or requests used to be
+imported at module level, so every worker paid for them before it could
+serve its first request (see backend/startup.py).  Code that needs one
+calls optional(name) (or imports it inside the function) instead.  The
+lifespan imports them in background WARM_IMPORTS_DELAY_SECONDS after the app
+is ready (warm): late enough not to compete with the first requests for
+the GIL, early enough that later ones rarely wait for an import.
+"""
+
+import functools
+import importlib
+import importlib.util
+import logging
+import os
+import threading
+import time
+from types import ModuleType
+
+logger = logging.getLogger(__name__)
+
+WARM_IMPORTS_DELAY_SECONDS = float(os.environ.get("WARM_IMPORTS_DELAY_SECONDS", "2"))
+
+# Imported in background by warm(), slowest first
+DEFERRED_MODULES = (
+    "jose.jwt",
+    "requests",
+    "backend.users.oauth",
+    "duckdb",
+    "zstandard",
+    "PIL.Image",
+)
+
+
+@functools.cache
+def available(name: str) -> bool:
+    """Whether module *name* is installed (without importing it)."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ModuleNotFoundError:  # parent package missing
+        return False
+
+
+def optional(name: str) -> ModuleType | None:
+    """Module *name*, imported on first use, or None if it isn't installed."""
+    if not available(name):
+        return None
+    return importlib.import_module(name)
+
+
+def warm(names=DEFERRED_MODULES, delay: float = WARM_IMPORTS_DELAY_SECONDS) -> None:
+    """Import the installed *names* in a daemon thread after *delay* seconds."""
+
+    def _run() -> None:
+        time.sleep(delay)
+        for name in names:
+            try:
+                optional(name)
+            except Exception as exc:
+                logger.warning("[Startup] Could not import %s: %s", name, exc)
+
+    threading.Thread(target=_run, daemon=True).start()
@@ -1,7 +1,11 @@
 import logging
 import os
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
 
+_started = time.perf_counter()
+
 # Load .env from project root before any other imports read env vars
 _env_file = Path(__file__).resolve().parent.parent / ".env"
 if _env_file.exists():
@@ -13,18 +17,82 @@ if _env_file.exists():
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse
 
+from backend import metrics, startup
 from backend.db import init_db
-from backend.decision_engine import GenericDecisionEngine
+from backend.draining import DrainDecisions, decision_drain
+from backend.lazy import warm
+from backend.questions.archive import history_archiver
+from backend.questions.history_writer import history_writer
+from backend.questions.similarity import question_index
+from backend.shared_cache import shared_cache
+from backend.snapshots import snapshot_exporter
+from backend.tracing import TraceRequests
+from backend.uploads import (
+    MULTIPART_OVERHEAD,
+    UPLOADS_DIR,
+    ImmutableStaticFiles,
+    UploadSizeLimit,
+)
+from backend.users.utils import shutdown_hash_pool
 
-from .users.routes import router as users_router
-from .questions.routes import router as questions_router
+from .users.routes import MAX_FILE_SIZE, UPLOAD_DIR, router as users_router
+from .questions.routes import get_engine, router as questions_router
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+startup.record("imports", _started)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # initialize DB and create tables if not present (idempotent)
+    with startup.phase("init_db"):
+        init_db()
+        UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+
+    # Replay history journals left by a crash, then write /decide results
+    # behind the response
+    with startup.phase("history_writer"):
+        history_writer.start()
+
+    with startup.phase("background_jobs"):
+        # Load AI SDK metadata in background (retries every 5 s on failure)
+        get_engine().load_metadata_background()
+
+        # Build the near-duplicate question index in background
+        question_index.load_background()
+
+        # Publish analytics snapshots periodically (if SNAPSHOT_EXPORT=1)
+        snapshot_exporter.start_background()
+
+        # Apply the history retention policy (if ARCHIVE_AFTER_DAYS or
+        # ARCHIVE_MAX_PER_USER is set)
+        history_archiver.start_background()
+
+    # Ready: import what was deferred (backend/lazy.py) before it is needed
+    warm()
+    logger.info(startup.report())
+
+    yield
 
-app = FastAPI(title="HackUDC2026")
+    # Let the decisions in flight finish (backend/serve.py starts draining
+    # as soon as the worker is asked to stop)
+    decision_drain.begin()
+    left = await decision_drain.wait()
+    if left:
+        logger.warning("[Shutdown] %d decisions still running, abandoned", left)
+
+    snapshot_exporter.stop()
+    history_archiver.stop()
+    # Write every queued question before exiting
+    history_writer.stop()
+    shutdown_hash_pool()
+    shared_cache.close()
+
+
+app = FastAPI(title="HackUDC2026", lifespan=lifespan)
 
 # Allow frontend to access the API (configurable via FRONTEND_URL env var)
 _frontend_url = os.environ.get("FRONTEND_URL", "http://localhost:5173")
@@ -33,23 +101,33 @@ origins = [
     _frontend_url.replace("localhost", "127.0.0.1"),
 ]
 
+# Answer new decisions with 503 while the worker drains (backend/draining.py)
+app.add_middleware(DrainDecisions)
+
+# Request ids for every request, span traces of decisions (backend/tracing.py)
+app.add_middleware(TraceRequests)
+
+# Reject oversized profile images while they stream in
+app.add_middleware(
+    UploadSizeLimit, limits={"/me/profile-image": MAX_FILE_SIZE + MULTIPART_OVERHEAD}
+)
+
+# Added last, so it is the outermost middleware: the responses of the ones
+# above (503 while draining, 413) carry CORS headers too
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
 
 
-@app.on_event("startup")
-def on_startup():
-    # initialize DB and create tables if not present (idempotent)
-    init_db()
-
-    # Load AI SDK metadata in background (retries every 5 s on failure)
-    engine = GenericDecisionEngine()
-    engine.load_metadata_background()
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    """This worker's in-process metrics, in Prometheus text format."""
+    return metrics.render()
 
 
 # register users router (endpoints moved to backend/users/routes.py)
@@ -57,7 +135,11 @@ app.include_router(users_router)
 # register questions router
 app.include_router(questions_router)
 
-# Serve uploaded files (profile images, etc.) as static assets
-_uploads_dir = Path(__file__).resolve().parent / "uploads"
-_uploads_dir.mkdir(parents=True, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=str(_uploads_dir)), name="uploads")
+# Serve uploaded files (profile images, etc.) as static assets, cacheable
+# forever since every upload gets a new name (the directory is created by
+# the lifespan)
+app.mount(
+    "/uploads",
+    ImmutableStaticFiles(directory=str(UPLOADS_DIR), check_dir=False),
+    name="uploads",
+)
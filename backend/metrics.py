@@ -0,0 +1,27 @@
+"""In-process metrics served at GET /metrics (Prometheus text format).
+
+Modules register a gauge or counter with a callable that returns its current
+value; nothing is computed until /metrics is scraped.  Values are per worker
+process.
+"""
+
+from typing import Callable
+
+# name -> (type, help, value function)
+_metrics: dict[str, tuple[str, str, Callable[[], float]]] = {}
+
+
+def register(name: str, kind: str, help_text: str, value: Callable[[], float]) -> None:
+    """Expose *value()* as metric *name* of *kind* ("counter" or "gauge")."""
+    _metrics[name] = (kind, help_text, value)
+
+
+def render() -> str:
+    lines = []
+    for name, (kind, help_text, value) in sorted(_metrics.items()):
+        lines += [
+            f"# HELP {name} {help_text}",
+            f"# TYPE {name} {kind}",
+            f"{name} {value():g}",
+        ]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,74 @@
+"""Lightweight schema migrations.
+
+``SQLModel.metadata.create_all`` only creates missing tables, so changes to
+existing tables (new columns, indexes, ...) are applied by numbered modules
+in this package.  Each module defines a ``description`` string and an
+``upgrade(connection)`` function that must be idempotent, because on a fresh
+database create_all has usually created the final schema already.  Applied
+versions are recorded in the ``schema_migrations`` table.
+
+Run ``python -m backend.migrations`` to upgrade an existing database, or
+``python -m backend.migrations --status`` to list pending migrations.
+"""
+
+import importlib
+import logging
+import pkgutil
+import re
+from datetime import datetime
+from types import ModuleType
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_MODULE_NAME = re.compile(r"^m(\d{4})_\w+$")
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def discover() -> list[tuple[int, str, ModuleType]]:
+    """Return (version, name, module) for every migration, in order."""
+    migrations = []
+    for module_info in pkgutil.iter_modules(__path__):
+        match = _MODULE_NAME.match(module_info.name)
+        if match:
+            module = importlib.import_module(f"{__name__}.{module_info.name}")
+            migrations.append((int(match.group(1)), module_info.name, module))
+    return sorted(migrations, key=lambda migration: migration[0])
+
+
+def applied_versions(engine: Engine) -> set[int]:
+    _metadata.create_all(engine)
+    with engine.connect() as connection:
+        return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def pending(engine: Engine) -> list[tuple[int, str, ModuleType]]:
+    done = applied_versions(engine)
+    return [migration for migration in discover() if migration[0] not in done]
+
+
+def upgrade(engine: Engine) -> list[str]:
+    """Apply every pending migration, each in its own transaction.
+    Returns the names of the applied migrations."""
+    applied = []
+    for version, name, module in pending(engine):
+        logger.info("[Migrations] Applying %s: %s", name, module.description)
+        with engine.begin() as connection:
+            module.upgrade(connection)
+            connection.execute(
+                schema_migrations.insert().values(
+                    version=version, name=name, applied_at=datetime.utcnow()
+                )
+            )
+        applied.append(name)
+    return applied
@@ -0,0 +1,20 @@
+import argparse
+import logging
+
+from backend.db import engine, init_db
+from backend.migrations import pending
+
+logging.basicConfig(level=logging.INFO)
+
+parser = argparse.ArgumentParser(description="Upgrade the database schema.")
+parser.add_argument(
+    "--status", action="store_true", help="List pending migrations and exit"
+)
+args = parser.parse_args()
+
+if args.status:
+    for version, name, module in pending(engine):
+        print(f"{name}: {module.description}")
+else:
+    # init_db creates missing tables and applies pending migrations
+    init_db()
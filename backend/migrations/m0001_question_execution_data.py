@@ -0,0 +1,13 @@
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+
+description = "Add question.execution_data for stored phase payloads"
+
+
+def upgrade(connection: Connection) -> None:
+    columns = {column["name"] for column in inspect(connection).get_columns("question")}
+    if "execution_data" not in columns:
+        binary = "BYTEA" if connection.dialect.name == "postgresql" else "BLOB"
+        connection.exec_driver_sql(
+            f"ALTER TABLE question ADD COLUMN execution_data {binary}"
+        )
@@ -0,0 +1,19 @@
+from sqlalchemy.engine import Connection
+
+description = "Index question (user_id, date_time), folder_id, date_time and folder.user_id"
+
+# Spelled out rather than read from the models, so later index changes there
+# don't change what this migration does
+INDEXES = (
+    ("ix_question_user_id_date_time", "question", "user_id, date_time"),
+    ("ix_question_folder_id", "question", "folder_id"),
+    ("ix_question_date_time", "question", "date_time"),
+    ("ix_folder_user_id", "folder", "user_id"),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    for name, table, columns in INDEXES:
+        connection.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"
+        )
@@ -0,0 +1,61 @@
+from sqlalchemy.engine import Connection
+
+description = "Create the question_fts full-text search index and backfill it"
+
+
+def upgrade(connection: Connection) -> None:
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(
+            """
+            CREATE TABLE IF NOT EXISTS question_fts (
+                question_id INTEGER PRIMARY KEY REFERENCES question (id) ON DELETE CASCADE,
+                owner TEXT NOT NULL,
+                title TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                restrictions TEXT NOT NULL,
+                document tsvector GENERATED ALWAYS AS (
+                    setweight(to_tsvector('simple', title), 'A')
+                    || setweight(to_tsvector('simple', restrictions), 'B')
+                    || setweight(to_tsvector('simple', answer), 'C')
+                ) STORED
+            )
+            """
+        )
+        connection.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_question_fts_document "
+            "ON question_fts USING GIN (document)"
+        )
+        connection.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_question_fts_owner ON question_fts (owner)"
+        )
+        connection.exec_driver_sql(
+            """
+            INSERT INTO question_fts (question_id, owner, title, answer, restrictions)
+            SELECT id, 'u' || COALESCE(user_id, 0), title, COALESCE(answer, ''),
+                   COALESCE(restrictions, '')
+            FROM question
+            ON CONFLICT (question_id) DO NOTHING
+            """
+        )
+        return
+
+    # rowid = (user_id << 32) | question_id keeps each user's entries in one
+    # rowid range (see questions/search.py); remove_diacritics lets "camion"
+    # match "camión"
+    connection.exec_driver_sql(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS question_fts USING fts5(
+            title, answer, restrictions,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+        """
+    )
+    connection.exec_driver_sql("DELETE FROM question_fts")
+    connection.exec_driver_sql(
+        """
+        INSERT INTO question_fts (rowid, title, answer, restrictions)
+        SELECT (COALESCE(user_id, 0) << 32) | id, title, COALESCE(answer, ''),
+               COALESCE(restrictions, '')
+        FROM question
+        """
+    )
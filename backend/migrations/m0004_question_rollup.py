@@ -0,0 +1,83 @@
+from sqlalchemy.engine import Connection
+
+description = "Create question_rollup and backfill it from the question history"
+
+# Spelled out rather than read from the models and questions/rollups.py, so
+# later changes there don't change what this migration does.  Bin i of the
+# latency histogram counts time_out <= LATENCY_BOUNDS[i], the last bin the
+# rest.
+LATENCY_BOUNDS = (1, 2, 5, 10, 20, 30, 60, 120, 300)
+
+_LATENCY_COLUMNS = ", ".join(f"latency_b{i}" for i in range(len(LATENCY_BOUNDS) + 1))
+
+
+def _latency_bins() -> str:
+    lower = (None, *LATENCY_BOUNDS)
+    upper = (*LATENCY_BOUNDS, None)
+    bins = []
+    for low, high in zip(lower, upper):
+        conditions = []
+        if low is not None:
+            conditions.append(f"time_out > {low}")
+        if high is not None:
+            conditions.append(f"time_out <= {high}")
+        bins.append(f"SUM(CASE WHEN {' AND '.join(conditions)} THEN 1 ELSE 0 END)")
+    return ",\n               ".join(bins)
+
+
+def _period_start(dialect_name: str, period: str) -> str:
+    if dialect_name == "postgresql":
+        return f"date_trunc('{period}', date_time)"
+    # As SQLAlchemy stores DATETIME on SQLite, so the API's upserts hit the
+    # same buckets
+    hour = "%H" if period == "hour" else "00"
+    return f"strftime('%Y-%m-%d {hour}:00:00.000000', date_time)"
+
+
+def upgrade(connection: Connection) -> None:
+    timestamp = "TIMESTAMP" if connection.dialect.name == "postgresql" else "DATETIME"
+    connection.exec_driver_sql(
+        f"""
+        CREATE TABLE IF NOT EXISTS question_rollup (
+            period VARCHAR(8) NOT NULL,
+            period_start {timestamp} NOT NULL,
+            model_llm VARCHAR NOT NULL,
+            user_id INTEGER NOT NULL,
+            requests INTEGER NOT NULL,
+            likes INTEGER NOT NULL,
+            tokens INTEGER NOT NULL,
+            latency_sum FLOAT NOT NULL,
+            latency_count INTEGER NOT NULL,
+            latency_b0 INTEGER NOT NULL,
+            latency_b1 INTEGER NOT NULL,
+            latency_b2 INTEGER NOT NULL,
+            latency_b3 INTEGER NOT NULL,
+            latency_b4 INTEGER NOT NULL,
+            latency_b5 INTEGER NOT NULL,
+            latency_b6 INTEGER NOT NULL,
+            latency_b7 INTEGER NOT NULL,
+            latency_b8 INTEGER NOT NULL,
+            latency_b9 INTEGER NOT NULL,
+            PRIMARY KEY (period, period_start, model_llm, user_id)
+        )
+        """
+    )
+    connection.exec_driver_sql("DELETE FROM question_rollup")
+    for period in ("hour", "day"):
+        period_start = _period_start(connection.dialect.name, period)
+        connection.exec_driver_sql(
+            f"""
+            INSERT INTO question_rollup (
+                period, period_start, model_llm, user_id, requests, likes, tokens,
+                latency_sum, latency_count, {_LATENCY_COLUMNS}
+            )
+            SELECT '{period}', {period_start}, COALESCE(model_llm, ''),
+                   COALESCE(user_id, 0), COUNT(*),
+                   SUM(CASE WHEN "like" THEN 1 ELSE 0 END),
+                   COALESCE(SUM(used_tokens), 0),
+                   COALESCE(SUM(time_out), 0), COUNT(time_out),
+                   {_latency_bins()}
+            FROM question
+            GROUP BY {period_start}, COALESCE(model_llm, ''), COALESCE(user_id, 0)
+            """
+        )
@@ -0,0 +1,22 @@
+from sqlalchemy.engine import Connection
+
+description = "Create id_sequence, starting question ids after the current maximum"
+
+
+def upgrade(connection: Connection) -> None:
+    connection.exec_driver_sql(
+        """
+        CREATE TABLE IF NOT EXISTS id_sequence (
+            name VARCHAR(64) NOT NULL PRIMARY KEY,
+            next_id INTEGER NOT NULL
+        )
+        """
+    )
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM id_sequence WHERE name = 'question'"
+    ).first()
+    if exists is None:
+        connection.exec_driver_sql(
+            "INSERT INTO id_sequence (name, next_id) "
+            "SELECT 'question', COALESCE(MAX(id), 0) + 1 FROM question"
+        )
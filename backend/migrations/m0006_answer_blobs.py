@@ -0,0 +1,82 @@
+import hashlib
+import os
+import zlib
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+description = "Move large question answers to answer_blob (compressed, deduplicated)"
+
+# Same threshold as questions/blobs.py; the bodies are stored as in its
+# answer_blob format, always zlib-compressed here (readers accept either
+# codec).  Spelled out so later changes there don't change this migration.
+_INLINE_MAX = int(os.environ.get("ANSWER_INLINE_MAX", "1024"))
+_BATCH_SIZE = 1000
+
+_SELECT = text(
+    "SELECT id, answer FROM question "
+    "WHERE answer_size IS NULL AND id > :last_id ORDER BY id LIMIT :limit"
+)
+_INSERT_BLOB = text(
+    "INSERT INTO answer_blob (hash, codec, size, data) "
+    "VALUES (:hash, 'zlib', :size, :data) ON CONFLICT (hash) DO NOTHING"
+)
+_UPDATE = text(
+    "UPDATE question SET answer = :answer, answer_ref = :answer_ref, "
+    "answer_size = :answer_size WHERE id = :id"
+)
+
+
+def _move_answers(connection: Connection) -> None:
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            _SELECT, {"last_id": last_id, "limit": _BATCH_SIZE}
+        ).all()
+        if not rows:
+            return
+        blobs = {}
+        updates = []
+        for question_id, answer in rows:
+            data = (answer or "").encode("utf-8")
+            values = {"id": question_id, "answer_size": len(data)}
+            if len(data) < _INLINE_MAX:
+                values.update(answer=answer or "", answer_ref=None)
+            else:
+                ref = hashlib.sha256(data).hexdigest()
+                if ref not in blobs:
+                    blobs[ref] = {
+                        "hash": ref,
+                        "size": len(data),
+                        "data": zlib.compress(data, 9),
+                    }
+                values.update(answer="", answer_ref=ref)
+            updates.append(values)
+        if blobs:
+            connection.execute(_INSERT_BLOB, list(blobs.values()))
+        connection.execute(_UPDATE, updates)
+        last_id = rows[-1].id
+
+
+def upgrade(connection: Connection) -> None:
+    columns = {column["name"] for column in inspect(connection).get_columns("question")}
+    if "answer_ref" not in columns:
+        connection.exec_driver_sql(
+            "ALTER TABLE question ADD COLUMN answer_ref VARCHAR(64)"
+        )
+    if "answer_size" not in columns:
+        connection.exec_driver_sql(
+            "ALTER TABLE question ADD COLUMN answer_size INTEGER"
+        )
+    binary = "BYTEA" if connection.dialect.name == "postgresql" else "BLOB"
+    connection.exec_driver_sql(
+        f"""
+        CREATE TABLE IF NOT EXISTS answer_blob (
+            hash VARCHAR(64) NOT NULL PRIMARY KEY,
+            codec VARCHAR(8) NOT NULL,
+            size INTEGER NOT NULL,
+            data {binary} NOT NULL
+        )
+        """
+    )
+    _move_answers(connection)
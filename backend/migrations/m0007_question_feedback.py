@@ -0,0 +1,20 @@
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+
+description = "Add question.feedback_at and question.exclude_user_info"
+
+
+def upgrade(connection: Connection) -> None:
+    columns = {column["name"] for column in inspect(connection).get_columns("question")}
+    if "feedback_at" not in columns:
+        timestamp = (
+            "TIMESTAMP" if connection.dialect.name == "postgresql" else "DATETIME"
+        )
+        connection.exec_driver_sql(
+            f"ALTER TABLE question ADD COLUMN feedback_at {timestamp}"
+        )
+    if "exclude_user_info" not in columns:
+        connection.exec_driver_sql(
+            "ALTER TABLE question ADD COLUMN exclude_user_info BOOLEAN "
+            "NOT NULL DEFAULT FALSE"
+        )
@@ -0,0 +1,127 @@
+import re
+import zlib
+
+from sqlalchemy import bindparam, inspect, text
+from sqlalchemy.engine import Connection
+
+try:  # optional: only needed for answers stored zstd-compressed
+    import zstandard
+except ImportError:
+    zstandard = None
+
+description = "Make question_fts index-only (contentless FTS5 / tsvector only)"
+
+_BATCH_SIZE = 1000
+
+# Spelled out rather than taken from questions/search.py and blobs.py, so
+# later changes there don't change what this migration does
+_SELECT = text(
+    "SELECT id, user_id, title, answer, answer_ref, restrictions FROM question "
+    "WHERE id > :last_id ORDER BY id LIMIT :limit"
+)
+_SELECT_BLOBS = text(
+    "SELECT hash, codec, data FROM answer_blob WHERE hash IN :refs"
+).bindparams(bindparam("refs", expanding=True))
+_SQLITE_INSERT = text(
+    "INSERT INTO question_fts (rowid, title, answer, restrictions) "
+    "VALUES (:rowid, :title, :answer, :restrictions)"
+)
+_POSTGRES_INSERT = text(
+    "INSERT INTO question_fts (question_id, owner, document) "
+    "VALUES (:id, :owner, setweight(to_tsvector('simple', :title), 'A') "
+    "|| setweight(to_tsvector('simple', :restrictions), 'B') "
+    "|| setweight(to_tsvector('simple', :answer), 'C'))"
+)
+
+
+def _decompress(codec: str, data: bytes) -> str:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("answer blob is zstd-compressed; install zstandard")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        data = zlib.decompress(data)
+    return data.decode("utf-8")
+
+
+def _backfill(connection: Connection) -> None:
+    """Index every question, with the bodies stored in answer_blob."""
+    postgresql = connection.dialect.name == "postgresql"
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            _SELECT, {"last_id": last_id, "limit": _BATCH_SIZE}
+        ).all()
+        if not rows:
+            return
+        refs = [row.answer_ref for row in rows if row.answer_ref]
+        bodies = {}
+        if refs:
+            blobs = connection.execute(_SELECT_BLOBS, {"refs": refs})
+            bodies = {ref: _decompress(codec, data) for ref, codec, data in blobs}
+        entries = []
+        for row in rows:
+            answer = bodies[row.answer_ref] if row.answer_ref else row.answer
+            entry = {
+                "title": row.title,
+                "answer": answer or "",
+                "restrictions": row.restrictions or "",
+            }
+            user_id = row.user_id or 0
+            if postgresql:
+                entry.update(id=row.id, owner=f"u{user_id}")
+            else:
+                entry["rowid"] = (user_id << 32) | row.id
+            entries.append(entry)
+        connection.execute(_POSTGRES_INSERT if postgresql else _SQLITE_INSERT, entries)
+        last_id = rows[-1].id
+
+
+def upgrade(connection: Connection) -> None:
+    if connection.dialect.name == "postgresql":
+        columns = {
+            column["name"] for column in inspect(connection).get_columns("question_fts")
+        }
+        if "answer" not in columns:
+            return
+        connection.exec_driver_sql("DROP TABLE question_fts")
+        connection.exec_driver_sql(
+            """
+            CREATE TABLE question_fts (
+                question_id INTEGER PRIMARY KEY REFERENCES question (id) ON DELETE CASCADE,
+                owner TEXT NOT NULL,
+                document tsvector NOT NULL
+            )
+            """
+        )
+        _backfill(connection)
+        connection.exec_driver_sql(
+            "CREATE INDEX ix_question_fts_document "
+            "ON question_fts USING GIN (document)"
+        )
+        connection.exec_driver_sql(
+            "CREATE INDEX ix_question_fts_owner ON question_fts (owner)"
+        )
+        return
+
+    sql = connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE name = 'question_fts'"
+    ).scalar()
+    if sql is not None and re.search(r"\bcontent\s*=", sql):
+        return
+    # Same columns, rowids and tokenizer as m0003, without the copy of every
+    # text in question_fts_content
+    connection.exec_driver_sql("DROP TABLE IF EXISTS question_fts")
+    connection.exec_driver_sql(
+        """
+        CREATE VIRTUAL TABLE question_fts USING fts5(
+            title, answer, restrictions,
+            content = '',
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+        """
+    )
+    _backfill(connection)
+    connection.exec_driver_sql(
+        "INSERT INTO question_fts (question_fts) VALUES ('optimize')"
+    )
@@ -0,0 +1,9 @@
+from sqlalchemy.engine import Connection
+
+description = "Index question.feedback_at"
+
+
+def upgrade(connection: Connection) -> None:
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_question_feedback_at ON question (feedback_at)"
+    )
@@ -0,0 +1,300 @@
+"""Retention policy: old questions move to question_archive.
+
+Questions older than ARCHIVE_AFTER_DAYS, and those beyond each user's newest
+ARCHIVE_MAX_PER_USER, leave the question table (and its indexes, search
+entries and the near-duplicate index) for question_archive.  Their answer,
+restrictions and execution data are packed into one payload, compressed
+unless ARCHIVE_COMPRESS=0.  Archived questions stay readable through
+/questions/archive, and /questions/{id}/answer falls back to the archive.
+Deleting a question or un-assigning a folder applies to the archive too.
+Rollups are not touched, so the dashboard keeps counting them.
+
+The archive lives in the same database, so each move is one transaction.  A
+background job moves ARCHIVE_BATCH_SIZE questions per transaction and pauses
+ARCHIVE_BATCH_PAUSE_MS between batches, so API writes never wait long
+for the database.  It runs every ARCHIVE_INTERVAL_SECONDS while either
+policy is set, or once with ``python -m backend.questions.archive``.
+"""
+
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, func, or_
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .. import db
+from .blobs import collect_garbage, compress, decompress, load_answers
+from .models import Question, QuestionArchive
+from .search import unindex_questions
+from .similarity import question_index
+
+logger = logging.getLogger(__name__)
+
+# Retention policy (0 disables either rule)
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "0"))
+ARCHIVE_MAX_PER_USER = int(os.environ.get("ARCHIVE_MAX_PER_USER", "0"))
+ARCHIVE_COMPRESS = os.environ.get("ARCHIVE_COMPRESS", "1") == "1"
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", "200"))
+ARCHIVE_BATCH_PAUSE_MS = float(os.environ.get("ARCHIVE_BATCH_PAUSE_MS", "50"))
+ARCHIVE_INTERVAL_SECONDS = float(os.environ.get("ARCHIVE_INTERVAL_SECONDS", "3600"))
+
+
+def _pack(answer: str, restrictions: str | None, execution_data: bytes | None):
+    data = json.dumps(
+        {
+            "answer": answer,
+            "restrictions": restrictions,
+            "execution_data": (
+                base64.b64encode(execution_data).decode("ascii")
+                if execution_data is not None
+                else None
+            ),
+        },
+        ensure_ascii=False,
+    ).encode("utf-8")
+    return compress(data) if ARCHIVE_COMPRESS else ("none", data)
+
+
+def _unpack(codec: str, payload: bytes) -> dict:
+    data = payload if codec == "none" else decompress(codec, payload)
+    return json.loads(data.decode("utf-8"))
+
+
+# ── Moving ──────────────────────────────────────────────────────────────────
+
+
+def _expired_ids(session: Session, limit: int, now: datetime) -> list[int]:
+    """Ids of up to *limit* questions the retention policy wants archived,
+    oldest first."""
+    ids = []
+    if ARCHIVE_AFTER_DAYS > 0:
+        cutoff = now - timedelta(days=ARCHIVE_AFTER_DAYS)
+        ids += session.exec(
+            select(Question.id)
+            .where(Question.date_time < cutoff)
+            .order_by(Question.date_time)
+            .limit(limit)
+        ).all()
+    if ARCHIVE_MAX_PER_USER > 0 and len(ids) < limit:
+        over_cap = session.exec(
+            select(Question.user_id)
+            .where(Question.user_id.is_not(None))
+            .group_by(Question.user_id)
+            .having(func.count() > ARCHIVE_MAX_PER_USER)
+        ).all()
+        for user_id in over_cap:
+            # The user's oldest kept question; everything older goes
+            kept_date_time, kept_id = session.exec(
+                select(Question.date_time, Question.id)
+                .where(Question.user_id == user_id)
+                .order_by(Question.date_time.desc(), Question.id.desc())
+                .offset(ARCHIVE_MAX_PER_USER - 1)
+                .limit(1)
+            ).one()
+            ids += session.exec(
+                select(Question.id)
+                .where(
+                    Question.user_id == user_id,
+                    or_(
+                        Question.date_time < kept_date_time,
+                        and_(
+                            Question.date_time == kept_date_time,
+                            Question.id < kept_id,
+                        ),
+                    ),
+                    Question.id.not_in(ids),
+                )
+                .order_by(Question.date_time)
+                .limit(limit - len(ids))
+            ).all()
+            if len(ids) >= limit:
+                break
+    return ids
+
+
+def archive_questions(session: Session, question_ids: list[int]) -> list[int]:
+    """Move the given questions to question_archive in one transaction.
+    Returns the ids that were moved."""
+    # DELETE ... RETURNING takes exactly the rows it removes, so a concurrent
+    # edit is either archived or was never there
+    rows = session.execute(
+        delete(Question.__table__)
+        .where(Question.id.in_(question_ids))
+        .returning(*Question.__table__.c)
+    ).all()
+    if not rows:
+        session.commit()
+        return []
+    bodies = load_answers(session.connection(), (row.answer_ref for row in rows))
+    archived = []
+    entries = []
+    for row in rows:
+        answer = bodies[row.answer_ref] if row.answer_ref else row.answer
+        codec, payload = _pack(answer, row.restrictions, row.execution_data)
+        archived.append(
+            {
+                "id": row.id,
+                "title": row.title,
+                "user_id": row.user_id,
+                "folder_id": row.folder_id,
+                "like": row.like,
+                "time_out": row.time_out,
+                "used_tokens": row.used_tokens,
+                "date_time": row.date_time,
+                "model_llm": row.model_llm,
+                "archived_at": datetime.utcnow(),
+                "codec": codec,
+                "payload": payload,
+            }
+        )
+        entries.append({**row._mapping, "answer": answer})
+    session.connection().execute(QuestionArchive.__table__.insert(), archived)
+    unindex_questions(session, entries)
+    session.commit()
+    for row in rows:
+        question_index.remove(row.id)
+    return [row.id for row in rows]
+
+
+class HistoryArchiver:
+    """Applies the retention policy in small background batches (see module
+    docstring)."""
+
+    def __init__(self, engine=None, interval: float = ARCHIVE_INTERVAL_SECONDS):
+        self.enabled = ARCHIVE_AFTER_DAYS > 0 or ARCHIVE_MAX_PER_USER > 0
+        self.engine = engine
+        self.interval = interval
+        self._running = threading.Lock()
+        self._stop = threading.Event()
+
+    def run_once(self) -> int:
+        """Archive everything the policy selects, batch by batch. Returns the
+        number of questions archived (0 if a run was already in progress)."""
+        if not self._running.acquire(blocking=False):
+            return 0
+        started = time.perf_counter()
+        moved = 0
+        try:
+            if self.engine is None:
+                self.engine = db.engine
+            now = datetime.utcnow()
+            while not self._stop.is_set():
+                with Session(self.engine) as session:
+                    ids = _expired_ids(session, ARCHIVE_BATCH_SIZE, now)
+                    if not ids:
+                        break
+                    moved += len(archive_questions(session, ids))
+                self._stop.wait(ARCHIVE_BATCH_PAUSE_MS / 1000)
+            if moved:
+                # Blobs only the archived questions referred to
+                with self.engine.begin() as connection:
+                    collect_garbage(connection)
+                logger.info(
+                    "[Archive] Archived %d questions in %.1f s",
+                    moved,
+                    time.perf_counter() - started,
+                )
+        except Exception as exc:
+            logger.error("[Archive] Run failed after %d questions: %s", moved, exc)
+        finally:
+            self._running.release()
+        return moved
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def start_background(self) -> None:
+        """Run now and then every *interval* seconds in a daemon thread."""
+        if self.enabled:
+            self._stop.clear()
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+history_archiver = HistoryArchiver()
+
+
+# ── Reading ─────────────────────────────────────────────────────────────────
+
+
+def get_archived_page(
+    session: Session,
+    user_id: int,
+    limit: int,
+    after: tuple[datetime, int] | None = None,
+) -> list[tuple]:
+    """get_question_page over a user's archived questions."""
+    statement = select(
+        QuestionArchive.id,
+        QuestionArchive.title,
+        QuestionArchive.folder_id,
+        QuestionArchive.like,
+        QuestionArchive.model_llm,
+        QuestionArchive.date_time,
+    ).where(QuestionArchive.user_id == user_id)
+    if after is not None:
+        after_date_time, after_id = after
+        statement = statement.where(
+            or_(
+                QuestionArchive.date_time < after_date_time,
+                and_(
+                    QuestionArchive.date_time == after_date_time,
+                    QuestionArchive.id < after_id,
+                ),
+            )
+        )
+    statement = statement.order_by(
+        QuestionArchive.date_time.desc(), QuestionArchive.id.desc()
+    ).limit(limit)
+    return list(session.exec(statement).all())
+
+
+def get_archived_question(
+    session: Session, question_id: int, user_id: int
+) -> dict | None:
+    """An archived question of *user_id* with its answer and restrictions
+    (QuestionRead fields), or None."""
+    archived = session.exec(
+        select(QuestionArchive).where(
+            QuestionArchive.id == question_id, QuestionArchive.user_id == user_id
+        )
+    ).first()
+    if archived is None:
+        return None
+    payload = _unpack(archived.codec, archived.payload)
+    return {
+        **archived.model_dump(exclude={"codec", "payload", "archived_at"}),
+        "answer": payload["answer"],
+        "restrictions": payload["restrictions"],
+    }
+
+
+async def get_archived_page_async(
+    session: AsyncSession,
+    user_id: int,
+    limit: int,
+    after: tuple[datetime, int] | None = None,
+) -> list[tuple]:
+    return await session.run_sync(get_archived_page, user_id, limit, after)
+
+
+async def get_archived_question_async(
+    session: AsyncSession, question_id: int, user_id: int
+) -> dict | None:
+    return await session.run_sync(get_archived_question, question_id, user_id)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    db.init_db()
+    history_archiver.run_once()
@@ -0,0 +1,210 @@
+"""Compressed, content-addressed storage of answer bodies (answer_blob).
+
+Reports are several kilobytes of markdown, so keeping them inline made every
+question row large and every scan of the question table (history, Grafana)
+read them.  Bodies of ANSWER_INLINE_MAX bytes or more are instead compressed
+into answer_blob under the SHA-256 of their content, so identical answers
+(e.g. reused near-duplicates) are stored once.  The question row keeps an
+empty answer, the hash (answer_ref) and the size (answer_size).  Bodies are
+only read by the endpoints that return them.
+
+Compression uses zstd when the zstandard package is installed and zlib
+otherwise.  The codec is recorded per blob, so both can be read side by side.
+
+Blobs are never deleted with their questions, since other questions may
+share them.  Run ``python -m backend.questions.blobs`` to delete the
+unreferenced ones.  On PostgreSQL the writers of blobs hold a shared
+advisory lock until they commit and the collection takes it exclusively, so
+a blob that a question still being written refers to is never collected
+(SQLite's single writer already serializes them).
+"""
+
+import hashlib
+import logging
+import os
+import zlib
+
+from sqlalchemy import bindparam, delete, func, select, update
+
+from ..lazy import optional
+from .models import AnswerBlob, Question
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this (bytes) stay inline in question.answer
+ANSWER_INLINE_MAX = int(os.environ.get("ANSWER_INLINE_MAX", "1024"))
+ANSWER_ZSTD_LEVEL = int(os.environ.get("ANSWER_ZSTD_LEVEL", "9"))
+
+# Questions per batch when moving existing answers out of line
+_MOVE_BATCH = 1_000
+# PostgreSQL advisory lock taken by blob writers (shared) and collect_garbage
+_GC_LOCK_KEY = 0x616E73776572  # "answer"
+
+
+def _lock_blobs(connection, exclusive: bool) -> None:
+    """Take the blob lock until the end of the transaction (PostgreSQL)."""
+    if connection.dialect.name == "postgresql":
+        lock = (
+            func.pg_advisory_xact_lock
+            if exclusive
+            else func.pg_advisory_xact_lock_shared
+        )
+        connection.execute(select(lock(_GC_LOCK_KEY)))
+
+
+def compress(data: bytes) -> tuple[str, bytes]:
+    zstandard = optional("zstandard")  # optional: zlib is used without it
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ANSWER_ZSTD_LEVEL).compress(data)
+    return "zlib", zlib.compress(data, 9)
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "zstd":
+        zstandard = optional("zstandard")
+        if zstandard is None:
+            raise RuntimeError("answer blob is zstd-compressed; install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown answer blob codec {codec!r}")
+
+
+def encode_answer(answer: str) -> tuple[dict, dict | None]:
+    """The CPU-bound half of storing a body (hashing, compression), which
+    needs no connection: its question column values answer, answer_ref and
+    answer_size, and its answer_blob row (None when it stays inline)."""
+    data = answer.encode("utf-8")
+    if len(data) < ANSWER_INLINE_MAX:
+        return {"answer": answer, "answer_ref": None, "answer_size": len(data)}, None
+    ref = hashlib.sha256(data).hexdigest()
+    codec, payload = compress(data)
+    return (
+        {"answer": "", "answer_ref": ref, "answer_size": len(data)},
+        {"hash": ref, "codec": codec, "size": len(data), "data": payload},
+    )
+
+
+def store_encoded(connection, encoded: list[tuple[dict, dict | None]]) -> list[dict]:
+    """Write the blobs of encode_answer results to answer_blob (each distinct
+    body once) and return their question column values. Call inside the
+    question's transaction."""
+    blobs = {blob["hash"]: blob for _, blob in encoded if blob is not None}
+    if blobs:
+        _lock_blobs(connection, exclusive=False)
+        if connection.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        connection.execute(
+            insert(AnswerBlob).on_conflict_do_nothing(index_elements=["hash"]),
+            list(blobs.values()),
+        )
+    return [values for values, _ in encoded]
+
+
+def store_answers(connection, answers: list[str]) -> list[dict]:
+    """Write the bodies too large to keep inline to answer_blob and return,
+    per answer, the question column values answer, answer_ref and
+    answer_size. Call inside the question's transaction."""
+    encoded = {}
+    for answer in answers:
+        if answer not in encoded:
+            encoded[answer] = encode_answer(answer)
+    return store_encoded(connection, [encoded[answer] for answer in answers])
+
+
+def store_answer(
+    connection, answer: str, encoded: tuple[dict, dict | None] | None = None
+) -> dict:
+    """store_answers for a single body, already encoded by encode_answer
+    when *encoded* is given."""
+    return store_encoded(connection, [encoded or encode_answer(answer)])[0]
+
+
+def load_answers(connection, refs) -> dict[str, str]:
+    """Bodies of the given answer_blob hashes, in one query."""
+    refs = {ref for ref in refs if ref}
+    if not refs:
+        return {}
+    rows = connection.execute(
+        select(AnswerBlob.hash, AnswerBlob.codec, AnswerBlob.data).where(
+            AnswerBlob.hash.in_(refs)
+        )
+    )
+    return {
+        ref: decompress(codec, data).decode("utf-8") for ref, codec, data in rows
+    }
+
+
+def with_answers(connection, rows: list[dict]) -> list[dict]:
+    """Replace answer by the full body in *rows* (dicts with answer and
+    answer_ref); the bodies stored out of line are loaded in one query."""
+    bodies = load_answers(connection, (row["answer_ref"] for row in rows))
+    for row in rows:
+        if row["answer_ref"]:
+            row["answer"] = bodies[row["answer_ref"]]
+    return rows
+
+
+def move_answers(connection) -> int:
+    """Move the bodies of existing questions without answer_size into
+    answer_blob, in batches on *connection* (inside its transaction).
+    Returns the number of answers moved (the small ones stay inline).
+
+    On SQLite the file only shrinks after a VACUUM."""
+    statement = (
+        update(Question.__table__)
+        .where(Question.id == bindparam("b_id"))
+        .values(
+            answer=bindparam("b_answer"),
+            answer_ref=bindparam("b_answer_ref"),
+            answer_size=bindparam("b_answer_size"),
+        )
+    )
+    moved = processed = 0
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select(Question.id, Question.answer)
+            .where(Question.answer_size.is_(None), Question.id > last_id)
+            .order_by(Question.id)
+            .limit(_MOVE_BATCH)
+        ).all()
+        if not rows:
+            break
+        values = store_answers(connection, [answer or "" for _, answer in rows])
+        connection.execute(
+            statement,
+            [
+                {f"b_{column}": value for column, value in row_values.items()}
+                | {"b_id": question_id}
+                for (question_id, _), row_values in zip(rows, values)
+            ],
+        )
+        moved += sum(row_values["answer_ref"] is not None for row_values in values)
+        processed += len(rows)
+        last_id = rows[-1].id
+    logger.info(
+        "Moved the answers of %d of %d questions to answer_blob", moved, processed
+    )
+    return moved
+
+
+def collect_garbage(connection) -> int:
+    """Delete the blobs no question refers to. Returns how many."""
+    _lock_blobs(connection, exclusive=True)
+    referenced = select(Question.answer_ref).where(Question.answer_ref.is_not(None))
+    result = connection.execute(
+        delete(AnswerBlob).where(AnswerBlob.hash.not_in(referenced))
+    )
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    from backend.db import engine, init_db
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    with engine.begin() as connection:
+        logger.info("Deleted %d unreferenced answer blobs", collect_garbage(connection))
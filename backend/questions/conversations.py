@@ -0,0 +1,276 @@
+"""Server-side state of multi-turn conversations.
+
+With the default CACHE_URL (memory://) conversations are kept in a bounded
+in-process LRU, which only works with a single API worker.  With a shared
+cache (sqlite:// or redis://, see backend/shared_cache.py) each conversation
+is stored there as JSON, expiring after CONVERSATION_IDLE_SECONDS without
+use, so a follow-up can reach any worker.
+"""
+
+import dataclasses
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict
+
+from ..shared_cache import CacheBackend, CacheError, MemoryCache, shared_cache
+
+logger = logging.getLogger(__name__)
+
+# Bounds for the in-process conversation cache (configurable via env vars)
+MAX_CONVERSATIONS = int(os.environ.get("CONVERSATION_MAX_SESSIONS", "1000"))
+IDLE_TIMEOUT_SECONDS = float(os.environ.get("CONVERSATION_IDLE_SECONDS", "1800"))
+MAX_TOTAL_CHARS = int(os.environ.get("CONVERSATION_MAX_CHARS", str(20_000_000)))
+
+# Per-conversation caps: the schema is pinned as-is (up to the limit) while
+# the previous result is kept only as a short summary for follow-up context.
+MAX_SCHEMA_CHARS = 20_000
+MAX_SUMMARY_CHARS = 1_500
+
+
+@dataclass
+class Conversation:
+    """Server-side state of a multi-turn conversation.
+
+    Fields:
+    - id: opaque conversation id handed to the client
+    - user_id: owner of the conversation
+    - schema: discovered schema pinned on the first turn
+    - last_question / last_vql / last_summary: context of the previous turn
+    - turns: number of answered turns
+    """
+
+    id: str
+    user_id: int
+    schema: str | None = None
+    last_question: str | None = None
+    last_vql: str | None = None
+    last_summary: str | None = None
+    turns: int = 0
+    created_at: float = field(default_factory=time.monotonic)
+    last_used_at: float = field(default_factory=time.monotonic)
+
+    def size(self) -> int:
+        """Approximate memory footprint in characters."""
+        return sum(
+            len(value or "")
+            for value in (
+                self.schema,
+                self.last_question,
+                self.last_vql,
+                self.last_summary,
+            )
+        )
+
+    def follow_up_context(self) -> Dict[str, Any] | None:
+        """Context of the previous turn for the decision engine, or None on
+        the first turn."""
+        if not self.turns:
+            return None
+        return {
+            "previous_question": self.last_question,
+            "previous_vql": self.last_vql,
+            "previous_summary": self.last_summary,
+        }
+
+
+class ConversationStore:
+    """Bounded LRU cache of conversations with idle eviction.
+
+    Conversations idle for longer than *idle_timeout* are dropped, and the
+    least recently used ones are evicted when either *max_conversations* or
+    the *max_total_chars* memory budget is exceeded."""
+
+    def __init__(
+        self,
+        max_conversations: int = MAX_CONVERSATIONS,
+        idle_timeout: float = IDLE_TIMEOUT_SECONDS,
+        max_total_chars: int = MAX_TOTAL_CHARS,
+    ):
+        self.max_conversations = max_conversations
+        self.idle_timeout = idle_timeout
+        self.max_total_chars = max_total_chars
+        self._items: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._total_chars = 0
+        self._lock = threading.Lock()
+
+    def create(self, user_id: int) -> Conversation:
+        conversation = Conversation(id=uuid.uuid4().hex, user_id=user_id)
+        with self._lock:
+            self._evict_idle()
+            self._items[conversation.id] = conversation
+            self._evict_over_budget()
+        return conversation
+
+    def get(self, conversation_id: str, user_id: int) -> Conversation | None:
+        """Return the conversation if it exists, is owned by *user_id* and has
+        not expired. Refreshes its idle timer."""
+        with self._lock:
+            self._evict_idle()
+            conversation = self._items.get(conversation_id)
+            if conversation is None or conversation.user_id != user_id:
+                return None
+            conversation.last_used_at = time.monotonic()
+            self._items.move_to_end(conversation_id)
+            return conversation
+
+    def record_turn(
+        self,
+        conversation: Conversation,
+        question: str,
+        schema: str | None,
+        vql: str | None,
+        result_answer: str | None,
+    ) -> None:
+        """Store the outcome of a turn: pin the schema (first turn only) and
+        keep the last VQL plus a compact summary of the result."""
+        with self._lock:
+            if conversation.id not in self._items:
+                return
+            self._total_chars -= conversation.size()
+            if conversation.schema is None and schema:
+                conversation.schema = schema[:MAX_SCHEMA_CHARS]
+            conversation.last_question = question
+            conversation.last_vql = vql
+            conversation.last_summary = _summarize(result_answer)
+            conversation.turns += 1
+            conversation.last_used_at = time.monotonic()
+            self._total_chars += conversation.size()
+            self._items.move_to_end(conversation.id)
+            self._evict_over_budget()
+
+    def delete(self, conversation_id: str, user_id: int) -> bool:
+        with self._lock:
+            conversation = self._items.get(conversation_id)
+            if conversation is None or conversation.user_id != user_id:
+                return False
+            self._remove(conversation_id)
+            return True
+
+    # -- internal helpers (call with the lock held) --------------------------
+
+    def _remove(self, conversation_id: str) -> None:
+        conversation = self._items.pop(conversation_id)
+        self._total_chars -= conversation.size()
+
+    def _evict_idle(self) -> None:
+        deadline = time.monotonic() - self.idle_timeout
+        # Items are kept in LRU order, so the idle ones are at the front
+        while self._items:
+            oldest_id, oldest = next(iter(self._items.items()))
+            if oldest.last_used_at > deadline:
+                break
+            self._remove(oldest_id)
+
+    def _evict_over_budget(self) -> None:
+        while self._items and (
+            len(self._items) > self.max_conversations
+            or self._total_chars > self.max_total_chars
+        ):
+            self._remove(next(iter(self._items)))
+
+
+class SharedConversationStore:
+    """ConversationStore over the shared cache: one JSON entry per
+    conversation, whose TTL is renewed on every use.  A cache failure
+    loses the conversation (get returns None), like an expired one."""
+
+    def __init__(
+        self,
+        cache: CacheBackend = shared_cache,
+        idle_timeout: float = IDLE_TIMEOUT_SECONDS,
+    ):
+        self.cache = cache
+        self.idle_timeout = idle_timeout
+
+    @staticmethod
+    def _key(conversation_id: str) -> str:
+        return f"conversation:{conversation_id}"
+
+    def _save(self, conversation: Conversation) -> None:
+        try:
+            self.cache.set(
+                self._key(conversation.id),
+                json.dumps(dataclasses.asdict(conversation)),
+                ttl=self.idle_timeout,
+            )
+        except CacheError as exc:
+            logger.warning(
+                "[Conversations] Could not store %s: %s", conversation.id, exc
+            )
+
+    def _load(self, conversation_id: str, user_id: int) -> Conversation | None:
+        try:
+            data = self.cache.get(self._key(conversation_id))
+        except CacheError as exc:
+            logger.warning(
+                "[Conversations] Could not load %s: %s", conversation_id, exc
+            )
+            return None
+        if data is None:
+            return None
+        conversation = Conversation(**json.loads(data))
+        return conversation if conversation.user_id == user_id else None
+
+    def create(self, user_id: int) -> Conversation:
+        conversation = Conversation(id=uuid.uuid4().hex, user_id=user_id)
+        self._save(conversation)
+        return conversation
+
+    def get(self, conversation_id: str, user_id: int) -> Conversation | None:
+        """Return the conversation if it exists, is owned by *user_id* and has
+        not expired. Refreshes its idle timer."""
+        conversation = self._load(conversation_id, user_id)
+        if conversation is not None:
+            self._save(conversation)
+        return conversation
+
+    def record_turn(
+        self,
+        conversation: Conversation,
+        question: str,
+        schema: str | None,
+        vql: str | None,
+        result_answer: str | None,
+    ) -> None:
+        """ConversationStore.record_turn; the last turn to finish wins."""
+        if conversation.schema is None and schema:
+            conversation.schema = schema[:MAX_SCHEMA_CHARS]
+        conversation.last_question = question
+        conversation.last_vql = vql
+        conversation.last_summary = _summarize(result_answer)
+        conversation.turns += 1
+        self._save(conversation)
+
+    def delete(self, conversation_id: str, user_id: int) -> bool:
+        if self._load(conversation_id, user_id) is None:
+            return False
+        try:
+            self.cache.delete(self._key(conversation_id))
+        except CacheError as exc:
+            logger.warning(
+                "[Conversations] Could not delete %s: %s", conversation_id, exc
+            )
+            return False
+        return True
+
+
+def open_conversation_store() -> ConversationStore | SharedConversationStore:
+    """The in-process store for a memory:// CACHE_URL, else the shared one."""
+    if isinstance(shared_cache, MemoryCache):
+        return ConversationStore()
+    return SharedConversationStore()
+
+
+def _summarize(result_answer: str | None) -> str | None:
+    """Truncate a data-phase answer to a compact summary for follow-ups."""
+    if not result_answer:
+        return None
+    if len(result_answer) <= MAX_SUMMARY_CHARS:
+        return result_answer
+    return result_answer[:MAX_SUMMARY_CHARS].rstrip() + "\n… (truncated)"
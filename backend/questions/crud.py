@@ -1,8 +1,24 @@
+from datetime import datetime
+
+from sqlalchemy import and_, delete, exists, or_, update
 from sqlmodel import Session
 from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from .models import Folder, Question
+from .blobs import encode_answer, store_answer, with_answers
+from .ids import allocate_question_id
+from .models import Folder, Question, QuestionArchive
 from .schemas import FolderCreate, FolderUpdate, QuestionCreate
+from .rollups import record_like_changes, record_question
+from .search import index_question, unindex_questions
+from .similarity import options_key, question_index
+
+
+# Every mutation is a single statement predicated on the owner
+# (UPDATE/DELETE ... WHERE id = ? AND user_id = ? RETURNING ...): a foreign or
+# missing row simply isn't affected and the function returns None/False, so
+# callers need no prior SELECT to check ownership and no refresh afterwards.
 
 
 # ── Folder CRUD ─────────────────────────────────────────────────────────────
@@ -12,7 +28,6 @@ def create_folder(session: Session, folder_in: FolderCreate, owner_id: int) -> F
     folder = Folder(name=folder_in.name, user_id=owner_id)
     session.add(folder)
     session.commit()
-    session.refresh(folder)
     return folder
 
 
@@ -22,46 +37,45 @@ def get_folders_by_user(session: Session, user_id: int) -> list[Folder]:
 
 
 def update_folder(
-    session: Session, folder_id: int, folder_in: FolderUpdate
+    session: Session, folder_id: int, user_id: int, folder_in: FolderUpdate
 ) -> Folder | None:
-    folder = session.get(Folder, folder_id)
-    if folder is None:
-        return None
-    if folder_in.name is not None:
-        folder.name = folder_in.name
-    session.add(folder)
+    """Rename a folder owned by *user_id*; None if there is no such folder."""
+    if folder_in.name is None:
+        return session.exec(
+            select(Folder).where(Folder.id == folder_id, Folder.user_id == user_id)
+        ).first()
+    folder = session.exec(
+        update(Folder)
+        .where(Folder.id == folder_id, Folder.user_id == user_id)
+        .values(name=folder_in.name)
+        .returning(Folder)
+    ).scalars().first()
     session.commit()
-    session.refresh(folder)
     return folder
 
 
-def delete_folder(session: Session, folder_id: int) -> bool:
-    """Delete a folder and un-assign its questions (set folder_id = None)."""
-    folder = session.get(Folder, folder_id)
-    if folder is None:
-        return False
-    # un-assign questions that belong to this folder
-    questions = session.exec(
-        select(Question).where(Question.folder_id == folder_id)
-    ).all()
-    for q in questions:
-        q.folder_id = None
-        session.add(q)
-    session.delete(folder)
-    session.commit()
-    return True
+def delete_folder(session: Session, folder_id: int, user_id: int) -> bool:
+    """Delete a folder owned by *user_id* and un-assign its questions
+    (set folder_id = None). False if there is no such folder."""
+    return bool(delete_folders(session, user_id, [folder_id]))
 
 
 # ── Question CRUD ───────────────────────────────────────────────────────────
 
 
 def create_question(
-    session: Session, question_in: QuestionCreate, owner_id: int
+    session: Session,
+    question_in: QuestionCreate,
+    owner_id: int,
+    execution_data: bytes | None = None,
+    encoded_answer: tuple | None = None,
 ) -> Question:
-    # build the ORM object, carrying over any provided metric fields
+    # build the ORM object, carrying over any provided metric fields.  The id
+    # comes from id_sequence, shared with the write-behind history writer.
     question = Question(
+        id=allocate_question_id(session.connection()),
         title=question_in.title,
-        answer=question_in.answer,
+        **store_answer(session.connection(), question_in.answer, encoded_answer),
         user_id=owner_id,
         folder_id=question_in.folder_id,
         restrictions=question_in.restrictions,
@@ -69,53 +83,522 @@ def create_question(
         used_tokens=question_in.used_tokens,
         date_time=question_in.date_time,
         model_llm=question_in.model_llm,
+        exclude_user_info=question_in.exclude_user_info,
+        execution_data=execution_data,
     )
     session.add(question)
+    session.flush()
+    index_question(session, question, answer=question_in.answer)
+    record_question(session, question)
     session.commit()
-    session.refresh(question)
+    question_index.add(question)
     return question
 
 
-def get_questions_by_user(session: Session, user_id: int) -> list[Question]:
-    """Return all questions for a given user id."""
+def get_question(
+    session: Session, question_id: int, user_id: int | None = None
+) -> Question | None:
+    """Return a single question by its id, only if owned by *user_id* when given.
+    Its answer may be stored out of line: use get_question_answer for the body."""
+    if user_id is None:
+        return session.get(Question, question_id)
+    return session.exec(
+        select(Question).where(Question.id == question_id, Question.user_id == user_id)
+    ).first()
+
+
+def get_questions_by_user(session: Session, user_id: int) -> list[dict]:
+    """Return all questions for a given user id, with their answer bodies."""
     statement = select(Question).where(Question.user_id == user_id)
     results = session.exec(statement).all()
-    return results
+    return with_answers(
+        session.connection(),
+        [question.model_dump(exclude={"execution_data"}) for question in results],
+    )
 
 
-def update_question_like(
-    session: Session, question_id: int, like: bool
-) -> Question | None:
-    """Update the like field of a question."""
-    question = session.get(Question, question_id)
-    if question is None:
+def get_question_page(
+    session: Session,
+    user_id: int,
+    limit: int,
+    after: tuple[datetime, int] | None = None,
+    folder_id: int | None = None,
+) -> list[tuple]:
+    """Return up to *limit* (id, title, folder_id, like, model_llm, date_time)
+    rows of a user's questions, newest first, strictly after the keyset
+    *after* = (date_time, id) of the previous page's last row.
+
+    Only the listed columns are read (never the answer body) and the
+    (user_id, date_time) index is walked from the cursor, so the cost per
+    page does not depend on how far into the history it is."""
+    statement = select(
+        Question.id,
+        Question.title,
+        Question.folder_id,
+        Question.like,
+        Question.model_llm,
+        Question.date_time,
+    ).where(Question.user_id == user_id)
+    if folder_id is not None:
+        statement = statement.where(Question.folder_id == folder_id)
+    if after is not None:
+        after_date_time, after_id = after
+        statement = statement.where(
+            or_(
+                Question.date_time < after_date_time,
+                and_(Question.date_time == after_date_time, Question.id < after_id),
+            )
+        )
+    statement = statement.order_by(
+        Question.date_time.desc(), Question.id.desc()
+    ).limit(limit)
+    return list(session.exec(statement).all())
+
+
+def get_question_answer(
+    session: Session, question_id: int, user_id: int
+) -> dict | None:
+    """Return {id, answer, restrictions} of a question owned by *user_id*,
+    or None. Reads only those columns (and the answer blob, if any)."""
+    statement = select(
+        Question.id, Question.answer, Question.answer_ref, Question.restrictions
+    ).where(Question.id == question_id, Question.user_id == user_id)
+    row = session.exec(statement).first()
+    if row is None:
         return None
-    question.like = like
-    session.add(question)
+    return with_answers(session.connection(), [dict(row._mapping)])[0]
+
+
+def get_reusable_answer(
+    session: Session,
+    question_id: int,
+    user_id: int,
+    llm_model: str | None,
+    restrictions: str | None,
+    exclude_user_info: bool,
+) -> dict | None:
+    """get_question_answer for a near-duplicate found by question_index, or
+    None unless the DB still agrees: the index of this worker may lag behind
+    changes made by the others (dislike, regenerated answer, deletion)."""
+    statement = select(
+        Question.id,
+        Question.answer,
+        Question.answer_ref,
+        Question.restrictions,
+        Question.model_llm,
+        Question.exclude_user_info,
+    ).where(
+        Question.id == question_id,
+        Question.user_id == user_id,
+        Question.like.is_(True),
+        Question.feedback_at.is_not(None),
+    )
+    row = session.exec(statement).first()
+    if row is None or options_key(
+        row.model_llm, row.restrictions, row.exclude_user_info
+    ) != options_key(llm_model, restrictions, exclude_user_info):
+        return None
+    return with_answers(session.connection(), [dict(row._mapping)])[0]
+
+
+def update_question_like(
+    session: Session, question_id: int, user_id: int, like: bool
+):
+    """Update the like field of a question owned by *user_id* and record when
+    the user gave this feedback. Returns the (id, like) row, or None."""
+    now = datetime.utcnow()
+    changed = session.exec(
+        update(Question)
+        .where(
+            Question.id == question_id,
+            Question.user_id == user_id,
+            Question.like != like,
+        )
+        .values(like=like, feedback_at=now)
+        .returning(
+            Question.id,
+            Question.like,
+            Question.date_time,
+            Question.model_llm,
+            Question.user_id,
+        )
+        .execution_options(synchronize_session=False)
+    ).first()
+    if changed is None:
+        # Already set to *like* (or not theirs): the rollups are unchanged,
+        # but a default like becomes an explicit one
+        changed = session.exec(
+            update(Question)
+            .where(Question.id == question_id, Question.user_id == user_id)
+            .values(feedback_at=now)
+            .returning(Question.id, Question.like)
+            .execution_options(synchronize_session=False)
+        ).first()
+    else:
+        record_like_changes(session, [changed], like)
     session.commit()
-    session.refresh(question)
-    return question
+    if changed is not None:
+        question_index.set_like(question_id, like)
+    return changed
 
 
-def delete_question(session: Session, question_id: int) -> bool:
-    """Delete a question by its id."""
-    question = session.get(Question, question_id)
-    if question is None:
-        return False
-    session.delete(question)
+def update_question_answer(
+    session: Session,
+    question_id: int,
+    user_id: int,
+    answer: str,
+    model_llm: str | None = None,
+    execution_data: bytes | None = None,
+    exclude_user_info: bool = False,
+    encoded_answer: tuple | None = None,
+):
+    """Replace the answer of a question owned by *user_id* with a regenerated
+    report. execution_data is only overwritten when new phase payloads are
+    given. The user has not liked the new answer yet (feedback_at is
+    cleared). Returns the updated (id, user_id, title, answer, restrictions,
+    model_llm) row, or None."""
+    # The search entry being replaced, as it was indexed
+    previous = session.exec(
+        select(
+            Question.title, Question.answer, Question.answer_ref, Question.restrictions
+        ).where(Question.id == question_id, Question.user_id == user_id)
+    ).first()
+    if previous is None:
+        return None
+    previous = with_answers(session.connection(), [dict(previous._mapping)])[0]
+    values = store_answer(session.connection(), answer, encoded_answer)
+    values["feedback_at"] = None
+    values["exclude_user_info"] = exclude_user_info
+    if model_llm is not None:
+        values["model_llm"] = model_llm
+    if execution_data is not None:
+        values["execution_data"] = execution_data
+    row = session.exec(
+        update(Question)
+        .where(Question.id == question_id, Question.user_id == user_id)
+        .values(**values)
+        .returning(
+            Question.id,
+            Question.user_id,
+            Question.title,
+            Question.answer,
+            Question.restrictions,
+            Question.model_llm,
+        )
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row is not None:
+        index_question(session, row, answer=answer, previous=previous)
     session.commit()
-    return True
+    if row is not None:
+        question_index.set_answer(
+            question_id, row.model_llm, row.restrictions, exclude_user_info
+        )
+    return row
+
+
+def delete_question(session: Session, question_id: int, user_id: int) -> bool:
+    """Delete a question owned by *user_id*. False if there is no such question."""
+    return bool(delete_questions(session, user_id, [question_id]))
 
 
 def move_question_to_folder(
-    session: Session, question_id: int, folder_id: int | None
+    session: Session, question_id: int, user_id: int, folder_id: int | None
 ) -> Question | None:
-    """Move a question into a folder, or remove it from any folder (folder_id=None)."""
-    question = session.get(Question, question_id)
-    if question is None:
-        return None
-    question.folder_id = folder_id
-    session.add(question)
+    """Move a question of *user_id* into one of their folders, or remove it
+    from any folder (folder_id=None). None if either isn't theirs."""
+    statement = update(Question).where(
+        Question.id == question_id, Question.user_id == user_id
+    )
+    if folder_id is not None:
+        statement = statement.where(
+            exists().where(Folder.id == folder_id, Folder.user_id == user_id)
+        )
+    question = session.exec(
+        statement.values(folder_id=folder_id).returning(Question)
+    ).scalars().first()
     session.commit()
-    session.refresh(question)
     return question
+
+
+# ── Bulk operations ─────────────────────────────────────────────────────────
+# Each runs as one ownership-scoped UPDATE/DELETE in a single transaction:
+# ids that don't exist or belong to another user are simply not affected.
+
+
+def move_questions_to_folder(
+    session: Session, user_id: int, question_ids: list[int], folder_id: int | None
+) -> list[int]:
+    """Move the given questions of *user_id* into *folder_id* (None = out of
+    any folder). The folder must belong to the same user. Returns the ids
+    that were moved."""
+    statement = update(Question).where(
+        Question.id.in_(question_ids), Question.user_id == user_id
+    )
+    if folder_id is not None:
+        statement = statement.where(
+            exists().where(Folder.id == folder_id, Folder.user_id == user_id)
+        )
+    moved = session.exec(
+        statement.values(folder_id=folder_id)
+        .returning(Question.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    session.commit()
+    return list(moved)
+
+
+def set_questions_like(
+    session: Session, user_id: int, question_ids: list[int], like: bool
+) -> list[int]:
+    """Set the like value of the given questions of *user_id* and record when
+    the user gave this feedback. Returns the ids whose value changed."""
+    changed = session.exec(
+        update(Question)
+        .where(
+            Question.id.in_(question_ids),
+            Question.user_id == user_id,
+            Question.like != like,
+        )
+        .values(like=like)
+        .returning(
+            Question.id, Question.date_time, Question.model_llm, Question.user_id
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+    record_like_changes(session, changed, like)
+    # Unchanged ones included: a default like becomes an explicit one
+    rated = session.exec(
+        update(Question)
+        .where(Question.id.in_(question_ids), Question.user_id == user_id)
+        .values(feedback_at=datetime.utcnow())
+        .returning(Question.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    session.commit()
+    for question_id in rated:
+        question_index.set_like(question_id, like)
+    return [row.id for row in changed]
+
+
+def delete_questions(
+    session: Session, user_id: int, question_ids: list[int]
+) -> list[int]:
+    """Delete the given questions of *user_id* and their search entries,
+    archived ones included. Returns the ids that were deleted."""
+    rows = session.exec(
+        delete(Question)
+        .where(Question.id.in_(question_ids), Question.user_id == user_id)
+        .returning(
+            Question.id,
+            Question.user_id,
+            Question.title,
+            Question.answer,
+            Question.answer_ref,
+            Question.restrictions,
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+    # The blobs are only collected later, so the bodies can still be read
+    unindex_questions(
+        session,
+        with_answers(session.connection(), [dict(row._mapping) for row in rows]),
+    )
+    archived = session.exec(
+        delete(QuestionArchive)
+        .where(
+            QuestionArchive.id.in_(question_ids), QuestionArchive.user_id == user_id
+        )
+        .returning(QuestionArchive.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    session.commit()
+    for row in rows:
+        question_index.remove(row.id)
+    return [row.id for row in rows] + list(archived)
+
+
+def delete_folders(session: Session, user_id: int, folder_ids: list[int]) -> list[int]:
+    """Delete the given folders of *user_id*; their questions, archived ones
+    included, are un-assigned, not deleted. Returns the ids of the deleted
+    folders."""
+    owned = select(Folder.id).where(Folder.id.in_(folder_ids), Folder.user_id == user_id)
+    for model in (Question, QuestionArchive):
+        session.exec(
+            update(model)
+            .where(model.folder_id.in_(owned))
+            .values(folder_id=None)
+            .execution_options(synchronize_session=False)
+        )
+    deleted = session.exec(
+        delete(Folder)
+        .where(Folder.id.in_(folder_ids), Folder.user_id == user_id)
+        .returning(Folder.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    session.commit()
+    return list(deleted)
+
+
+# ── Async variants ──────────────────────────────────────────────────────────
+# Used by the API routes with backend.db.get_async_session.  Each runs the
+# function above with AsyncSession.run_sync, so both paths issue the same
+# statements.  run_sync runs the function on the event loop thread (in a
+# greenlet), awaiting the driver at every statement: the statements
+# themselves (search entries, rollups) run in the driver's thread or the
+# server, but any CPU-bound step would block the loop.  So answers are
+# compressed in the threadpool beforehand (encode_answer), and the
+# similarity index hooks only queue their update (see questions/similarity.py).
+
+
+async def create_folder_async(
+    session: AsyncSession, folder_in: FolderCreate, owner_id: int
+) -> Folder:
+    return await session.run_sync(create_folder, folder_in, owner_id)
+
+
+async def get_folders_by_user_async(
+    session: AsyncSession, user_id: int
+) -> list[Folder]:
+    return await session.run_sync(get_folders_by_user, user_id)
+
+
+async def update_folder_async(
+    session: AsyncSession, folder_id: int, user_id: int, folder_in: FolderUpdate
+) -> Folder | None:
+    return await session.run_sync(update_folder, folder_id, user_id, folder_in)
+
+
+async def delete_folder_async(
+    session: AsyncSession, folder_id: int, user_id: int
+) -> bool:
+    return await session.run_sync(delete_folder, folder_id, user_id)
+
+
+async def create_question_async(
+    session: AsyncSession,
+    question_in: QuestionCreate,
+    owner_id: int,
+    execution_data: bytes | None = None,
+) -> Question:
+    encoded = await run_in_threadpool(encode_answer, question_in.answer)
+    return await session.run_sync(
+        create_question, question_in, owner_id, execution_data, encoded
+    )
+
+
+async def get_question_async(
+    session: AsyncSession, question_id: int, user_id: int | None = None
+) -> Question | None:
+    return await session.run_sync(get_question, question_id, user_id)
+
+
+async def get_questions_by_user_async(
+    session: AsyncSession, user_id: int
+) -> list[dict]:
+    return await session.run_sync(get_questions_by_user, user_id)
+
+
+async def get_question_page_async(
+    session: AsyncSession,
+    user_id: int,
+    limit: int,
+    after: tuple[datetime, int] | None = None,
+    folder_id: int | None = None,
+) -> list[tuple]:
+    return await session.run_sync(get_question_page, user_id, limit, after, folder_id)
+
+
+async def get_question_answer_async(
+    session: AsyncSession, question_id: int, user_id: int
+) -> dict | None:
+    return await session.run_sync(get_question_answer, question_id, user_id)
+
+
+async def get_reusable_answer_async(
+    session: AsyncSession,
+    question_id: int,
+    user_id: int,
+    llm_model: str | None,
+    restrictions: str | None,
+    exclude_user_info: bool,
+) -> dict | None:
+    return await session.run_sync(
+        get_reusable_answer,
+        question_id,
+        user_id,
+        llm_model,
+        restrictions,
+        exclude_user_info,
+    )
+
+
+async def update_question_like_async(
+    session: AsyncSession, question_id: int, user_id: int, like: bool
+):
+    return await session.run_sync(update_question_like, question_id, user_id, like)
+
+
+async def update_question_answer_async(
+    session: AsyncSession,
+    question_id: int,
+    user_id: int,
+    answer: str,
+    model_llm: str | None = None,
+    execution_data: bytes | None = None,
+    exclude_user_info: bool = False,
+):
+    encoded = await run_in_threadpool(encode_answer, answer)
+    return await session.run_sync(
+        update_question_answer,
+        question_id,
+        user_id,
+        answer,
+        model_llm,
+        execution_data,
+        exclude_user_info,
+        encoded,
+    )
+
+
+async def delete_question_async(
+    session: AsyncSession, question_id: int, user_id: int
+) -> bool:
+    return await session.run_sync(delete_question, question_id, user_id)
+
+
+async def move_question_to_folder_async(
+    session: AsyncSession, question_id: int, user_id: int, folder_id: int | None
+) -> Question | None:
+    return await session.run_sync(
+        move_question_to_folder, question_id, user_id, folder_id
+    )
+
+
+async def move_questions_to_folder_async(
+    session: AsyncSession,
+    user_id: int,
+    question_ids: list[int],
+    folder_id: int | None,
+) -> list[int]:
+    return await session.run_sync(
+        move_questions_to_folder, user_id, question_ids, folder_id
+    )
+
+
+async def set_questions_like_async(
+    session: AsyncSession, user_id: int, question_ids: list[int], like: bool
+) -> list[int]:
+    return await session.run_sync(set_questions_like, user_id, question_ids, like)
+
+
+async def delete_questions_async(
+    session: AsyncSession, user_id: int, question_ids: list[int]
+) -> list[int]:
+    return await session.run_sync(delete_questions, user_id, question_ids)
+
+
+async def delete_folders_async(
+    session: AsyncSession, user_id: int, folder_ids: list[int]
+) -> list[int]:
+    return await session.run_sync(delete_folders, user_id, folder_ids)
@@ -0,0 +1,438 @@
+"""Write-behind persistence of /decide results.
+
+/decide used to insert the question, its search entry and its rollups on the
+request path, so its latency included waiting for the database's single
+writer.  With the writer enabled it instead:
+
+1. takes an id from a block reserved in id_sequence (hi/lo, questions/ids.py),
+2. appends the row to a local append-only journal, and
+3. queues it and returns the id right away.
+
+A background thread inserts queued questions in batches of up to
+HISTORY_BATCH_SIZE, one transaction per batch (rows, answer blobs, search
+entries and rollups), and empties the journal once everything in it is
+committed.
+
+Journals are per process (``<HISTORY_JOURNAL_DIR>/<pid>.journal``, held with
+an exclusive lock while the process lives).  On start the writer replays the
+journals of processes that are gone, skipping rows that did reach the
+database, so a crash loses nothing that was acknowledged.  Lines are flushed
+to the OS on every submit, which survives a process crash; set
+HISTORY_JOURNAL_FSYNC=1 to also survive power loss (same trade-off as
+SQLITE_SYNCHRONOUS=NORMAL vs FULL).
+
+Reads of a user's questions first wait for the user's queued rows: those of
+this process, and those still in the journals of the other workers (so
+HISTORY_JOURNAL_DIR must be shared by all the workers, as it is by default
+on one host).
+
+A batch that fails is retried row by row.  Rows that still fail go to
+``<HISTORY_JOURNAL_DIR>/dead-letter.jsonl`` (journal lines: rename a copy
+to ``*.journal`` to replay it once the cause is fixed), unless every row
+failed on the database itself (locked, unreachable): then the batch is
+retried after a pause.
+
+Disable with HISTORY_WRITE_BEHIND=0 to insert synchronously again.
+"""
+
+import asyncio
+import base64
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+
+try:  # optional: without it, every other journal is assumed abandoned
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+from .. import db
+from .blobs import store_answers
+from .ids import IdBlock
+from .models import Question
+from .rollups import record_questions
+from .schemas import QuestionCreate
+from .search import index_new_questions
+from .similarity import question_index
+
+logger = logging.getLogger(__name__)
+
+HISTORY_JOURNAL_DIR = os.environ.get(
+    "HISTORY_JOURNAL_DIR", os.path.join(db.BASE_DIR, "journal")
+)
+HISTORY_BATCH_SIZE = int(os.environ.get("HISTORY_BATCH_SIZE", "200"))
+# How long the writer waits for a batch to fill before writing what it has
+HISTORY_FLUSH_INTERVAL_MS = float(os.environ.get("HISTORY_FLUSH_INTERVAL_MS", "50"))
+HISTORY_ID_BLOCK = int(os.environ.get("HISTORY_ID_BLOCK", "100"))
+HISTORY_JOURNAL_FSYNC = os.environ.get("HISTORY_JOURNAL_FSYNC", "0") == "1"
+# Upper bound on how long a read waits for the user's queued writes
+HISTORY_WAIT_TIMEOUT = float(os.environ.get("HISTORY_WAIT_TIMEOUT", "5"))
+
+# Back-off after a failed batch (e.g. the database is locked for too long)
+_RETRY_SECONDS = 1.0
+# How often a read waiting for other workers' queued rows checks again
+_POLL_SECONDS = 0.02
+# Start of a journal line (_encode puts the id first)
+_RECORD_ID = re.compile(r'^\{"id":(\d+),')
+
+
+def _encode(
+    question_id: int,
+    question_in: QuestionCreate,
+    owner_id: int,
+    execution_data: bytes | None,
+) -> dict:
+    return {
+        "id": question_id,
+        "title": question_in.title,
+        "answer": question_in.answer,
+        "user_id": owner_id,
+        "folder_id": question_in.folder_id,
+        "restrictions": question_in.restrictions,
+        "time_out": question_in.time_out,
+        "used_tokens": question_in.used_tokens,
+        "date_time": (question_in.date_time or datetime.utcnow()).isoformat(),
+        "model_llm": question_in.model_llm,
+        "exclude_user_info": question_in.exclude_user_info,
+        "execution_data": (
+            base64.b64encode(execution_data).decode("ascii")
+            if execution_data is not None
+            else None
+        ),
+    }
+
+
+def _decode(record: dict) -> Question:
+    values = dict(record)
+    values["date_time"] = datetime.fromisoformat(values["date_time"])
+    if values["execution_data"] is not None:
+        values["execution_data"] = base64.b64decode(values["execution_data"])
+    return Question(**values)
+
+
+def _read_journal(path: str) -> list[dict]:
+    records = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Torn last line of a crash: that submit never returned
+                logger.warning("[HistoryWriter] Skipping damaged line in %s", path)
+    return records
+
+
+class HistoryWriter:
+    """Queues questions for batched background inserts (see module
+    docstring)."""
+
+    def __init__(self, engine=None, journal_dir: str = HISTORY_JOURNAL_DIR):
+        self.enabled = os.environ.get("HISTORY_WRITE_BEHIND", "1") == "1"
+        self.engine = engine
+        self.journal_dir = journal_dir
+        self._ids = IdBlock(Question.__table__, HISTORY_ID_BLOCK)
+        self._cond = threading.Condition()
+        self._queue: deque[dict] = deque()
+        self._in_flight = 0
+        self._pending_users: Counter = Counter()
+        self._urgent = False
+        self._stopping = False
+        self._journal = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def journal_file(self) -> str:
+        return os.path.join(self.journal_dir, f"{os.getpid()}.journal")
+
+    @property
+    def dead_letter_file(self) -> str:
+        return os.path.join(self.journal_dir, "dead-letter.jsonl")
+
+    # -----------------------------
+    # WRITING
+    # -----------------------------
+    def _insert(self, records: list[dict]) -> list[Question]:
+        """Insert *records* with their search entries and rollups in one
+        transaction."""
+        questions = [_decode(record) for record in records]
+        answers = [question.answer for question in questions]
+        with Session(self.engine, expire_on_commit=False) as session:
+            stored = store_answers(session.connection(), answers)
+            for question, values in zip(questions, stored):
+                question.sqlmodel_update(values)
+            session.add_all(questions)
+            session.flush()
+            index_new_questions(session, questions, answers)
+            record_questions(session, questions)
+            session.commit()
+        return questions
+
+    def _take_batch(self) -> list[dict]:
+        """Wait for queued records; returns [] once stopped and drained."""
+        with self._cond:
+            while not self._queue and not self._stopping:
+                self._cond.wait()
+            deadline = time.monotonic() + HISTORY_FLUSH_INTERVAL_MS / 1000
+            while (
+                len(self._queue) < HISTORY_BATCH_SIZE
+                and not (self._urgent or self._stopping)
+                and (remaining := deadline - time.monotonic()) > 0
+            ):
+                self._cond.wait(remaining)
+            batch = [
+                self._queue.popleft()
+                for _ in range(min(HISTORY_BATCH_SIZE, len(self._queue)))
+            ]
+            self._in_flight = len(batch)
+            self._urgent = False
+            return batch
+
+    def _dead_letter(self, record: dict, exc: Exception) -> None:
+        logger.error(
+            "[HistoryWriter] Question %s cannot be written, moved to %s: %s",
+            record.get("id"),
+            self.dead_letter_file,
+            exc,
+        )
+        with open(self.dead_letter_file, "a", encoding="utf-8") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+            fh.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def _write(self, records: list[dict]) -> tuple[list[Question], list[dict]]:
+        """Insert *records*, row by row if the batch fails.  Returns the
+        inserted questions and the records to retry later (all of them when
+        the database itself failed); the others go to the dead-letter file."""
+        try:
+            return self._insert(records), []
+        except Exception as exc:
+            logger.error(
+                "[HistoryWriter] Writing %d questions failed: %s", len(records), exc
+            )
+            failed = [(records[0], exc)] if len(records) == 1 else []
+        written = []
+        if not failed:
+            for record in records:
+                try:
+                    written += self._insert([record])
+                except Exception as exc:
+                    failed.append((record, exc))
+        if not written and all(isinstance(exc, OperationalError) for _, exc in failed):
+            return [], [record for record, _ in failed]
+        for record, exc in failed:
+            self._dead_letter(record, exc)
+        return written, []
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            questions, retry = self._write(batch)
+            for question in questions:
+                question_index.add(question)
+            with self._cond:
+                self._in_flight = 0
+                self._queue.extendleft(reversed(retry))
+                retried = {record["id"] for record in retry}
+                for record in batch:
+                    if record["id"] not in retried:
+                        self._pending_users[record["user_id"]] -= 1
+                self._pending_users += Counter()  # drop zero counts
+                if not self._queue and self._journal is not None:
+                    # Everything journaled is committed (or dead-lettered)
+                    self._journal.seek(0)
+                    self._journal.truncate()
+                self._cond.notify_all()
+            if retry:
+                logger.error(
+                    "[HistoryWriter] Database unavailable, retrying %d questions",
+                    len(retry),
+                )
+                time.sleep(_RETRY_SECONDS)
+
+    def submit(
+        self,
+        question_in: QuestionCreate,
+        owner_id: int,
+        execution_data: bytes | None = None,
+    ) -> int:
+        """Journal and queue a new question; returns its id. Blocking
+        (journal append, and a short transaction once per id block)."""
+        question_id = self._ids.next_id(self.engine)
+        record = _encode(question_id, question_in, owner_id, execution_data)
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._cond:
+            self._journal.write(line)
+            self._journal.flush()
+            if HISTORY_JOURNAL_FSYNC:
+                os.fsync(self._journal.fileno())
+            self._queue.append(record)
+            self._pending_users[owner_id] += 1
+            self._cond.notify_all()
+        return question_id
+
+    def _busy_journals(self) -> list[str]:
+        """Non-empty journals of the other processes."""
+        paths = []
+        for path in glob.glob(os.path.join(self.journal_dir, "*.journal")):
+            try:
+                if path != self.journal_file and os.path.getsize(path):
+                    paths.append(path)
+            except OSError:
+                pass  # removed meanwhile
+        return paths
+
+    def _queued_elsewhere(self, user_id: int, paths: list[str]) -> bool:
+        """Whether the journals at *paths* hold questions of *user_id* that
+        are not in the database yet."""
+        # Inside a JSON string the quotes would be escaped
+        marker = f'"user_id":{user_id},'
+        ids = []
+        for path in paths:
+            try:
+                with open(path, encoding="utf-8") as fh:
+                    for line in fh:
+                        if marker in line and (match := _RECORD_ID.match(line)):
+                            ids.append(int(match.group(1)))
+            except OSError:
+                pass
+        if not ids:
+            return False
+        with Session(self.engine) as session:
+            written = session.exec(select(Question.id).where(Question.id.in_(ids)))
+            return len(set(written.all())) < len(set(ids))
+
+    async def wait_for_user(self, user_id: int) -> None:
+        """Return once the questions queued for *user_id*, by this process or
+        another worker, are committed (or after HISTORY_WAIT_TIMEOUT), so
+        reads see what /decide returned."""
+        if not self.running:
+            return
+        deadline = time.monotonic() + HISTORY_WAIT_TIMEOUT
+        if self._pending_users.get(user_id):
+            with self._cond:
+                self._urgent = True
+                self._cond.notify_all()
+            while self._pending_users.get(user_id) and time.monotonic() < deadline:
+                await asyncio.sleep(0.005)
+        paths = self._busy_journals()
+        while (
+            paths
+            and time.monotonic() < deadline
+            and await run_in_threadpool(self._queued_elsewhere, user_id, paths)
+        ):
+            await asyncio.sleep(_POLL_SECONDS)
+            paths = self._busy_journals()
+
+    # -----------------------------
+    # RECOVERY
+    # -----------------------------
+    def _recover(self, path: str) -> None:
+        records = _read_journal(path)
+        written = set()
+        for start in range(0, len(records), HISTORY_BATCH_SIZE):
+            batch = records[start : start + HISTORY_BATCH_SIZE]
+            with Session(self.engine) as session:
+                written.update(
+                    session.exec(
+                        select(Question.id).where(
+                            Question.id.in_([record["id"] for record in batch])
+                        )
+                    ).all()
+                )
+            missing = []
+            for record in batch:
+                if record["id"] not in written:
+                    written.add(record["id"])
+                    missing.append(record)
+            if missing:
+                questions, retry = self._write(missing)
+                for question in questions:
+                    question_index.add(question)
+                if retry:
+                    raise RuntimeError(f"database unavailable for {len(retry)} rows")
+        logger.info(
+            "[HistoryWriter] Replayed %s: %d questions",
+            os.path.basename(path),
+            len(records),
+        )
+
+    def recover(self) -> None:
+        """Replay the journals left behind by processes that are gone."""
+        for path in sorted(glob.glob(os.path.join(self.journal_dir, "*.journal"))):
+            if path == self.journal_file and self._journal is not None:
+                continue
+            with open(path, "a+b") as fh:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        continue  # a live process owns it
+                try:
+                    self._recover(path)
+                except Exception as exc:
+                    # Retried on the next start; this one goes on without it
+                    logger.error(
+                        "[HistoryWriter] Could not replay %s, keeping it: %s",
+                        path,
+                        exc,
+                    )
+                    continue
+                os.remove(path)
+
+    # -----------------------------
+    # LIFECYCLE
+    # -----------------------------
+    def start(self) -> None:
+        """Replay abandoned journals and start the writer thread."""
+        if not self.enabled or self.running:
+            return
+        if self.engine is None:
+            self.engine = db.engine
+        os.makedirs(self.journal_dir, exist_ok=True)
+        self.recover()
+        self._journal = open(self.journal_file, "a", encoding="utf-8")
+        if fcntl is not None:
+            fcntl.flock(self._journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Write everything queued, then stop the thread and remove the
+        journal (it is kept if writes still failed, to be replayed)."""
+        if not self.running:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout=HISTORY_WAIT_TIMEOUT * 6)
+        with self._cond:
+            drained = not self._queue and not self._in_flight
+            self._journal.close()
+            self._journal = None
+        if drained:
+            os.remove(self.journal_file)
+        else:
+            logger.error(
+                "[HistoryWriter] Stopped with unwritten questions; they stay in %s",
+                self.journal_file,
+            )
+
+
+history_writer = HistoryWriter()
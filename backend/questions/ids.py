@@ -0,0 +1,53 @@
+"""Primary keys handed out before the row is inserted.
+
+Rows written behind the request (questions/history_writer.py) need their id
+when the request returns, so question ids come from the id_sequence table
+instead of the database's autoincrement.  Every question insert takes its id
+from here, which is what keeps both paths from colliding.
+"""
+
+import threading
+
+from sqlalchemy import func, select, update
+from sqlalchemy.engine import Connection, Engine
+
+from .models import IdSequence, Question
+
+
+def allocate_ids(connection: Connection, table, count: int) -> int:
+    """Reserve *count* consecutive ids of *table* in one statement and return
+    the first.  Never hands out an id at or below the table's current
+    maximum, so rows inserted some other way cannot collide."""
+    floor = select(func.coalesce(func.max(table.c.id), 0) + 1).scalar_subquery()
+    greatest = func.greatest if connection.dialect.name == "postgresql" else func.max
+    return connection.execute(
+        update(IdSequence)
+        .where(IdSequence.name == table.name)
+        .values(next_id=greatest(IdSequence.next_id, floor) + count)
+        .returning(IdSequence.next_id - count)
+    ).scalar_one()
+
+
+class IdBlock:
+    """Hi/lo allocator: reserves ids of *table* in blocks of *size* (one
+    short transaction per block) and hands them out from memory."""
+
+    def __init__(self, table, size: int):
+        self.table = table
+        self.size = size
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def next_id(self, engine: Engine) -> int:
+        with self._lock:
+            if self._next >= self._end:
+                with engine.begin() as connection:
+                    self._next = allocate_ids(connection, self.table, self.size)
+                self._end = self._next + self.size
+            self._next += 1
+            return self._next - 1
+
+
+def allocate_question_id(connection: Connection) -> int:
+    return allocate_ids(connection, Question.__table__, 1)
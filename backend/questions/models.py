@@ -1,6 +1,7 @@
 from typing import Optional
 from datetime import datetime
 
+from sqlalchemy import Column, Index, LargeBinary, false
 from sqlmodel import Field, SQLModel
 
 
@@ -14,6 +15,8 @@ class Folder(SQLModel, table=True):
     - created_at: UTC timestamp when the folder was created
     """
 
+    __table_args__ = (Index("ix_folder_user_id", "user_id"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(max_length=120)
     user_id: Optional[int] = Field(default=None, foreign_key="user.id")
@@ -28,15 +31,31 @@ class Question(SQLModel, table=True):
     Fields:
     - id: primary key
     - title: the question text asked by the user
-    - answer: the answer returned by the decision engine
+    - answer: the answer returned by the decision engine; empty when the
+      body is stored in answer_blob (see answer_ref)
     - user_id: foreign key linking the question to its owner
     - folder_id: optional folder grouping
     - time_out: total latency of the AI SDK request (seconds)
     - used_tokens: tokens consumed by the LLM
     - date_time: UTC timestamp when the record was created
     - model_llm: name of the LLM model used for the request
+    - execution_data: compressed phase payloads (VQL, rows) used to re-render
+      the report without re-querying the data sources
+    - answer_ref: content hash of the answer body in answer_blob, when it
+      is too large to keep inline (see questions/blobs.py)
+    - answer_size: size of the answer body in bytes (UTF-8)
     """
 
+    # History listings filter by owner and sort by time, folder deletion
+    # filters by folder, and the Grafana panels filter on time ranges.
+    __table_args__ = (
+        Index("ix_question_user_id_date_time", "user_id", "date_time"),
+        Index("ix_question_folder_id", "folder_id"),
+        Index("ix_question_date_time", "date_time"),
+        # Read by the near-duplicate index to pick up other workers' likes
+        Index("ix_question_feedback_at", "feedback_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
     answer: str
@@ -62,3 +81,169 @@ class Question(SQLModel, table=True):
     like: bool = Field(
         default=True, description="User feedback: True=like, False=dislike"
     )
+    feedback_at: Optional[datetime] = Field(
+        default=None,
+        description="When the user last set like; None = like is the default",
+    )
+    exclude_user_info: bool = Field(
+        default=False,
+        # Same default as migration m0007, for rows inserted by raw SQL
+        sa_column_kwargs={"server_default": false()},
+        description="Report generated without the user's profile",
+    )
+
+    # --- stored pipeline output ---------------------------------------------
+    execution_data: Optional[bytes] = Field(
+        default=None,
+        sa_column=Column(LargeBinary, nullable=True),
+        description="zlib-compressed JSON of the metadata/execution phases",
+    )
+    answer_ref: Optional[str] = Field(
+        default=None, max_length=64, description="answer_blob hash of the body"
+    )
+    answer_size: Optional[int] = Field(
+        default=None, description="Answer body size in bytes"
+    )
+
+
+class QuestionArchive(SQLModel, table=True):
+    """A question moved out of the question table by the retention policy
+    (see questions/archive.py). Listing columns stay plain; the bodies are
+    packed into one (optionally compressed) payload.
+
+    Fields:
+    - id, title, user_id, folder_id, like, time_out, used_tokens, date_time,
+      model_llm: as in Question (the id is kept)
+    - archived_at: UTC timestamp when it was archived
+    - codec: "zstd", "zlib" or "none"
+    - payload: JSON of answer, restrictions and execution_data
+    """
+
+    __tablename__ = "question_archive"
+    __table_args__ = (
+        Index("ix_question_archive_user_id_date_time", "user_id", "date_time"),
+    )
+
+    id: int = Field(primary_key=True)
+    title: str
+    user_id: Optional[int] = None
+    folder_id: Optional[int] = None
+    like: bool = True
+    time_out: Optional[float] = None
+    used_tokens: Optional[int] = None
+    date_time: datetime
+    model_llm: Optional[str] = None
+    archived_at: datetime = Field(default_factory=datetime.utcnow)
+    codec: str = Field(max_length=8)
+    payload: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+
+
+class AnswerBlob(SQLModel, table=True):
+    """A compressed answer body, stored once per distinct content.
+
+    Fields:
+    - hash: SHA-256 (hex) of the uncompressed UTF-8 body
+    - codec: "zstd" or "zlib"
+    - size: uncompressed size in bytes
+    - data: compressed body
+    """
+
+    __tablename__ = "answer_blob"
+
+    hash: str = Field(primary_key=True, max_length=64)
+    codec: str = Field(max_length=8)
+    size: int
+    data: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+
+
+class QuestionRollup(SQLModel, table=True):
+    """Per-period aggregate of questions for the Grafana dashboard, kept up
+    to date by create_question / like updates (see questions/rollups.py).
+
+    Fields:
+    - period: "hour" or "day"
+    - period_start: UTC start of the bucket
+    - model_llm: LLM model used ("" when unknown)
+    - user_id: owner of the questions (0 when unknown)
+    - requests: number of questions asked
+    - likes: number of those currently liked
+    - tokens: sum of used_tokens
+    - latency_sum / latency_count: sum and count of the known time_out values
+    - latency_b0 … latency_b9: latency histogram, bin i counts requests with
+      time_out <= LATENCY_BOUNDS[i] (the last bin is everything above)
+    """
+
+    # The primary key starts with (period, period_start), which is what every
+    # dashboard panel filters on.
+    __tablename__ = "question_rollup"
+
+    period: str = Field(primary_key=True, max_length=8)
+    period_start: datetime = Field(primary_key=True)
+    model_llm: str = Field(default="", primary_key=True)
+    user_id: int = Field(default=0, primary_key=True)
+
+    requests: int = 0
+    likes: int = 0
+    tokens: int = 0
+    latency_sum: float = 0.0
+    latency_count: int = 0
+    latency_b0: int = 0
+    latency_b1: int = 0
+    latency_b2: int = 0
+    latency_b3: int = 0
+    latency_b4: int = 0
+    latency_b5: int = 0
+    latency_b6: int = 0
+    latency_b7: int = 0
+    latency_b8: int = 0
+    latency_b9: int = 0
+
+
+class IdSequence(SQLModel, table=True):
+    """Next free primary key of a table, for allocating ids before the row
+    is inserted (see questions/ids.py).
+
+    Fields:
+    - name: table name
+    - next_id: first id not handed out yet
+    """
+
+    __tablename__ = "id_sequence"
+
+    name: str = Field(primary_key=True, max_length=64)
+    next_id: int
+
+
+class TraceSpan(SQLModel, table=True):
+    """One timed step of a traced decision request (see backend/tracing.py).
+
+    Fields:
+    - trace_id: 32 hex digits, one per request (from its X-Request-ID when
+      that is a valid trace id)
+    - span_id / parent_span_id: 16 hex digits; the root span has no parent
+    - question_id: question saved by the request, if any
+    - name: step, e.g. "phase.report" or "ai_sdk.attempt"
+    - start_ms: start as Unix time in milliseconds
+    - duration_ms: duration in milliseconds
+    - status: "ok" or "error"
+    - attributes: JSON object of details (endpoint, attempt, status code, ...)
+    """
+
+    # The Grafana waterfall selects one question's spans
+    __tablename__ = "trace_span"
+    __table_args__ = (
+        Index("ix_trace_span_question_id", "question_id"),
+        Index("ix_trace_span_trace_id", "trace_id"),
+        Index("ix_trace_span_start_ms", "start_ms"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    trace_id: str = Field(max_length=32)
+    span_id: str = Field(max_length=16)
+    parent_span_id: Optional[str] = Field(default=None, max_length=16)
+    question_id: Optional[int] = None
+    name: str = Field(max_length=64)
+    start_ms: float
+    duration_ms: float
+    status: str = Field(default="ok", max_length=8)
+    attributes: Optional[str] = None
@@ -0,0 +1,219 @@
+"""Hourly and daily rollups of the question history (question_rollup).
+
+The Grafana dashboard reads these instead of scanning the question table, so
+panel cost depends on the time range shown, not on the size of the history.
+Rows are upserted in the same transaction as the question write they
+account for.  Rollups count requests served: deleting a question from the
+history does not remove it from the statistics.
+
+Run ``python -m backend.questions.rollups`` to rebuild them from the
+question and question_archive tables (migration m0004 did this once for
+databases that predate the rollups).
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import bindparam, select, union_all, update
+
+from .models import Question, QuestionArchive, QuestionRollup
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram bins latency_b0..latency_b8;
+# latency_b9 counts everything slower.  Percentiles read from the histogram
+# are accurate to the bin: the dashboard reports the bin's upper bound.
+LATENCY_BOUNDS = (1, 2, 5, 10, 20, 30, 60, 120, 300)
+LATENCY_COLUMNS = [f"latency_b{i}" for i in range(len(LATENCY_BOUNDS) + 1)]
+
+KEY_COLUMNS = ["period", "period_start", "model_llm", "user_id"]
+COUNTER_COLUMNS = [
+    "requests",
+    "likes",
+    "tokens",
+    "latency_sum",
+    "latency_count",
+    *LATENCY_COLUMNS,
+]
+
+# Rows per INSERT of several buckets (SQLite caps bound parameters per statement)
+_UPSERT_BATCH = 500
+
+
+def _period_starts(moment: datetime) -> list[tuple[str, datetime]]:
+    hour = moment.replace(minute=0, second=0, microsecond=0)
+    return [("hour", hour), ("day", hour.replace(hour=0))]
+
+
+def _latency_column(time_out: float | None) -> str | None:
+    if time_out is None:
+        return None
+    for column, bound in zip(LATENCY_COLUMNS, LATENCY_BOUNDS):
+        if time_out <= bound:
+            return column
+    return LATENCY_COLUMNS[-1]
+
+
+def _key(period: str, period_start: datetime, model_llm, user_id) -> dict:
+    return {
+        "period": period,
+        "period_start": period_start,
+        "model_llm": model_llm or "",
+        "user_id": user_id or 0,
+    }
+
+
+def _counters(time_out, used_tokens, like) -> dict:
+    counters = dict.fromkeys(COUNTER_COLUMNS, 0)
+    counters["requests"] = 1
+    counters["likes"] = int(bool(like))
+    counters["tokens"] = used_tokens or 0
+    latency_column = _latency_column(time_out)
+    if latency_column is not None:
+        counters["latency_sum"] = time_out
+        counters["latency_count"] = 1
+        counters[latency_column] = 1
+    return counters
+
+
+def _upsert(dialect_name: str, rows: list[dict]):
+    """INSERT the rows, adding their counters to existing buckets."""
+    # Imported here: the PostgreSQL dialect is slow to import and unused on
+    # SQLite (backend/startup.py)
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    statement = insert(QuestionRollup).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=KEY_COLUMNS,
+        set_={
+            column: getattr(QuestionRollup, column) + statement.excluded[column]
+            for column in COUNTER_COLUMNS
+        },
+    )
+
+
+def _aggregate(rows, buckets: dict) -> int:
+    """Add the counters of question-like *rows* (date_time, model_llm,
+    user_id, time_out, used_tokens, like) to *buckets*, keyed by the
+    rollup key tuple. Returns the number of rows."""
+    count = 0
+    for row in rows:
+        count += 1
+        counters = _counters(row.time_out, row.used_tokens, row.like)
+        for period, start in _period_starts(row.date_time):
+            key = tuple(_key(period, start, row.model_llm, row.user_id).values())
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = dict(counters)
+            else:
+                for column, value in counters.items():
+                    bucket[column] += value
+    return count
+
+
+def _upsert_buckets(connection, buckets: dict) -> int:
+    rows = [
+        {**dict(zip(KEY_COLUMNS, key)), **counters}
+        for key, counters in buckets.items()
+    ]
+    for start in range(0, len(rows), _UPSERT_BATCH):
+        connection.execute(
+            _upsert(connection.dialect.name, rows[start : start + _UPSERT_BATCH])
+        )
+    return len(rows)
+
+
+def record_question(session, question: Question) -> None:
+    """Account for a newly created question (call before commit)."""
+    counters = _counters(question.time_out, question.used_tokens, question.like)
+    rows = [
+        {**_key(period, start, question.model_llm, question.user_id), **counters}
+        for period, start in _period_starts(question.date_time)
+    ]
+    session.exec(_upsert(session.get_bind().dialect.name, rows))
+
+
+def record_questions(session, questions: list[Question]) -> None:
+    """Account for several newly created questions (call before commit):
+    one row per bucket touched, however many questions fall into it."""
+    buckets = {}
+    if _aggregate(questions, buckets):
+        _upsert_buckets(session.connection(), buckets)
+
+
+def record_like_changes(session, rows, like: bool) -> None:
+    """Account for questions whose like flag was flipped to *like* (call
+    before commit). *rows* have date_time, model_llm and user_id."""
+    deltas = defaultdict(int)
+    for row in rows:
+        for period, start in _period_starts(row.date_time):
+            key = _key(period, start, row.model_llm, row.user_id)
+            deltas[tuple(key.values())] += 1 if like else -1
+    if not deltas:
+        return
+    # One executemany; bind names must differ from the column names
+    statement = (
+        update(QuestionRollup.__table__)
+        .where(
+            *(
+                getattr(QuestionRollup, column) == bindparam(f"b_{column}")
+                for column in KEY_COLUMNS
+            )
+        )
+        .values(likes=QuestionRollup.likes + bindparam("b_delta"))
+    )
+    session.connection().execute(
+        statement,
+        [
+            {
+                **{f"b_{column}": value for column, value in zip(KEY_COLUMNS, key)},
+                "b_delta": delta,
+            }
+            for key, delta in deltas.items()
+        ],
+    )
+
+
+def backfill(connection) -> int:
+    """Rebuild question_rollup from the question and question_archive tables
+    on *connection* (inside its transaction): archived questions were served
+    too. Returns the number of questions aggregated.
+
+    Writes made while it runs may be counted twice or not at all, so run it
+    with the API stopped (migrations run before the app serves requests)."""
+    buckets = {}
+    result = connection.execute(
+        union_all(
+            *(
+                select(
+                    table.date_time,
+                    table.model_llm,
+                    table.user_id,
+                    table.time_out,
+                    table.used_tokens,
+                    table.like,
+                )
+                for table in (Question, QuestionArchive)
+            )
+        ).execution_options(yield_per=10_000)
+    )
+    questions = _aggregate(result, buckets)
+
+    connection.execute(QuestionRollup.__table__.delete())
+    rows = _upsert_buckets(connection, buckets)
+    logger.info(
+        "Rolled up %d questions into %d question_rollup rows", questions, rows
+    )
+    return questions
+
+
+if __name__ == "__main__":
+    from backend.db import engine, init_db
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    with engine.begin() as connection:
+        backfill(connection)
@@ -1,12 +1,17 @@
+import functools
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from ..db import get_session
+from ..db import get_async_session
 from ..users.auth import get_current_user
 from ..users.models import User
 from .schemas import (
+    BulkResult,
+    ConversationRead,
+    FolderBulkIds,
     FolderCreate,
     FolderRead,
     FolderUpdate,
@@ -17,106 +22,206 @@ from .schemas import (
     DecisionResponse,
     MetadataRequest,
     MetadataResponse,
+    QuestionAnswer,
+    QuestionBulkIds,
+    QuestionBulkLike,
+    QuestionBulkMove,
+    QuestionPage,
+    QuestionSummary,
+    RegenerateRequest,
+    SearchPage,
+    SearchResult,
 )
 from .crud import (
-    create_folder,
-    create_question,
-    delete_folder,
-    delete_question,
-    get_folders_by_user,
-    get_questions_by_user,
-    move_question_to_folder,
-    update_folder,
-    update_question_like,
+    create_folder_async,
+    create_question_async,
+    delete_folder_async,
+    delete_folders_async,
+    delete_question_async,
+    delete_questions_async,
+    get_folders_by_user_async,
+    get_question_async,
+    get_question_answer_async,
+    get_question_page_async,
+    get_questions_by_user_async,
+    get_reusable_answer_async,
+    move_question_to_folder_async,
+    move_questions_to_folder_async,
+    set_questions_like_async,
+    update_folder_async,
+    update_question_answer_async,
+    update_question_like_async,
+)
+from .archive import get_archived_page_async, get_archived_question_async
+from .conversations import open_conversation_store
+from .history_writer import history_writer
+from .search import search_questions_async
+from .similarity import question_index
+from .utils import (
+    decode_cursor,
+    encode_cursor,
+    pack_execution_data,
+    unpack_execution_data,
 )
 from ..decision_engine import GenericDecisionEngine
+from .. import tracing
 
 router = APIRouter(prefix="/questions")
 
 
+async def get_history_user(current_user: User = Depends(get_current_user)) -> User:
+    """get_current_user for endpoints that read or change saved questions:
+    first waits for the user's /decide results still queued in the history
+    writer, so a question id that was returned can be used right away."""
+    await history_writer.wait_for_user(current_user.id)
+    return current_user
+
+
 # ── Folder endpoints ────────────────────────────────────────────────────────
 
 
 @router.post("/folders", response_model=FolderRead)
-def create_folder_route(
+async def create_folder_route(
     folder_in: FolderCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Create a new folder for the authenticated user."""
-    return create_folder(session, folder_in, owner_id=current_user.id)
+    return await create_folder_async(session, folder_in, owner_id=current_user.id)
 
 
 @router.get("/folders", response_model=List[FolderRead])
-def list_folders(
-    session: Session = Depends(get_session),
+async def list_folders(
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Return all folders belonging to the authenticated user."""
-    return get_folders_by_user(session, current_user.id)
+    return await get_folders_by_user_async(session, current_user.id)
 
 
 @router.patch("/folders/{folder_id}", response_model=FolderRead)
-def rename_folder(
+async def rename_folder(
     folder_id: int,
     folder_in: FolderUpdate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Rename a folder. Only the owner may rename."""
-    folder = update_folder(session, folder_id, folder_in)
-    if folder is None or folder.user_id != current_user.id:
+    folder = await update_folder_async(session, folder_id, current_user.id, folder_in)
+    if folder is None:
         raise HTTPException(status_code=404, detail="Folder not found")
     return folder
 
 
 @router.delete("/folders/{folder_id}")
-def remove_folder(
+async def remove_folder(
     folder_id: int,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_history_user),
 ):
     """Delete a folder. Questions inside are un-assigned, not deleted."""
-    folders = get_folders_by_user(session, current_user.id)
-    if not any(f.id == folder_id for f in folders):
+    if not await delete_folder_async(session, folder_id, current_user.id):
         raise HTTPException(status_code=404, detail="Folder not found")
-    delete_folder(session, folder_id)
     return {"status": "ok"}
 
 
 @router.patch("/{question_id}/folder", response_model=QuestionRead)
-def move_to_folder(
+async def move_to_folder(
     question_id: int,
     body: QuestionMoveToFolder,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_history_user),
 ):
     """Move a question into a folder (or remove from folder if folder_id is null)."""
-    question = move_question_to_folder(session, question_id, body.folder_id)
-    if question is None or question.user_id != current_user.id:
-        raise HTTPException(status_code=404, detail="Question not found")
+    question = await move_question_to_folder_async(
+        session, question_id, current_user.id, body.folder_id
+    )
+    if question is None:
+        raise HTTPException(status_code=404, detail="Question or folder not found")
     return question
 
 
+# ── Bulk endpoints ──────────────────────────────────────────────────────────
+# One request and one transaction for any number of items; ids the caller
+# doesn't own are ignored and the affected ids are returned.
+
+
+@router.post("/folders/bulk/delete", response_model=BulkResult)
+async def bulk_remove_folders(
+    body: FolderBulkIds,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_history_user),
+):
+    """Delete several folders. Questions inside are un-assigned, not deleted."""
+    return BulkResult(
+        ids=await delete_folders_async(session, current_user.id, body.folder_ids)
+    )
+
+
+@router.post("/bulk/move", response_model=BulkResult)
+async def bulk_move_to_folder(
+    body: QuestionBulkMove,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_history_user),
+):
+    """Move several questions into a folder (or out of any folder if
+    folder_id is null). Nothing is moved if the folder isn't the caller's."""
+    moved = await move_questions_to_folder_async(
+        session, current_user.id, body.question_ids, body.folder_id
+    )
+    return BulkResult(ids=moved)
+
+
+@router.post("/bulk/like", response_model=BulkResult)
+async def bulk_set_like(
+    body: QuestionBulkLike,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_history_user),
+):
+    """Set the like/dislike value of several questions."""
+    return BulkResult(
+        ids=await set_questions_like_async(
+            session, current_user.id, body.question_ids, body.like
+        )
+    )
+
+
+@router.post("/bulk/delete", response_model=BulkResult)
+async def bulk_remove_questions(
+    body: QuestionBulkIds,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_history_user),
+):
+    """Delete several questions."""
+    return BulkResult(
+        ids=await delete_questions_async(session, current_user.id, body.question_ids)
+    )
+
+
 # ── Question endpoints ──────────────────────────────────────────────────────
 
 
 @router.post("/", response_model=QuestionRead)
-def create(
+async def create(
     question_in: QuestionCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Create a new Question in the database. Owner is taken from the authenticated user."""
-    question = create_question(session, question_in, owner_id=current_user.id)
-    return question
+    question = await create_question_async(
+        session, question_in, owner_id=current_user.id
+    )
+    # The stored row may keep the body out of line (answer_ref)
+    return QuestionRead.model_validate(question).model_copy(
+        update={"answer": question_in.answer}
+    )
 
 
 @router.get("/user/{user_id}", response_model=List[QuestionRead])
-def list_by_user(
+async def list_by_user(
     user_id: int,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_history_user),
 ):
     """Return all questions that belong to the given user id. Only the owner may view their questions."""
     if current_user.id != user_id:
@@ -124,15 +229,134 @@ def list_by_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view these questions",
         )
-    questions = get_questions_by_user(session, user_id)
+    questions = await get_questions_by_user_async(session, user_id)
     return questions
 
 
-engine = GenericDecisionEngine()
+@router.get("/history", response_model=QuestionPage)
+async def list_history(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+    folder_id: int | None = None,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_history_user),
+):
+    """Return one page of the authenticated user's questions, newest first,
+    without answer bodies. Pass next_cursor back as cursor for the next page."""
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Fetch one extra row to know whether another page exists
+    rows = await get_question_page_async(
+        session, current_user.id, limit + 1, after=after, folder_id=folder_id
+    )
+    items = [QuestionSummary.model_validate(row._mapping) for row in rows[:limit]]
+    next_cursor = (
+        encode_cursor(items[-1].date_time, items[-1].id) if len(rows) > limit else None
+    )
+    return QuestionPage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/search", response_model=SearchPage)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10_000),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_history_user),
+):
+    """Full-text search over the authenticated user's questions (title,
+    answer and restrictions), best matches first, with highlighted matches."""
+    rows = await search_questions_async(session, current_user.id, q, limit + 1, offset)
+    items = [SearchResult.model_validate(row) for row in rows[:limit]]
+    next_offset = offset + limit if len(rows) > limit else None
+    return SearchPage(items=items, next_offset=next_offset)
+
+
+@router.get("/{question_id}/answer", response_model=QuestionAnswer)
+async def get_answer(
+    question_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_history_user),
+):
+    """Return the answer body of a single question, fetched on demand. Falls
+    back to the archive for questions moved there by the retention policy."""
+    row = await get_question_answer_async(session, question_id, current_user.id)
+    if row is None:
+        row = await get_archived_question_async(session, question_id, current_user.id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Question not found")
+    return QuestionAnswer.model_validate(row)
+
+
+@router.get("/archive", response_model=QuestionPage)
+async def list_archive(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user),
+):
+    """Return one page of the authenticated user's archived questions, newest
+    first; paginated like /questions/history."""
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    rows = await get_archived_page_async(session, current_user.id, limit + 1, after)
+    items = [QuestionSummary.model_validate(row._mapping) for row in rows[:limit]]
+    next_cursor = (
+        encode_cursor(items[-1].date_time, items[-1].id) if len(rows) > limit else None
+    )
+    return QuestionPage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/archive/{question_id}", response_model=QuestionRead)
+async def get_archived(
+    question_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user),
+):
+    """Return an archived question with its answer, unpacked on demand."""
+    question = await get_archived_question_async(
+        session, question_id, current_user.id
+    )
+    if question is None:
+        raise HTTPException(status_code=404, detail="Question not found")
+    return question
+
+
+# The decision engine makes blocking HTTP calls to the AI SDK: routes call it
+# through run_in_threadpool so it never stalls the event loop, while DB work
+# is awaited on the async session and holds no thread.  It is created on
+# first use rather than at import (see backend/startup.py).
+@functools.cache
+def get_engine() -> GenericDecisionEngine:
+    return GenericDecisionEngine()
+
+
+conversations = open_conversation_store()
+
+
+def _build_user_profile(current_user: User, exclude_user_info: bool) -> dict | None:
+    """Build the user profile dict passed to the decision engine,
+    unless the user opted out of personal info."""
+    if exclude_user_info:
+        return None
+    return {
+        "name": current_user.name,
+        "date_of_birth": (
+            str(current_user.date_of_birth) if current_user.date_of_birth else None
+        ),
+        "gender_identity": current_user.gender_identity,
+        "user_preferences": current_user.user_preferences,
+    }
 
 
 @router.post("/get_metadata", response_model=MetadataResponse)
-def get_metadata(
+async def get_metadata(
     request: MetadataRequest,
     current_user: User = Depends(get_current_user),
 ):
@@ -140,7 +364,9 @@ def get_metadata(
     Returns the schema metadata so the frontend can display it before executing.
     """
     try:
-        result = engine.get_metadata(request.question, datasets=request.datasets)
+        result = await run_in_threadpool(
+            get_engine().get_metadata, request.question, datasets=request.datasets
+        )
 
         if result.get("status") == "error":
             return MetadataResponse(
@@ -162,38 +388,114 @@ def get_metadata(
         )
 
 
+@router.post("/conversations", response_model=ConversationRead)
+async def start_conversation(current_user: User = Depends(get_current_user)):
+    """Start a conversation. Pass the returned id as conversation_id to /decide
+    so follow-up questions reuse the schema and context of previous turns."""
+    conversation = await run_in_threadpool(conversations.create, current_user.id)
+    return ConversationRead(id=conversation.id, turns=0, schema_pinned=False)
+
+
+@router.delete("/conversations/{conversation_id}")
+async def end_conversation(
+    conversation_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    """Discard a conversation and its cached context."""
+    if not await run_in_threadpool(
+        conversations.delete, conversation_id, current_user.id
+    ):
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return {"status": "ok"}
+
+
 @router.post("/decide", response_model=DecisionResponse)
-def decide(
+async def decide(
     request: DecisionRequest,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """Process a user question through the decision engine, persist it in the
     database with the answer, and return the result. If metadata is provided
     (from a prior /get_metadata call), skips the metadata discovery phase."""
     try:
-        # Build user profile dict from the authenticated user,
-        # unless the user opted out of personal info.
-        if request.exclude_user_info:
-            user_profile = None
-        else:
-            user_profile = {
-                "name": current_user.name,
-                "date_of_birth": (
-                    str(current_user.date_of_birth)
-                    if current_user.date_of_birth
-                    else None
-                ),
-                "gender_identity": current_user.gender_identity,
-                "user_preferences": current_user.user_preferences,
-            }
-
-        result = engine.answer(
+        # Near-duplicate detection: a recent answer the user liked, to an
+        # almost identical question asked with the same model and options,
+        # avoids running the whole pipeline again (by default it is only
+        # offered, see DecisionRequest.similar_policy).
+        # Skipped when the request is scoped (metadata, conversation, deepthink)
+        if (
+            request.similar_policy != "off"
+            and request.metadata is None
+            and request.conversation_id is None
+            and not request.deepthink
+        ):
+            with tracing.span("similar.lookup"):
+                match = await run_in_threadpool(
+                    question_index.find_similar,
+                    request.question,
+                    current_user.id,
+                    llm_model=request.llm_model,
+                    restrictions=request.restrictions,
+                    exclude_user_info=request.exclude_user_info,
+                )
+                tracing.annotate(hit=match is not None)
+            if match is not None:
+                similar_id, similarity = match
+                with tracing.span("db.load_similar_answer"):
+                    similar = await get_reusable_answer_async(
+                        session,
+                        similar_id,
+                        current_user.id,
+                        request.llm_model,
+                        request.restrictions,
+                        request.exclude_user_info,
+                    )
+                # Not linked to the question: its trace is the pipeline run
+                # that produced the answer, not this lookup
+                tracing.annotate(similar_question_id=similar_id)
+                if similar is not None and request.similar_policy == "reuse":
+                    return DecisionResponse(
+                        status="success",
+                        answer=similar["answer"],
+                        question_id=similar_id,
+                        similar_question_id=similar_id,
+                        similarity=similarity,
+                    )
+                if similar is not None:
+                    # "offer": let the client decide whether to reuse it
+                    return DecisionResponse(
+                        status="similar",
+                        similar_question_id=similar_id,
+                        similarity=similarity,
+                    )
+
+        user_profile = _build_user_profile(current_user, request.exclude_user_info)
+
+        # Conversation mode: reuse the pinned schema and send only the
+        # previous turn's context instead of rediscovering everything.
+        conversation = None
+        discovered_schema = request.metadata
+        follow_up = None
+        if request.conversation_id:
+            conversation = await run_in_threadpool(
+                conversations.get, request.conversation_id, current_user.id
+            )
+            if conversation is None:
+                raise HTTPException(
+                    status_code=404, detail="Conversation not found or expired"
+                )
+            discovered_schema = discovered_schema or conversation.schema
+            follow_up = conversation.follow_up_context()
+
+        result = await run_in_threadpool(
+            get_engine().answer,
             request.question,
-            discovered_schema=request.metadata,
+            discovered_schema=discovered_schema,
             llm_model=request.llm_model,
             user_profile=user_profile,
             deepthink=request.deepthink,
+            follow_up=follow_up,
         )
 
         if result.get("status") == "error":
@@ -212,7 +514,7 @@ def decide(
         metrics = result.get("metrics", {}) or {}
         time_out = metrics.get("time_out")
         used_tokens = metrics.get("used_tokens")
-        model_llm = metrics.get("model_llm")
+        model_llm = metrics.get("model_llm") or request.llm_model
 
         # Persist the question + answer + metrics so it appears in the user's history
         saved_id = None
@@ -224,16 +526,49 @@ def decide(
                 time_out=time_out,
                 used_tokens=used_tokens,
                 model_llm=model_llm,
+                exclude_user_info=request.exclude_user_info,
+            )
+            execution_data = pack_execution_data(result)
+            if history_writer.running:
+                # Written behind the response (see history_writer)
+                with tracing.span("history.submit"):
+                    saved_id = await run_in_threadpool(
+                        history_writer.submit,
+                        question_in,
+                        current_user.id,
+                        execution_data,
+                    )
+            else:
+                with tracing.span("db.create_question"):
+                    saved = await create_question_async(
+                        session,
+                        question_in,
+                        owner_id=current_user.id,
+                        execution_data=execution_data,
+                    )
+                saved_id = saved.id
+            tracing.set_question_id(saved_id)
+
+        if conversation is not None:
+            execution_phase = result.get("execution_phase", {})
+            await run_in_threadpool(
+                conversations.record_turn,
+                conversation,
+                request.question,
+                schema=result.get("metadata_phase", {}).get("answer"),
+                vql=execution_phase.get("vql"),
+                result_answer=execution_phase.get("answer"),
             )
-            saved = create_question(session, question_in, owner_id=current_user.id)
-            saved_id = saved.id
 
         return DecisionResponse(
             status="success",
             answer=answer_text,
             question_id=saved_id,
+            conversation_id=request.conversation_id,
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -241,31 +576,120 @@ def decide(
         )
 
 
+async def _regenerate(
+    question_id: int,
+    request: RegenerateRequest,
+    session: AsyncSession,
+    current_user: User,
+    deepen: bool,
+) -> DecisionResponse:
+    """Shared implementation of the re-render and deepen endpoints."""
+    tracing.set_question_id(question_id)
+    with tracing.span("db.load_question"):
+        question = await get_question_async(session, question_id, current_user.id)
+    if question is None:
+        raise HTTPException(status_code=404, detail="Question not found")
+
+    execution_data = unpack_execution_data(question.execution_data)
+    if not execution_data:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="No stored execution data for this question; ask it again",
+        )
+
+    try:
+        user_profile = _build_user_profile(current_user, request.exclude_user_info)
+        engine = get_engine()
+        run = engine.deepen if deepen else engine.rerender
+        result = await run_in_threadpool(
+            run,
+            question.title,
+            execution_data,
+            llm_model=request.llm_model,
+            user_profile=user_profile,
+            language=request.language,
+        )
+
+        if result.get("status") == "error":
+            return DecisionResponse(
+                status="error",
+                error=result.get("message", "Unknown error from decision engine"),
+            )
+
+        answer_text = result.get("report", "") or result.get(
+            "execution_phase", {}
+        ).get("answer", "")
+
+        if request.save_to_history:
+            with tracing.span("db.update_answer"):
+                await update_question_answer_async(
+                    session,
+                    question_id,
+                    current_user.id,
+                    answer_text,
+                    model_llm=request.llm_model,
+                    execution_data=pack_execution_data(result) if deepen else None,
+                    exclude_user_info=request.exclude_user_info,
+                )
+
+        return DecisionResponse(
+            status="success",
+            answer=answer_text,
+            question_id=question_id,
+        )
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error regenerating report: {str(e)}",
+        )
+
+
+@router.post("/{question_id}/rerender", response_model=DecisionResponse)
+async def rerender(
+    question_id: int,
+    request: RegenerateRequest,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_history_user),
+):
+    """Regenerate only the report of a stored question from its persisted
+    execution data, optionally with a different model, language or profile."""
+    return await _regenerate(question_id, request, session, current_user, deepen=False)
+
+
+@router.post("/{question_id}/deepen", response_model=DecisionResponse)
+async def deepen(
+    question_id: int,
+    request: RegenerateRequest,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_history_user),
+):
+    """Run DeepThink on a stored question, starting from its persisted
+    first-pass data instead of re-running metadata discovery and the first query."""
+    return await _regenerate(question_id, request, session, current_user, deepen=True)
+
+
 @router.patch("/{question_id}/like")
-def set_like(
+async def set_like(
     question_id: int,
     like: bool,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_history_user),
 ):
     """Set the like/dislike value for a question."""
-    question = update_question_like(session, question_id, like)
-    if question is None or question.user_id != current_user.id:
+    row = await update_question_like_async(session, question_id, current_user.id, like)
+    if row is None:
         raise HTTPException(status_code=404, detail="Question not found")
-    return {"status": "ok", "like": question.like}
+    return {"status": "ok", "like": row.like}
 
 
 @router.delete("/{question_id}")
-def remove_question(
+async def remove_question(
     question_id: int,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_history_user),
 ):
     """Delete a question. Only the owner may delete."""
-    from .models import Question
-
-    question = session.get(Question, question_id)
-    if question is None or question.user_id != current_user.id:
+    if not await delete_question_async(session, question_id, current_user.id):
         raise HTTPException(status_code=404, detail="Question not found")
-    delete_question(session, question_id)
     return {"status": "ok"}
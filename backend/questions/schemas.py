@@ -1,8 +1,8 @@
 from datetime import datetime
 
-from typing import Any, List, Optional
+from typing import Any, List, Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 # ── Folder schemas ──────────────────────────────────────────────────────────
@@ -37,6 +37,7 @@ class QuestionCreate(BaseModel):
     date_time: Optional[datetime] = None
     model_llm: Optional[str] = None
     folder_id: Optional[int] = None
+    exclude_user_info: bool = False
 
 
 class QuestionRead(BaseModel):
@@ -57,6 +58,41 @@ class QuestionRead(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class QuestionSummary(BaseModel):
+    """Lightweight projection of a question used by history listings."""
+
+    id: int
+    title: str
+    folder_id: Optional[int] = None
+    like: bool
+    model_llm: Optional[str] = None
+    date_time: datetime
+
+    model_config = {"from_attributes": True}
+
+
+class QuestionPage(BaseModel):
+    items: List[QuestionSummary]
+    next_cursor: Optional[str] = None  # None = no more pages
+
+
+class SearchResult(QuestionSummary):
+    title_highlight: str
+    snippet: str
+    rank: float
+
+
+class SearchPage(BaseModel):
+    items: List[SearchResult]
+    next_offset: Optional[int] = None  # None = no more results
+
+
+class QuestionAnswer(BaseModel):
+    id: int
+    answer: str
+    restrictions: Optional[str] = None
+
+
 class QuestionMoveToFolder(BaseModel):
     folder_id: Optional[int] = None  # None = remove from folder
 
@@ -83,6 +119,21 @@ class DecisionRequest(BaseModel):
     )
     save_to_history: bool = True  # If False, the question won't be persisted
     deepthink: bool = False  # If True, an extra refinement iteration is applied
+    conversation_id: Optional[str] = None  # Continue an existing conversation
+    # What to do when the user liked the answer to a near-duplicate question
+    # asked with the same model and options: "offer" returns its id without
+    # answering (status "similar"), "reuse" returns its answer, "off" always
+    # runs the full pipeline.
+    similar_policy: Literal["reuse", "offer", "off"] = "offer"
+
+
+class RegenerateRequest(BaseModel):
+    """Options for re-rendering or deepening a stored answer."""
+
+    llm_model: str = "gemma-3-27b-it"
+    language: Optional[str] = None  # If set, overrides the question language
+    exclude_user_info: bool = False
+    save_to_history: bool = True  # If True, the stored answer is replaced
 
 
 class DecisionResponse(BaseModel):
@@ -90,3 +141,38 @@ class DecisionResponse(BaseModel):
     answer: str | None = None
     error: str | None = None
     question_id: int | None = None
+    conversation_id: str | None = None
+    similar_question_id: int | None = None
+    similarity: float | None = None
+
+
+class ConversationRead(BaseModel):
+    id: str
+    turns: int
+    schema_pinned: bool
+
+
+# ── Bulk operation schemas ──────────────────────────────────────────────────
+
+BULK_MAX_ITEMS = 10_000
+
+
+class QuestionBulkIds(BaseModel):
+    question_ids: List[int] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class QuestionBulkMove(QuestionBulkIds):
+    folder_id: Optional[int] = None  # None = remove from folder
+
+
+class QuestionBulkLike(QuestionBulkIds):
+    like: bool
+
+
+class FolderBulkIds(BaseModel):
+    folder_ids: List[int] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class BulkResult(BaseModel):
+    status: str = "ok"
+    ids: List[int]  # Ids actually affected (owned by the caller)
@@ -0,0 +1,293 @@
+import html
+import re
+import unicodedata
+
+from sqlalchemy import text
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from .blobs import with_answers
+from .models import Question
+
+# Markers wrapped around matched terms in highlights and snippets; the rest
+# of the text is HTML-escaped
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+SNIPPET_TOKENS = 24
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# Words as the unicode61 tokenizer splits them (underscore is a separator)
+_WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+# The search index lives in question_fts (created by migration m0003, made
+# index-only by m0008: the text itself is only kept in question and
+# answer_blob).
+#
+# On SQLite it is a contentless FTS5 table whose rowid is
+# (user_id << 32) | question_id: a user's entries form one contiguous rowid
+# range, so FTS5 seeks straight to that range in every posting list instead
+# of intersecting with a per-user token over the whole index.  A contentless
+# entry can only be removed by passing the values it was indexed with to
+# the 'delete' command, so unindexing needs the question's full text.
+#
+# On PostgreSQL it is a table of precomputed tsvectors with a GIN index and
+# an owner column.
+#
+# Both backends rank the same way: questions whose title alone matches the
+# query first, then newest (highest id) first.  Relevance scores (bm25,
+# ts_rank) are not used: bm25 has to walk the global posting list of every
+# query term to compute IDF, which for common words costs far more than the
+# match itself, and the two scores would order results differently.
+
+
+def _fts_rowid(user_id: int | None, question_id: int) -> int:
+    return ((user_id or 0) << 32) | question_id
+
+
+def _owner(user_id: int | None) -> str:
+    return f"u{user_id or 0}"
+
+
+_SQLITE_INSERT = text(
+    "INSERT INTO question_fts (rowid, title, answer, restrictions) "
+    "VALUES (:rowid, :title, :answer, :restrictions)"
+)
+_SQLITE_DELETE = text(
+    "INSERT INTO question_fts (question_fts, rowid, title, answer, restrictions) "
+    "VALUES ('delete', :rowid, :title, :answer, :restrictions)"
+)
+_POSTGRES_UPSERT = text(
+    "INSERT INTO question_fts (question_id, owner, document) "
+    "VALUES (:id, :owner, setweight(to_tsvector('simple', :title), 'A') "
+    "|| setweight(to_tsvector('simple', :restrictions), 'B') "
+    "|| setweight(to_tsvector('simple', :answer), 'C')) "
+    "ON CONFLICT (question_id) DO UPDATE SET owner = EXCLUDED.owner, "
+    "document = EXCLUDED.document"
+)
+
+
+def _index_params(postgresql: bool, entry: dict) -> dict:
+    params = {
+        "title": entry["title"],
+        "answer": entry["answer"] or "",
+        "restrictions": entry["restrictions"] or "",
+    }
+    if postgresql:
+        params.update(id=entry["id"], owner=_owner(entry["user_id"]))
+    else:
+        params["rowid"] = _fts_rowid(entry["user_id"], entry["id"])
+    return params
+
+
+def _entry(question: Question, answer: str | None = None) -> dict:
+    return {
+        "id": question.id,
+        "user_id": question.user_id,
+        "title": question.title,
+        "answer": question.answer if answer is None else answer,
+        "restrictions": question.restrictions,
+    }
+
+
+def insert_entries(connection, entries: list[dict]) -> None:
+    """Add the search entries of new questions, as one executemany.  *entries*
+    are dicts with id, user_id, title, answer (the full body, not the stored
+    reference) and restrictions."""
+    if not entries:
+        return
+    postgresql = connection.dialect.name == "postgresql"
+    connection.execute(
+        _POSTGRES_UPSERT if postgresql else _SQLITE_INSERT,
+        [_index_params(postgresql, entry) for entry in entries],
+    )
+
+
+def index_question(
+    session: Session,
+    question: Question,
+    answer: str | None = None,
+    previous: dict | None = None,
+) -> None:
+    """Index *question* (call before commit, after it has an id), with its
+    full *answer* when the body is stored in answer_blob.  When it was
+    already indexed, pass the *previous* entry (title, answer, restrictions
+    as they were indexed) to replace it."""
+    connection = session.connection()
+    if previous is not None and connection.dialect.name != "postgresql":
+        unindex_questions(session, [{**_entry(question), **previous}])
+    insert_entries(connection, [_entry(question, answer)])
+
+
+def index_new_questions(
+    session: Session, questions: list[Question], answers: list[str]
+) -> None:
+    """index_question for several new questions with their full *answers*,
+    as one executemany (call before commit)."""
+    insert_entries(
+        session.connection(),
+        [_entry(question, answer) for question, answer in zip(questions, answers)],
+    )
+
+
+def unindex_questions(session: Session, entries: list[dict]) -> None:
+    """Remove the search entries of questions (call before commit).  *entries*
+    are dicts with id, user_id, title, answer (the full body) and
+    restrictions, as they were indexed."""
+    if not entries:
+        return
+    connection = session.connection()
+    if connection.dialect.name == "postgresql":
+        ids = [entry["id"] for entry in entries]
+        placeholders = ", ".join(f":id{i}" for i in range(len(ids)))
+        connection.execute(
+            text(f"DELETE FROM question_fts WHERE question_id IN ({placeholders})"),
+            {f"id{i}": value for i, value in enumerate(ids)},
+        )
+        return
+    connection.execute(
+        _SQLITE_DELETE, [_index_params(False, entry) for entry in entries]
+    )
+
+
+def _fts5_query(query: str) -> str | None:
+    """Turn free user input into a safe FTS5 expression: every word is a
+    quoted phrase (implicit AND).  No prefix matching, since expanding a
+    short prefix merges the posting lists of every term that starts with it."""
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"' for token in tokens)
+
+
+def _fold(word: str) -> str:
+    """Case- and diacritic-insensitive form of a word, as the index sees it."""
+    word = unicodedata.normalize("NFKD", word.casefold())
+    return "".join(c for c in word if not unicodedata.combining(c))
+
+
+def _query_terms(query: str) -> set[str]:
+    return {_fold(word) for word in _WORD_RE.findall(query)}
+
+
+def highlight(value: str, terms: set[str]) -> str:
+    """*value* HTML-escaped, with the words in *terms* marked."""
+    out = []
+    last = 0
+    for word in _WORD_RE.finditer(value):
+        if _fold(word.group()) in terms:
+            out.append(html.escape(value[last : word.start()]))
+            out.append(HIGHLIGHT_START + html.escape(word.group()) + HIGHLIGHT_END)
+            last = word.end()
+    out.append(html.escape(value[last:]))
+    return "".join(out)
+
+
+def snippet(value: str, terms: set[str], size: int = SNIPPET_TOKENS) -> str:
+    """About *size* words of *value* around its first match, highlighted."""
+    words = list(_WORD_RE.finditer(value))
+    if len(words) <= size:
+        return highlight(value, terms)
+    first = next(
+        (i for i, word in enumerate(words) if _fold(word.group()) in terms), 0
+    )
+    start = max(0, min(first - size // 4, len(words) - size))
+    end = start + size
+    text_start = words[start].start() if start else 0
+    text_end = words[end - 1].end() if end < len(words) else len(value)
+    return (
+        ("…" if start else "")
+        + highlight(value[text_start:text_end], terms)
+        + ("…" if end < len(words) else "")
+    )
+
+
+def _matches(
+    session: Session, user_id: int, query: str, limit: int, offset: int
+) -> list[dict]:
+    """The page of matching questions, with their full answers."""
+    if session.get_bind().dialect.name == "postgresql":
+        if not _TOKEN_RE.search(query):
+            return []
+        # Title lexemes carry weight A (see _POSTGRES_UPSERT)
+        statement = text(
+            """
+            SELECT q.id, q.title, q.folder_id, q."like", q.model_llm, q.date_time,
+                   q.answer, q.answer_ref,
+                   -(1 + (ts_filter(f.document, '{a}') @@ tsq)::int) AS rank
+            FROM question_fts f
+            JOIN question q ON q.id = f.question_id,
+                 websearch_to_tsquery('simple', :query) AS tsq
+            WHERE f.owner = :owner AND f.document @@ tsq
+            ORDER BY rank, q.id DESC
+            LIMIT :limit OFFSET :offset
+            """
+        )
+        params = {"query": query, "owner": _owner(user_id)}
+    else:
+        match = _fts5_query(query)
+        if match is None:
+            return []
+        # Both the match and the title check stay within the user's own
+        # rowid range, where newest first is rowid descending
+        statement = text(
+            """
+            WITH page AS (
+                SELECT rowid AS fts_rowid,
+                       -(1 + (rowid IN (
+                           SELECT rowid FROM question_fts
+                           WHERE question_fts MATCH :title_match
+                             AND rowid BETWEEN :low AND :high
+                       ))) AS rank
+                FROM question_fts
+                WHERE question_fts MATCH :match AND rowid BETWEEN :low AND :high
+                ORDER BY rank, fts_rowid DESC
+                LIMIT :limit OFFSET :offset
+            )
+            SELECT q.id, q.title, q.folder_id, q."like", q.model_llm, q.date_time,
+                   q.answer, q.answer_ref, page.rank AS rank
+            FROM page
+            JOIN question q ON q.id = page.fts_rowid & 0xFFFFFFFF
+            ORDER BY page.rank, page.fts_rowid DESC
+            """
+        )
+        params = {
+            "match": match,
+            "title_match": f"title : ({match})",
+            "low": _fts_rowid(user_id, 0),
+            "high": _fts_rowid(user_id, 0xFFFFFFFF),
+        }
+
+    params.update(limit=limit, offset=offset)
+    rows = [
+        dict(row._mapping) for row in session.exec(statement, params=params).all()
+    ]
+    return with_answers(session.connection(), rows)
+
+
+def _highlight_rows(rows: list[dict], query: str) -> list[dict]:
+    terms = _query_terms(query)
+    for row in rows:
+        row["title_highlight"] = highlight(row["title"], terms)
+        row["snippet"] = snippet(row.pop("answer") or "", terms)
+        del row["answer_ref"]
+    return rows
+
+
+def search_questions(
+    session: Session, user_id: int, query: str, limit: int, offset: int
+) -> list[dict]:
+    """Full-text search over the title, answer and restrictions of a user's
+    questions, title matches first, then newest first. Returns dicts with the
+    question projection plus title_highlight, snippet (HTML-escaped, matches
+    marked) and rank (-2 for a title match, else -1)."""
+    return _highlight_rows(_matches(session, user_id, query, limit, offset), query)
+
+
+async def search_questions_async(
+    session: AsyncSession, user_id: int, query: str, limit: int, offset: int
+) -> list[dict]:
+    """search_questions on an AsyncSession (used by the API routes); the
+    highlighting runs in the threadpool, off the event loop."""
+    rows = await session.run_sync(_matches, user_id, query, limit, offset)
+    return await run_in_threadpool(_highlight_rows, rows, query)
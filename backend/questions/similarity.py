@@ -0,0 +1,489 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import deque
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import or_
+from sqlmodel import Session, select
+
+from .. import db
+from .models import Question
+
+logger = logging.getLogger(__name__)
+
+# Tuning knobs (configurable via env vars)
+SIMILARITY_THRESHOLD = float(os.environ.get("SIMILAR_QUESTION_THRESHOLD", "0.8"))
+SIMILARITY_MAX_AGE_DAYS = int(os.environ.get("SIMILAR_QUESTION_MAX_AGE_DAYS", "30"))
+# How often the index reads the questions added or (dis)liked through other
+# API workers; its own changes are applied right away by the CRUD hooks.
+REFRESH_SECONDS = float(os.environ.get("SIMILAR_QUESTION_REFRESH_SECONDS", "30"))
+
+# MinHash / LSH layout: 16 bands of 4 rows detect pairs with Jaccard
+# similarity >= ~0.5 with high probability; the exact threshold is then
+# applied on the full signature.
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+
+# Band keys of new entries are buffered in dicts and merged into the sorted
+# NumPy arrays once this many entries are pending.
+MERGE_THRESHOLD = 4096
+
+_PRIME = np.uint64(4294967311)  # smallest prime > 2**32
+_rng = np.random.default_rng(2026)
+_PERM_A = _rng.integers(1, 2**32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 2**32, size=NUM_PERM, dtype=np.uint64)
+_BAND_MIX = np.array(
+    [0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0x85EBCA77C2B2AE63],
+    dtype=np.uint64,
+)
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _shingles(text: str) -> set[str]:
+    """Normalised word unigrams and bigrams of a question."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    words = [w for w in _WORD_RE.findall(text) if len(w) > 1]
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def minhash_signature(text: str) -> np.ndarray | None:
+    """MinHash signature (NUM_PERM uint32 values) of a question, or None if
+    the text has no usable tokens."""
+    shingles = _shingles(text)
+    if not shingles:
+        return None
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles)
+    )
+    permuted = (hashes[:, None] * _PERM_A + _PERM_B) % _PRIME
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def options_key(
+    llm_model: str | None, restrictions: str | None, exclude_user_info: bool
+) -> int:
+    """int64 digest of the options an answer was generated with; only answers
+    generated with the same ones are offered for reuse."""
+    raw = f"{llm_model or ''}\x1f{int(exclude_user_info)}\x1f{restrictions or ''}"
+    digest = hashlib.blake2b(raw.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def _band_keys(signature: np.ndarray) -> np.ndarray:
+    """Collapse each band of a signature into one uint64 bucket key."""
+    bands = signature.astype(np.uint64).reshape(BANDS, ROWS_PER_BAND)
+    with np.errstate(over="ignore"):
+        return np.bitwise_xor.reduce(bands * _BAND_MIX, axis=1)
+
+
+class QuestionIndex:
+    """In-process near-duplicate index over Question.title.
+
+    Each question is stored as a MinHash signature plus owner / like /
+    options / timestamp columns in growable NumPy arrays.  A question counts
+    as liked only once the user has liked it explicitly (feedback_at set):
+    like itself defaults to True.  Candidate lookup uses LSH
+    buckets kept as sorted key arrays (binary search) plus a small dict of
+    recently added keys, so a query touches only a handful of rows regardless
+    of history size.  The index is built from the database in background
+    and then kept up to date by the question CRUD functions, and every
+    REFRESH_SECONDS from the rows other workers added or gave feedback on.
+    Between refreshes it may still offer a question another worker has since
+    disliked, regenerated or deleted, which is why /decide re-checks a match
+    in the database (crud.get_reusable_answer).
+
+    Memory: about 650 bytes per question (signature, columns, band arrays
+    and id map), i.e. some 600 MB per million questions, in every worker."""
+
+    # Per-question state swapped in by load()
+    _ARRAYS = (
+        "_size",
+        "_signatures",
+        "_question_ids",
+        "_user_ids",
+        "_timestamps",
+        "_liked",
+        "_options",
+        "_alive",
+        "_rows_by_id",
+        "_band_sorted_keys",
+        "_band_sorted_rows",
+        "_band_pending",
+        "_pending_count",
+    )
+
+    def __init__(self, capacity: int = 1024):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._loading = False
+        self._building = False
+        self._size = 0
+        self._signatures = np.zeros((capacity, NUM_PERM), dtype=np.uint32)
+        self._question_ids = np.zeros(capacity, dtype=np.int64)
+        self._user_ids = np.zeros(capacity, dtype=np.int64)
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._liked = np.zeros(capacity, dtype=bool)
+        self._options = np.zeros(capacity, dtype=np.int64)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._rows_by_id: dict[int, int] = {}
+        # Per band: sorted keys + matching row numbers, and pending entries
+        self._band_sorted_keys = [np.zeros(0, dtype=np.uint64) for _ in range(BANDS)]
+        self._band_sorted_rows = [np.zeros(0, dtype=np.int64) for _ in range(BANDS)]
+        self._band_pending: list[dict[int, list[int]]] = [{} for _ in range(BANDS)]
+        self._pending_count = 0
+        # Updates from the CRUD hooks, applied by the updater thread once
+        # loaded (and by lookups, so they see every committed change)
+        self._updates: deque[tuple] = deque()
+        self._updated = threading.Event()
+        # Refresh watermarks of the last two refreshes (highest question id,
+        # start time): each refresh reads from the older one, so rows from a
+        # transaction still open during the previous refresh aren't missed
+        self._watermarks: deque[tuple[int, datetime]] = deque(maxlen=2)
+
+    # -- loading ------------------------------------------------------------
+
+    def load(self, session: Session) -> None:
+        """Build the index from the question table.  The arrays are built
+        without holding the lock (updates made meanwhile are queued and
+        replayed afterwards), then the updater thread is started."""
+        with self._lock:
+            if self._loaded or self._building:
+                return
+            self._building = True
+            self._loading = True
+        try:
+            started = datetime.utcnow()
+            fresh = QuestionIndex()
+            rows = session.exec(
+                select(
+                    Question.id,
+                    Question.title,
+                    Question.user_id,
+                    Question.like,
+                    Question.feedback_at,
+                    Question.date_time,
+                    Question.model_llm,
+                    Question.restrictions,
+                    Question.exclude_user_info,
+                )
+            )
+            for row in rows:
+                fresh._add_locked(
+                    row.id,
+                    row.title,
+                    row.user_id,
+                    row.like and row.feedback_at is not None,
+                    row.date_time,
+                    options_key(row.model_llm, row.restrictions, row.exclude_user_info),
+                    merge=False,
+                )
+            fresh._merge_pending()
+            last_id = int(fresh._question_ids[: fresh._size].max(initial=0))
+        except BaseException:
+            with self._lock:
+                self._building = self._loading = False
+                self._updates.clear()
+            raise
+
+        with self._lock:
+            for name in self._ARRAYS:
+                setattr(self, name, getattr(fresh, name))
+            self._apply_updates()
+            self._watermarks.append((last_id, started))
+            self._loaded = True
+        threading.Thread(target=self._run_updates, daemon=True).start()
+        logger.info("[Similarity] Indexed %d questions.", self._size)
+
+    def load_background(self) -> None:
+        """Build the index in a daemon thread so large histories don't block
+        the server; lookups return no match until it is ready."""
+        if self._loading:
+            return
+        self._loading = True
+
+        def _run() -> None:
+            with Session(db.engine) as session:
+                self.load(session)
+
+        threading.Thread(target=_run, daemon=True).start()
+
+    # -- incremental updates ------------------------------------------------
+
+    # The hooks below are called by the CRUD functions after their commit,
+    # on the event loop for the API routes: they only queue the update, so
+    # they never wait for the lock nor compute signatures or merges.  Before
+    # loading has started they are no-ops, since loading reads the committed
+    # rows anyway.
+
+    def add(self, question: Question) -> None:
+        """Index a newly created question."""
+        self._update(
+            self._add_locked,
+            question.id,
+            question.title,
+            question.user_id,
+            question.like and question.feedback_at is not None,
+            question.date_time,
+            options_key(
+                question.model_llm,
+                question.restrictions,
+                question.exclude_user_info,
+            ),
+        )
+
+    def set_like(self, question_id: int, like: bool) -> None:
+        """Record the user's explicit like (or dislike) of a question."""
+        self._update(self._set_like_locked, question_id, like)
+
+    def set_answer(
+        self,
+        question_id: int,
+        llm_model: str | None,
+        restrictions: str | None,
+        exclude_user_info: bool,
+    ) -> None:
+        """A question's answer was regenerated with these options; it is not
+        liked until the user likes the new answer."""
+        self._update(
+            self._set_answer_locked,
+            question_id,
+            options_key(llm_model, restrictions, exclude_user_info),
+        )
+
+    def remove(self, question_id: int) -> None:
+        self._update(self._remove_locked, question_id)
+
+    def _update(self, update, *args) -> None:
+        if self._loaded or self._loading:
+            self._updates.append((update, args))
+            self._updated.set()
+
+    def _apply_updates(self) -> None:
+        """Apply the queued updates (call with the lock held)."""
+        while self._updates:
+            update, args = self._updates.popleft()
+            update(*args)
+
+    def _run_updates(self) -> None:
+        next_refresh = time.monotonic() + REFRESH_SECONDS
+        while True:
+            self._updated.wait(max(next_refresh - time.monotonic(), 0))
+            self._updated.clear()
+            with self._lock:
+                self._apply_updates()
+            if time.monotonic() >= next_refresh:
+                try:
+                    with Session(db.engine) as session:
+                        self.refresh(session)
+                except Exception:
+                    logger.warning("[Similarity] Refresh failed.", exc_info=True)
+                next_refresh = time.monotonic() + REFRESH_SECONDS
+
+    def refresh(self, session: Session) -> None:
+        """Index the questions added, liked or disliked since the older of
+        the last two refreshes, by this worker or any other."""
+        last_id, since = self._watermarks[0]
+        started = datetime.utcnow()
+        rows = session.exec(
+            select(
+                Question.id,
+                Question.title,
+                Question.user_id,
+                Question.like,
+                Question.feedback_at,
+                Question.date_time,
+                Question.model_llm,
+                Question.restrictions,
+                Question.exclude_user_info,
+            ).where(or_(Question.id > last_id, Question.feedback_at >= since))
+        ).all()
+        with self._lock:
+            for row in rows:
+                liked = row.like and row.feedback_at is not None
+                options = options_key(
+                    row.model_llm, row.restrictions, row.exclude_user_info
+                )
+                known = self._rows_by_id.get(row.id)
+                if known is None:
+                    self._add_locked(
+                        row.id,
+                        row.title,
+                        row.user_id,
+                        liked,
+                        row.date_time,
+                        options,
+                    )
+                else:
+                    self._liked[known] = liked
+                    self._options[known] = options
+            newest = max((row.id for row in rows), default=last_id)
+            self._watermarks.append(
+                (max(newest, self._watermarks[-1][0]), started)
+            )
+
+    # -- lookup -------------------------------------------------------------
+
+    def find_similar(
+        self,
+        title: str,
+        user_id: int,
+        llm_model: str | None = None,
+        restrictions: str | None = None,
+        exclude_user_info: bool = False,
+        threshold: float = SIMILARITY_THRESHOLD,
+        max_age_days: int = SIMILARITY_MAX_AGE_DAYS,
+    ) -> tuple[int, float] | None:
+        """Return (question_id, similarity) of the most similar recent, liked
+        question of *user_id* answered with the same model and options, or
+        None if none reaches *threshold*."""
+        if not self._loaded:
+            self.load_background()
+            return None
+        signature = minhash_signature(title)
+        if signature is None:
+            return None
+        keys = _band_keys(signature)
+        options = options_key(llm_model, restrictions, exclude_user_info)
+        min_timestamp = (datetime.utcnow() - timedelta(days=max_age_days)).timestamp()
+
+        with self._lock:
+            self._apply_updates()
+            candidates = []
+            for band in range(BANDS):
+                # Search with a uint64 array: a Python int key would make
+                # NumPy convert (copy) the whole sorted array on every call
+                key = keys[band : band + 1]
+                sorted_keys = self._band_sorted_keys[band]
+                lo = int(np.searchsorted(sorted_keys, key, side="left")[0])
+                hi = int(np.searchsorted(sorted_keys, key, side="right")[0])
+                if hi > lo:
+                    candidates.append(self._band_sorted_rows[band][lo:hi])
+                pending = self._band_pending[band].get(int(key[0]))
+                if pending:
+                    candidates.append(np.array(pending, dtype=np.int64))
+            if not candidates:
+                return None
+
+            rows = np.unique(np.concatenate(candidates))
+            rows = rows[
+                self._alive[rows]
+                & self._liked[rows]
+                & (self._user_ids[rows] == user_id)
+                & (self._options[rows] == options)
+                & (self._timestamps[rows] >= min_timestamp)
+            ]
+            if rows.size == 0:
+                return None
+
+            scores = (self._signatures[rows] == signature).mean(axis=1)
+            best = int(scores.argmax())
+            if scores[best] < threshold:
+                return None
+            return int(self._question_ids[rows[best]]), float(scores[best])
+
+    # -- internal helpers (call with the lock held) --------------------------
+
+    def _add_locked(
+        self,
+        question_id: int,
+        title: str,
+        user_id: int | None,
+        liked: bool,
+        date_time: datetime | None,
+        options: int,
+        merge: bool = True,
+    ) -> None:
+        if question_id in self._rows_by_id:
+            return
+        signature = minhash_signature(title)
+        if signature is None:
+            return
+        if self._size == len(self._question_ids):
+            self._grow()
+        row = self._size
+        self._size += 1
+        self._signatures[row] = signature
+        self._question_ids[row] = question_id
+        self._user_ids[row] = user_id or 0
+        self._timestamps[row] = (date_time or datetime.utcnow()).timestamp()
+        self._liked[row] = liked
+        self._options[row] = options
+        self._alive[row] = True
+        self._rows_by_id[question_id] = row
+
+        for band, key in enumerate(_band_keys(signature).tolist()):
+            self._band_pending[band].setdefault(key, []).append(row)
+        self._pending_count += 1
+        if merge and self._pending_count >= MERGE_THRESHOLD:
+            self._merge_pending()
+
+    def _set_like_locked(self, question_id: int, like: bool) -> None:
+        row = self._rows_by_id.get(question_id)
+        if row is not None:
+            self._liked[row] = like
+
+    def _set_answer_locked(self, question_id: int, options: int) -> None:
+        row = self._rows_by_id.get(question_id)
+        if row is not None:
+            self._liked[row] = False
+            self._options[row] = options
+
+    def _remove_locked(self, question_id: int) -> None:
+        row = self._rows_by_id.pop(question_id, None)
+        if row is not None:
+            self._alive[row] = False
+
+    def _grow(self) -> None:
+        capacity = len(self._question_ids) * 2
+        self._signatures = np.resize(self._signatures, (capacity, NUM_PERM))
+        for name in (
+            "_question_ids",
+            "_user_ids",
+            "_timestamps",
+            "_liked",
+            "_options",
+            "_alive",
+        ):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[: len(old)] = old
+            setattr(self, name, new)
+
+    def _merge_pending(self) -> None:
+        """Merge the pending band keys into the sorted arrays."""
+        if not self._pending_count:
+            return
+        for band in range(BANDS):
+            pending = self._band_pending[band]
+            new_keys = np.fromiter(
+                (key for key, rows in pending.items() for _ in rows), dtype=np.uint64
+            )
+            new_rows = np.fromiter(
+                (row for rows in pending.values() for row in rows), dtype=np.int64
+            )
+            order = np.argsort(new_keys, kind="stable")
+            new_keys, new_rows = new_keys[order], new_rows[order]
+            # Linear-time insertion into the already sorted arrays
+            positions = np.searchsorted(self._band_sorted_keys[band], new_keys)
+            self._band_sorted_keys[band] = np.insert(
+                self._band_sorted_keys[band], positions, new_keys
+            )
+            self._band_sorted_rows[band] = np.insert(
+                self._band_sorted_rows[band], positions, new_rows
+            )
+            self._band_pending[band] = {}
+        self._pending_count = 0
+
+
+# Shared per-process index used by the CRUD hooks and /decide
+question_index = QuestionIndex()
@@ -0,0 +1,39 @@
+import base64
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Dict
+
+# Phase payloads returned by GenericDecisionEngine.answer() that are needed to
+# regenerate a report later without re-querying the data sources.
+EXECUTION_DATA_KEYS = ("metadata_phase", "execution_phase", "deepthink_phase")
+
+
+def pack_execution_data(result: Dict[str, Any]) -> bytes:
+    """Serialize the phase payloads of an engine result as zlib-compressed JSON."""
+    payload = {key: result[key] for key in EXECUTION_DATA_KEYS if result.get(key)}
+    raw = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+    return zlib.compress(raw, 6)
+
+
+def unpack_execution_data(blob: bytes | None) -> Dict[str, Any] | None:
+    """Inverse of pack_execution_data. Returns None if nothing was stored."""
+    if not blob:
+        return None
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def encode_cursor(date_time: datetime, question_id: int) -> str:
+    """Opaque keyset cursor for the history listing."""
+    raw = f"{date_time.isoformat()}|{question_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Inverse of encode_cursor. Raises ValueError on malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        date_time, question_id = raw.split("|", 1)
+        return datetime.fromisoformat(date_time), int(question_id)
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
@@ -0,0 +1,196 @@
+"""Production server: ``python -m backend.serve``.
+
+The parent process imports the app and initializes the database once
+(preload, so migrations never race and the workers share the imported code
+copy-on-write), binds the listening socket and forks WEB_CONCURRENCY uvicorn
+workers (default 1) that accept from it.  A worker that dies is replaced.
+Each worker's password hashing pool gets its share of the cores
+(PASSWORD_HASH_WORKERS defaults to cores / workers).
+
+Some state is still kept per worker, which is why the default is a single
+one: each worker holds its own near-duplicate index (in sync with the
+others only up to its refresh, and ~600 MB per million questions, see
+questions/similarity.py), its own DuckDB
+copy of the VDP views (backend/accelerator.py) and runs its own background
+jobs (snapshot export, archiving).  Conversations are shared only with
+CACHE_URL set to sqlite:// or redis:// (backend/shared_cache.py).  Raise
+WEB_CONCURRENCY once that is acceptable for the deployment.
+
+- KEEP_ALIVE_SECONDS (default 65) keeps idle client connections open; keep
+  it above the idle timeout of the load balancer in front (often 60 s), or
+  the balancer may reuse a connection the worker is closing.
+- SERVE_BACKLOG (default 2048) is the listen queue shared by the workers.
+
+On SIGTERM or SIGINT every worker stops accepting connections, answers new
+decision requests with 503 (see backend/draining.py), lets the /decide,
+rerender and deepen pipelines in flight finish for up to
+DRAIN_TIMEOUT_SECONDS, then runs the lifespan shutdown, which writes the
+queued history.  Workers still running DRAIN_TIMEOUT_SECONDS + 30 s later
+are killed.  A second signal skips the draining.
+"""
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+import uvicorn
+
+from backend.draining import DRAIN_TIMEOUT_SECONDS, decision_drain
+
+logger = logging.getLogger(__name__)
+
+# One by default: see the module docstring for the state kept per worker
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", "1"))
+HOST = os.environ.get("HOST", "0.0.0.0")
+PORT = int(os.environ.get("PORT", "8000"))
+KEEP_ALIVE_SECONDS = int(os.environ.get("KEEP_ALIVE_SECONDS", "65"))
+SERVE_BACKLOG = int(os.environ.get("SERVE_BACKLOG", "2048"))
+# Proxies whose X-Forwarded-For/-Proto headers are trusted
+FORWARDED_ALLOW_IPS = os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+# Time left for the lifespan shutdown once the drain deadline has passed
+_SHUTDOWN_GRACE_SECONDS = 30
+# A worker dying sooner than this after its start is restarted with a delay
+_MIN_WORKER_LIFETIME = 1.0
+
+
+class _Server(uvicorn.Server):
+    """uvicorn server that starts draining decisions as soon as it is asked
+    to exit, before it waits for the open connections."""
+
+    def handle_exit(self, sig, frame):
+        decision_drain.begin()
+        super().handle_exit(sig, frame)
+
+
+def _bind(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _serve(app, sock: socket.socket, args) -> None:
+    """Run one uvicorn worker on the listening socket *sock*."""
+    config = uvicorn.Config(
+        app,
+        lifespan="on",
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=DRAIN_TIMEOUT_SECONDS,
+        proxy_headers=True,
+        forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+    )
+    _Server(config).run(sockets=[sock])
+
+
+def _spawn(app, sock: socket.socket, args) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+    # Worker: uvicorn installs its own SIGTERM/SIGINT handlers
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    code = 0
+    try:
+        _serve(app, sock, args)
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def _supervise(app, sock: socket.socket, args) -> None:
+    """Fork the workers, replace those that die, and forward stop signals."""
+    workers: dict[int, float] = {}  # pid -> start time
+    signals: list[int] = []
+    signal.signal(signal.SIGTERM, lambda sig, frame: signals.append(sig))
+    signal.signal(signal.SIGINT, lambda sig, frame: signals.append(sig))
+
+    for _ in range(args.workers):
+        workers[_spawn(app, sock, args)] = time.monotonic()
+    logger.info("[Serve] %d workers on %s:%d", args.workers, args.host, args.port)
+
+    stop_signals = 0
+    kill_at = None
+    while workers:
+        while signals:
+            signals.pop(0)
+            stop_signals += 1
+            if stop_signals == 1:
+                # New connections are refused (not queued) from now on
+                sock.close()
+                logger.info(
+                    "[Serve] Draining workers (up to %.0f s)", DRAIN_TIMEOUT_SECONDS
+                )
+                kill_at = (
+                    time.monotonic() + DRAIN_TIMEOUT_SECONDS + _SHUTDOWN_GRACE_SECONDS
+                )
+            # uvicorn: a first signal exits gracefully, a second SIGINT at once
+            for pid in workers:
+                os.kill(pid, signal.SIGTERM if stop_signals == 1 else signal.SIGINT)
+        if kill_at is not None and time.monotonic() > kill_at:
+            for pid in workers:
+                logger.error("[Serve] Killing worker %d (drain deadline passed)", pid)
+                os.kill(pid, signal.SIGKILL)
+            kill_at = None
+
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if not pid:
+            time.sleep(0.2)
+            continue
+        started = workers.pop(pid, None)
+        if started is None or stop_signals:
+            continue
+        logger.error(
+            "[Serve] Worker %d exited (status %d), restarting",
+            pid,
+            os.waitstatus_to_exitcode(status),
+        )
+        if time.monotonic() - started < _MIN_WORKER_LIFETIME:
+            time.sleep(_MIN_WORKER_LIFETIME)
+        workers[_spawn(app, sock, args)] = time.monotonic()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    parser.add_argument("--keep-alive", type=int, default=KEEP_ALIVE_SECONDS)
+    parser.add_argument("--backlog", type=int, default=SERVE_BACKLOG)
+    args = parser.parse_args()
+
+    # Every worker starts its own password hashing pool, sized by
+    # backend/users/utils.py to its share of the cores
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+
+    # Preload: import the app and apply migrations once, before forking
+    from backend.db import async_engine, engine, init_db
+    from backend.main import app
+
+    init_db()
+    # No pooled connection may be shared with the workers
+    engine.dispose()
+    async_engine.sync_engine.dispose()
+
+    sock = _bind(args.host, args.port, args.backlog)
+    if args.workers <= 1:
+        _serve(app, sock, args)
+    else:
+        _supervise(app, sock, args)
+
+
+if __name__ == "__main__":
+    main()
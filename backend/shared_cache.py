@@ -0,0 +1,410 @@
+"""Cache and coordination state shared by the API workers.
+
+In-process state such as the decision engine's VQL memo or its AI SDK
+request budget is duplicated by every uvicorn worker: each one warms its own
+memo and spends the whole budget on its own.  CACHE_URL selects where that
+state lives instead:
+
+- ``memory://`` (default): this process only, least recently used entries
+  dropped beyond CACHE_MAX_ENTRIES.  Right for a single worker.
+- ``sqlite:///path/to/cache.db``: a file shared by the workers of one host
+  (WAL; each operation is a single statement, so counters stay atomic across
+  processes).  Same CACHE_MAX_ENTRIES eviction, by last use.
+- ``redis://[:password@]host:6379/0``: a Redis server, or anything speaking
+  its protocol (RESP), shared by the whole fleet.  Eviction is left to the
+  server's maxmemory policy; every entry the engine writes has a TTL.
+
+Values are strings, with an optional TTL in seconds.  incr() is an atomic
+counter whose TTL starts when it is created, the building block of
+fixed-window rate limits.  Backend failures raise CacheError; callers treat
+the cache as best effort.  Connections are reopened after a fork (gunicorn
+--preload), never shared between processes.
+"""
+
+import abc
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import unquote, urlsplit
+
+from . import metrics
+
+CACHE_URL = os.environ.get("CACHE_URL", "memory://")
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "4096"))
+CACHE_TIMEOUT_SECONDS = float(os.environ.get("CACHE_TIMEOUT_SECONDS", "1"))
+
+# SQLite: drop expired and surplus entries every this many writes
+_EVICT_EVERY = 64
+
+
+class CacheError(Exception):
+    """The cache backend could not be reached or rejected a command."""
+
+
+class CacheBackend(abc.ABC):
+    """Interface of the backends; counts lookups for /metrics."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get(self, key: str) -> str | None:
+        try:
+            value = self._get(key)
+        except CacheError:
+            self.errors += 1
+            raise
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    @abc.abstractmethod
+    def set(self, key: str, value: str, ttl: float | None = None) -> None:
+        """Store *value* under *key*, for *ttl* seconds if given."""
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove *key* if present."""
+
+    @abc.abstractmethod
+    def incr(self, key: str, amount: int = 1, ttl: float | None = None) -> int:
+        """Add *amount* to counter *key* and return its new value.  A missing
+        (or expired) counter starts from 0 and expires *ttl* seconds later."""
+
+    def close(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    def _get(self, key: str) -> str | None:
+        """Value of *key*, or None if missing or expired."""
+
+
+class MemoryCache(CacheBackend):
+    """Process-local LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        super().__init__()
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> (expires_at or None, value)
+        self._entries: OrderedDict[str, tuple[float | None, str]] = OrderedDict()
+
+    def _live(self, key: str) -> str | None:
+        """Value of *key* if it hasn't expired (call with the lock held)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] is not None and entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _store(self, key: str, value: str, expires_at: float | None) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _get(self, key: str) -> str | None:
+        with self._lock:
+            return self._live(key)
+
+    def set(self, key: str, value: str, ttl: float | None = None) -> None:
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._store(key, value, expires_at)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def incr(self, key: str, amount: int = 1, ttl: float | None = None) -> int:
+        with self._lock:
+            current = self._live(key)
+            if current is None:
+                value = amount
+                expires_at = time.monotonic() + ttl if ttl else None
+            else:
+                value = int(current) + amount
+                expires_at = self._entries[key][0]
+            self._store(key, str(value), expires_at)
+            return value
+
+
+class SQLiteCache(CacheBackend):
+    """Cache table in a SQLite file shared by the processes of one host."""
+
+    def __init__(self, path: str, max_entries: int = CACHE_MAX_ENTRIES):
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._pid = 0
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """This process's connection (call with the lock held)."""
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(
+                self.path,
+                timeout=CACHE_TIMEOUT_SECONDS,
+                isolation_level=None,  # autocommit: one statement per operation
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL, used_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_cache_used_at ON cache (used_at)"
+            )
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _execute(self, sql: str, params=()) -> list:
+        with self._lock:
+            try:
+                return self._connection().execute(sql, params).fetchall()
+            except sqlite3.Error as exc:
+                raise CacheError(f"SQLite cache {self.path}: {exc}") from exc
+
+    def _wrote(self) -> None:
+        self._writes += 1
+        if self._writes % _EVICT_EVERY == 0:
+            self._execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+            self._execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+                "ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def _get(self, key: str) -> str | None:
+        now = time.time()
+        rows = self._execute(
+            "UPDATE cache SET used_at = ? "
+            "WHERE key = ? AND (expires_at IS NULL OR expires_at > ?) "
+            "RETURNING value",
+            (now, key, now),
+        )
+        return rows[0][0] if rows else None
+
+    def set(self, key: str, value: str, ttl: float | None = None) -> None:
+        now = time.time()
+        self._execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at, used_at) "
+            "VALUES (?, ?, ?, ?)",
+            (key, value, now + ttl if ttl else None, now),
+        )
+        self._wrote()
+
+    def delete(self, key: str) -> None:
+        self._execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def incr(self, key: str, amount: int = 1, ttl: float | None = None) -> int:
+        now = time.time()
+        # An expired counter restarts, with a new expiry, in the same statement
+        rows = self._execute(
+            "INSERT INTO cache (key, value, expires_at, used_at) "
+            "VALUES (:key, :amount, :expires_at, :now) "
+            "ON CONFLICT (key) DO UPDATE SET "
+            "value = CASE WHEN expires_at <= :now THEN :amount "
+            "ELSE CAST(value AS INTEGER) + :amount END, "
+            "expires_at = CASE WHEN expires_at <= :now THEN :expires_at "
+            "ELSE expires_at END, "
+            "used_at = :now "
+            "RETURNING value",
+            {
+                "key": key,
+                "amount": amount,
+                "expires_at": now + ttl if ttl else None,
+                "now": now,
+            },
+        )
+        self._wrote()
+        return int(rows[0][0])
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+class RedisCache(CacheBackend):
+    """Minimal client for the Redis protocol (RESP2) over one connection per
+    process; commands are serialized, each takes well under a millisecond."""
+
+    def __init__(self, url: str):
+        super().__init__()
+        parts = urlsplit(url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 6379
+        self.password = unquote(parts.password) if parts.password else None
+        self.db = int(parts.path.lstrip("/") or 0)
+        self._lock = threading.Lock()
+        self._sock: socket.socket | None = None
+        self._reader = None
+        self._pid = 0
+
+    # -- protocol ------------------------------------------------------------
+
+    @staticmethod
+    def _encode(*args) -> bytes:
+        out = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(out)
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise CacheError(f"Redis: {rest.decode()}")
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("connection closed")
+            return data[:-2].decode()
+        if kind == b"*":
+            length = int(rest)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise CacheError(f"Redis: unexpected reply {line!r}")
+
+    def _connect(self) -> None:
+        sock = socket.create_connection(
+            (self.host, self.port), timeout=CACHE_TIMEOUT_SECONDS
+        )
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock, self._reader, self._pid = sock, sock.makefile("rb"), os.getpid()
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            self._send(setup)
+
+    def _disconnect(self) -> None:
+        if self._sock is not None and self._pid == os.getpid():
+            self._sock.close()
+        self._sock = self._reader = None
+
+    def _send(self, commands: list[tuple]) -> list:
+        self._write(commands)
+        return [self._read_reply() for _ in commands]
+
+    def _write(self, commands: list[tuple]) -> None:
+        self._sock.sendall(b"".join(self._encode(*command) for command in commands))
+
+    def _pipeline(self, *commands: tuple) -> list:
+        """Send *commands* in one round trip and return their replies.  A
+        broken pooled connection is retried once on a new one, but only if
+        the commands could not be sent: once they were, the server may have
+        run them (an INCRBY must not be counted twice), so a failure while
+        reading the replies raises CacheError."""
+        with self._lock:
+            for attempt in (1, 2):
+                sent = False
+                try:
+                    if self._sock is None or self._pid != os.getpid():
+                        self._connect()
+                    self._write(list(commands))
+                    sent = True
+                    return [self._read_reply() for _ in commands]
+                except CacheError:
+                    # Replies after an error reply are left unread: start over
+                    self._disconnect()
+                    raise
+                except OSError as exc:
+                    self._disconnect()
+                    if sent or attempt == 2:
+                        raise CacheError(
+                            f"Redis {self.host}:{self.port}: {exc}"
+                        ) from exc
+
+    # -- operations ----------------------------------------------------------
+
+    def _get(self, key: str) -> str | None:
+        return self._pipeline(("GET", key))[0]
+
+    def set(self, key: str, value: str, ttl: float | None = None) -> None:
+        if ttl:
+            self._pipeline(("SET", key, value, "PX", max(int(ttl * 1000), 1)))
+        else:
+            self._pipeline(("SET", key, value))
+
+    def delete(self, key: str) -> None:
+        self._pipeline(("DEL", key))
+
+    def incr(self, key: str, amount: int = 1, ttl: float | None = None) -> int:
+        if not ttl:
+            return self._pipeline(("INCRBY", key, amount))[0]
+        # The transaction creates the counter with its expiry if missing,
+        # so it can't be left behind without one
+        replies = self._pipeline(
+            ("MULTI",),
+            ("SET", key, 0, "PX", max(int(ttl * 1000), 1), "NX"),
+            ("INCRBY", key, amount),
+            ("EXEC",),
+        )
+        return int(replies[-1][-1])
+
+    def close(self) -> None:
+        with self._lock:
+            self._disconnect()
+
+
+def open_cache(url: str = CACHE_URL) -> CacheBackend:
+    """The backend for *url* (see module docstring)."""
+    scheme = urlsplit(url).scheme
+    if scheme == "memory":
+        return MemoryCache()
+    if scheme == "sqlite":
+        # sqlite:///relative.db, sqlite:////absolute.db (as for DATABASE_URL)
+        return SQLiteCache(url.split("://", 1)[1][1:])
+    if scheme == "redis":
+        return RedisCache(url)
+    raise ValueError(f"Unsupported CACHE_URL: {url}")
+
+
+shared_cache = open_cache()
+
+metrics.register(
+    "shared_cache_hits_total",
+    "counter",
+    "Shared cache lookups that found a value (this worker).",
+    lambda: shared_cache.hits,
+)
+metrics.register(
+    "shared_cache_misses_total",
+    "counter",
+    "Shared cache lookups that found nothing (this worker).",
+    lambda: shared_cache.misses,
+)
+metrics.register(
+    "shared_cache_errors_total",
+    "counter",
+    "Shared cache lookups that failed (this worker).",
+    lambda: shared_cache.errors,
+)
@@ -0,0 +1,285 @@
+"""Scheduled read-only snapshots of the application database for analytics.
+
+Grafana and offline analysis read these instead of the live database, so
+their queries never hold locks on (or compete for I/O with) the file the API
+writes to.  Each export publishes:
+
+- ``<SNAPSHOT_DIR>/project.db``: a consistent SQLite copy, taken with the
+  online backup API (SQLite) or copied table by table inside one
+  REPEATABLE READ transaction (PostgreSQL), in rollback-journal mode so
+  read-only mounts need no -wal/-shm files, with the users pseudonymized
+  (see _PSEUDONYMIZE_USERS);
+- ``<SNAPSHOT_DIR>/<table>.parquet`` for question, folder and an anonymized
+  user table (requires duckdb).
+
+Every file is written to a unique temporary file next to its target and
+swapped in with os.replace, so readers always see either the previous or the
+new export.  Every API worker runs the scheduler: an flock on
+``<SNAPSHOT_DIR>/.export.lock`` lets one export run at a time, the others
+skip their turn.
+
+Enable with SNAPSHOT_EXPORT=1 (exports every SNAPSHOT_INTERVAL_SECONDS while
+the API runs) or run ``python -m backend.snapshots`` for a single export.
+"""
+
+import csv
+import glob
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+try:  # optional: without it, exports are only serialized within the process
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.engine import Engine
+from sqlmodel import SQLModel
+
+from backend import db
+from backend.lazy import available, optional
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", os.path.join(db.BASE_DIR, "snapshots"))
+SNAPSHOT_INTERVAL_SECONDS = float(os.environ.get("SNAPSHOT_INTERVAL_SECONDS", "300"))
+
+# Rows per batch when copying from PostgreSQL
+_COPY_BATCH = 5_000
+
+# Applied to the snapshot before it is published.  The dashboard only needs
+# a stable per-user label and the birth year, so direct identifiers are
+# replaced by ones derived from the id (still unique) and the free-form
+# profile fields are dropped.
+_PSEUDONYMIZE_USERS = """
+    UPDATE "user" SET
+        username = 'user-' || id,
+        email = 'user-' || id || '@example.invalid',
+        hashed_password = '',
+        name = NULL,
+        date_of_birth = strftime('%Y-01-01', date_of_birth),
+        user_preferences = NULL,
+        profile_image = NULL
+"""
+
+# Parquet exports: table -> SELECT on the snapshot.  Free text and direct
+# identifiers of users are left out; the id is kept as the join key.  Answer
+# bodies are compressed in answer_blob, so only their size is exported.
+PARQUET_EXPORTS = {
+    "question": (
+        'SELECT id, title, answer_size, user_id, folder_id, restrictions, "like", '
+        "time_out, used_tokens, date_time, model_llm FROM question"
+    ),
+    "folder": "SELECT id, name, user_id, created_at FROM folder",
+    "user": (
+        "SELECT id, gender_identity, "
+        "CAST(strftime('%Y', date_of_birth) AS INTEGER) AS birth_year, "
+        'created_at FROM "user"'
+    ),
+}
+
+# DuckDB column types of the exported columns (everything else is VARCHAR)
+_PARQUET_TYPES = {
+    "id": "BIGINT",
+    "user_id": "BIGINT",
+    "folder_id": "BIGINT",
+    "answer_size": "BIGINT",
+    "like": "BOOLEAN",
+    "time_out": "DOUBLE",
+    "used_tokens": "BIGINT",
+    "date_time": "TIMESTAMP",
+    "created_at": "TIMESTAMP",
+    "birth_year": "INTEGER",
+}
+
+
+class SnapshotExporter:
+    """Periodically exports a consistent copy of the database (see module
+    docstring)."""
+
+    def __init__(
+        self,
+        engine: Engine | None = None,
+        snapshot_dir: str = SNAPSHOT_DIR,
+        interval: float = SNAPSHOT_INTERVAL_SECONDS,
+    ):
+        self.enabled = os.environ.get("SNAPSHOT_EXPORT", "0") == "1"
+        self.engine = engine
+        self.snapshot_dir = snapshot_dir
+        self.interval = interval
+        self._exporting = threading.Lock()
+        self._stop = threading.Event()
+
+    @property
+    def snapshot_file(self) -> str:
+        return os.path.join(self.snapshot_dir, "project.db")
+
+    # -----------------------------
+    # DATABASE SNAPSHOT
+    # -----------------------------
+    def _backup_sqlite(self, target: str) -> None:
+        # Copy in a single step: that is one read transaction, which in WAL
+        # mode does not block writers, whereas a stepped backup restarts
+        # every time the API writes in between steps.
+        source = sqlite3.connect(self.engine.url.database)
+        destination = sqlite3.connect(target)
+        try:
+            source.backup(destination)
+        finally:
+            destination.close()
+            source.close()
+
+    def _copy_tables(self, target: str) -> None:
+        """Logical copy of every table into a SQLite file, read from one
+        REPEATABLE READ transaction so all tables reflect the same instant."""
+        target_engine = create_engine(f"sqlite:///{target}")
+        SQLModel.metadata.create_all(target_engine)
+        with (
+            self.engine.connect().execution_options(
+                isolation_level="REPEATABLE READ"
+            ) as source,
+            target_engine.begin() as destination,
+        ):
+            for table in SQLModel.metadata.sorted_tables:
+                rows = source.execute(
+                    select(table).execution_options(yield_per=_COPY_BATCH)
+                ).mappings()
+                for batch in rows.partitions():
+                    destination.execute(table.insert(), [dict(row) for row in batch])
+        target_engine.dispose()
+
+    def _write_snapshot(self, target: str) -> None:
+        if self.engine.dialect.name == "sqlite":
+            self._backup_sqlite(target)
+        else:
+            self._copy_tables(target)
+        connection = sqlite3.connect(target)
+        try:
+            connection.execute(_PSEUDONYMIZE_USERS)
+            connection.commit()
+            connection.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            connection.close()
+
+    # -----------------------------
+    # PARQUET
+    # -----------------------------
+    def _export_parquet(self, snapshot: str) -> None:
+        source = sqlite3.connect(f"file:{snapshot}?mode=ro", uri=True)
+        try:
+            for table, query in PARQUET_EXPORTS.items():
+                cursor = source.execute(query)
+                columns = [column[0] for column in cursor.description]
+                with tempfile.NamedTemporaryFile(
+                    "w", suffix=".csv", newline="", delete=False, encoding="utf-8"
+                ) as fh:
+                    writer = csv.writer(fh)
+                    writer.writerow(columns)
+                    writer.writerows(cursor)
+                target = os.path.join(self.snapshot_dir, f"{table}.parquet")
+                tmp_file = self._temp_file(f"{table}.parquet")
+                escaped = tmp_file.replace("'", "''")
+                types = {
+                    column: _PARQUET_TYPES.get(column, "VARCHAR") for column in columns
+                }
+                try:
+                    with optional("duckdb").connect() as connection:
+                        connection.execute(
+                            f"COPY (SELECT * FROM read_csv(?, header=true, "
+                            f"columns={types!r})) "
+                            f"TO '{escaped}' (FORMAT parquet, COMPRESSION zstd)",
+                            [fh.name],
+                        )
+                    os.replace(tmp_file, target)
+                except BaseException:
+                    os.remove(tmp_file)
+                    raise
+                finally:
+                    os.remove(fh.name)
+        finally:
+            source.close()
+
+    # -----------------------------
+    # EXPORT
+    # -----------------------------
+    def _temp_file(self, name: str) -> str:
+        """A new empty file in the snapshot directory to write *name* to."""
+        fd, path = tempfile.mkstemp(
+            dir=self.snapshot_dir, prefix=f"{name}.", suffix=".tmp"
+        )
+        os.close(fd)
+        return path
+
+    def export(self) -> bool:
+        """Run one export. Returns False if one was already running (in this
+        process or another) or it failed (the previous export stays
+        published)."""
+        if not self._exporting.acquire(blocking=False):
+            return False
+        started = time.perf_counter()
+        try:
+            if self.engine is None:
+                self.engine = db.engine
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            with open(os.path.join(self.snapshot_dir, ".export.lock"), "a") as lock:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        logger.info("[Snapshots] Export running in another process")
+                        return False
+                self._export()
+            logger.info(
+                "[Snapshots] Exported %s in %.1f s",
+                self.snapshot_dir,
+                time.perf_counter() - started,
+            )
+            return True
+        except Exception as exc:
+            logger.error("[Snapshots] Export failed: %s", exc)
+            return False
+        finally:
+            self._exporting.release()
+
+    def _export(self) -> None:
+        """Write and publish the snapshot files (call with the lock held)."""
+        # Left over by an export that crashed: nobody else is writing now
+        for stale in glob.glob(os.path.join(glob.escape(self.snapshot_dir), "*.tmp")):
+            os.remove(stale)
+        tmp_file = self._temp_file("project.db")
+        try:
+            self._write_snapshot(tmp_file)
+            os.replace(tmp_file, self.snapshot_file)
+        except BaseException:
+            os.remove(tmp_file)
+            raise
+        # Optional dependency: Parquet exports are skipped without it
+        if available("duckdb"):
+            self._export_parquet(self.snapshot_file)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.export()
+            self._stop.wait(self.interval)
+
+    def start_background(self) -> None:
+        """Export now and then every *interval* seconds in a daemon thread."""
+        if self.enabled:
+            self._stop.clear()
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+snapshot_exporter = SnapshotExporter()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    db.init_db()
+    raise SystemExit(0 if snapshot_exporter.export() else 1)
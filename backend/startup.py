@@ -0,0 +1,190 @@
+"""Startup timing: where a cold worker spends its time before serving.
+
+main.py times its own imports and each phase of the app lifespan with
+phase(), and logs report() once the app is ready, so every worker start
+leaves a line like
+
+    [Startup] ready in 612 ms: imports 540, init_db 41, history_writer 3, ...
+
+``python -m backend.startup`` measures cold starts in fresh interpreters:
+each run imports backend.main under ``-X importtime``, runs the lifespan and
+serves GET /metrics, then the median time to first request served, the
+phases and the slowest imports (as a tree, cumulative ms) are printed.
+With --budget-ms it exits with status 1 when the median exceeds the budget,
+so CI catches startup regressions.  It starts the app as configured (same
+database and environment as the server).
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# (phase, milliseconds) in the order they ran
+phases: list[tuple[str, float]] = []
+
+
+def record(name: str, started: float) -> None:
+    """Record phase *name* as having run since perf_counter() *started*."""
+    phases.append((name, (time.perf_counter() - started) * 1000))
+
+
+@contextlib.contextmanager
+def phase(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, started)
+
+
+def report() -> str:
+    total = sum(ms for _, ms in phases)
+    detail = ", ".join(f"{name} {ms:.0f}" for name, ms in phases)
+    return f"[Startup] ready in {total:.0f} ms: {detail}"
+
+
+# ── Cold-start measurement ──────────────────────────────────────────────────
+
+
+async def _get(app, path: str) -> int:
+    """Serve GET *path* on ASGI *app* directly; returns the status code."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def _cold_start() -> None:
+    """One measured start (run in a fresh interpreter by main())."""
+    started = time.perf_counter()
+    from backend import main as app_module
+    from backend import startup  # not __main__: the module main.py records in
+
+    async def run() -> dict:
+        app = app_module.app
+        async with app.router.lifespan_context(app):
+            ready = time.perf_counter()
+            status = await _get(app, "/metrics")
+            served = time.perf_counter()
+        return {
+            "ready_ms": (ready - started) * 1000,
+            "first_request_ms": (served - started) * 1000,
+            "status": status,
+            "phases": startup.phases,
+        }
+
+    print(json.dumps(asyncio.run(run())))
+
+
+def _import_tree(stderr: str, min_ms: float) -> list[str]:
+    """The -X importtime output as a tree (parents first) of the imports
+    with a cumulative time >= *min_ms*."""
+    # importtime prints each module after its children, indented by depth
+    pending: list[tuple[int, str, float, list]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header
+        depth = (len(name) - len(name.lstrip())) // 2
+        children = []
+        while pending and pending[-1][0] > depth:
+            children.append(pending.pop())
+        pending.append((depth, name.strip(), int(cumulative) / 1000, children[::-1]))
+
+    lines = []
+
+    def walk(nodes, level):
+        for _, name, ms, children in nodes:
+            if ms >= min_ms:
+                lines.append(f"{ms:9.1f} ms  {'  ' * level}{name}")
+                walk(children, level + 1)
+
+    walk(pending, 0)
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--min-ms",
+        type=float,
+        default=10.0,
+        help="hide imports faster than this (cumulative)",
+    )
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=None,
+        help="fail if the median time to first request exceeds it",
+    )
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _cold_start()
+        return
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = []
+    for _ in range(args.runs):
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "backend.startup", "--child"],
+            cwd=root,
+            capture_output=True,
+            text=True,
+        )
+        if process.returncode != 0:
+            sys.stderr.write(process.stderr)
+            sys.exit(process.returncode)
+        results.append((json.loads(process.stdout.splitlines()[-1]), process.stderr))
+
+    results.sort(key=lambda result: result[0]["first_request_ms"])
+    median, stderr = results[len(results) // 2]
+    ready = statistics.median(r["ready_ms"] for r, _ in results)
+    first_request = statistics.median(r["first_request_ms"] for r, _ in results)
+    print(f"Cold start, median of {args.runs} runs:")
+    print(f"  ready                 {ready:9.1f} ms")
+    print(f"  first request served  {first_request:9.1f} ms (HTTP {median['status']})")
+    print("\nPhases (median run):")
+    for name, ms in median["phases"]:
+        print(f"  {name:<22}{ms:9.1f} ms")
+    print(f"\nImports over {args.min_ms:g} ms (median run, cumulative):")
+    print("\n".join(_import_tree(stderr, args.min_ms)))
+
+    if args.budget_ms is not None and first_request > args.budget_ms:
+        print(f"\nOver budget: {first_request:.0f} ms > {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
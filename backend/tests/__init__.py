@@ -0,0 +1,7 @@
+"""Tests run against local stand-ins (http.server, sockets) for the external
+services, so they need no network.
+
+Usage (from the repository root):
+
+    python -m unittest discover backend/tests
+"""
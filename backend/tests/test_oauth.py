@@ -0,0 +1,222 @@
+"""OAuthClient against http.server stubs of Google's certificate endpoint and
+GitHub's OAuth and API endpoints."""
+
+import datetime
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt, jwt
+
+from backend.users import oauth
+
+CLIENT_ID = "test-client.apps.googleusercontent.com"
+KEY_ID = "test-key"
+
+
+def _signing_key() -> tuple[str, str]:
+    """PEM private key and self-signed certificate, as Google publishes them."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "stub")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(1)
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    key_pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    return key_pem, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+class StubServer:
+    """ThreadingHTTPServer on a free local port; *routes* maps (method, path)
+    to a callable returning (status, headers, JSON body)."""
+
+    def __init__(self, routes: dict):
+        self.hits: list[tuple[str, str]] = []
+        self.headers: list[dict] = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                stub.hits.append((method, self.path))
+                stub.headers.append(dict(self.headers))
+                route = routes.get((method, self.path))
+                status, headers, body = route() if route else (404, {}, {})
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for header, value in headers.items():
+                    self.send_header(header, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class GoogleTest(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.key_pem, cls.cert_pem = _signing_key()
+
+    def _serve_certs(self, cache_control: str) -> StubServer:
+        server = StubServer(
+            {
+                ("GET", "/certs"): lambda: (
+                    200,
+                    {"Cache-Control": cache_control},
+                    {KEY_ID: self.cert_pem},
+                )
+            }
+        )
+        self.addCleanup(server.close)
+        for name, value in (
+            ("GOOGLE_CERTS_URL", f"{server.url}/certs"),
+            ("GOOGLE_CLIENT_ID", CLIENT_ID),
+        ):
+            patcher = mock.patch.object(oauth, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        return server
+
+    def _token(self, **claims) -> str:
+        now = int(time.time())
+        payload = {
+            "iss": "https://accounts.google.com",
+            "aud": CLIENT_ID,
+            "sub": "1234",
+            "email": "ada@example.com",
+            "iat": now,
+            "exp": now + 600,
+            **claims,
+        }
+        signer = crypt.RSASigner.from_string(self.key_pem, KEY_ID)
+        return jwt.encode(signer, payload).decode()
+
+    async def test_certs_fetched_once_within_max_age(self):
+        server = self._serve_certs("public, max-age=3600")
+        client = oauth.OAuthClient()
+        for _ in range(3):
+            claims = await client.verify_google(self._token())
+            self.assertEqual(claims["email"], "ada@example.com")
+        self.assertEqual(server.hits, [("GET", "/certs")])
+
+    async def test_certs_refetched_without_max_age(self):
+        server = self._serve_certs("no-cache")
+        client = oauth.OAuthClient()
+        await client.verify_google(self._token())
+        await client.verify_google(self._token())
+        self.assertEqual(len(server.hits), 2)
+
+    async def test_invalid_token(self):
+        self._serve_certs("public, max-age=3600")
+        client = oauth.OAuthClient()
+        with self.assertRaises(oauth.OAuthError):
+            await client.verify_google(self._token(aud="someone-else"))
+        with self.assertRaises(oauth.OAuthError):
+            await client.verify_google(self._token(iss="https://evil.example"))
+
+
+class GitHubTest(unittest.IsolatedAsyncioTestCase):
+    def _serve(self, routes: dict) -> StubServer:
+        server = StubServer(routes)
+        self.addCleanup(server.close)
+        for name, value in (
+            ("GITHUB_OAUTH_URL", f"{server.url}/login/oauth"),
+            ("GITHUB_API_URL", server.url),
+        ):
+            patcher = mock.patch.object(oauth, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        return server
+
+    async def test_user_and_emails_fetched_concurrently(self):
+        # Each API request waits for the other one: run one after the other,
+        # the barrier breaks and the stub answers 500
+        both = threading.Barrier(2, timeout=5)
+
+        def api(body):
+            def respond():
+                try:
+                    both.wait()
+                except threading.BrokenBarrierError:
+                    return 500, {}, {"message": "not concurrent"}
+                return 200, {}, body
+
+            return respond
+
+        user = {"id": 42, "login": "ada", "email": None}
+        emails = [{"email": "ada@example.com", "primary": True, "verified": True}]
+        server = self._serve(
+            {
+                ("POST", "/login/oauth/access_token"): lambda: (
+                    200,
+                    {},
+                    {"access_token": "gho_test"},
+                ),
+                ("GET", "/user"): api(user),
+                ("GET", "/user/emails"): api(emails),
+            }
+        )
+        self.assertEqual(
+            await oauth.OAuthClient().github_user("code"), (user, emails)
+        )
+        self.assertEqual(server.hits[0], ("POST", "/login/oauth/access_token"))
+        self.assertEqual(
+            sorted(server.hits[1:]), [("GET", "/user"), ("GET", "/user/emails")]
+        )
+        for headers in server.headers[1:]:
+            self.assertEqual(headers["Authorization"], "Bearer gho_test")
+
+    async def test_rejected_code(self):
+        server = self._serve(
+            {
+                ("POST", "/login/oauth/access_token"): lambda: (
+                    200,
+                    {},
+                    {"error": "bad_verification_code"},
+                )
+            }
+        )
+        with self.assertRaises(oauth.OAuthError):
+            await oauth.OAuthClient().github_user("expired")
+        self.assertEqual(server.hits, [("POST", "/login/oauth/access_token")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,285 @@
+"""SQLiteCache on a temporary file and RedisCache against a small RESP
+stand-in server (no Redis needed)."""
+
+import os
+import socketserver
+import tempfile
+import threading
+import time
+import unittest
+
+from backend.shared_cache import CacheError, RedisCache, SQLiteCache
+
+
+class RespStandIn:
+    """Threaded TCP server answering the commands RedisCache sends (AUTH,
+    SELECT, GET, SET [PX ms] [NX], DEL, INCRBY, MULTI/EXEC), with expiry.
+
+    Every command received is logged as (connection number, args).  With
+    *hang_up_on* set, the connection is closed without a reply as soon as
+    that command has been received (and run)."""
+
+    def __init__(self):
+        self.data: dict[str, tuple[str, float | None]] = {}
+        self.log: list[tuple[int, tuple[str, ...]]] = []
+        self.connections = 0
+        self.hang_up_on: str | None = None
+        self.lock = threading.Lock()
+        stand_in = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                with stand_in.lock:
+                    stand_in.connections += 1
+                    number = stand_in.connections
+                queued = None
+                while True:
+                    command = self._read_command()
+                    if command is None:
+                        return
+                    with stand_in.lock:
+                        stand_in.log.append((number, command))
+                    name = command[0].upper()
+                    if name == "MULTI":
+                        queued, reply = [], "OK"
+                    elif name == "EXEC":
+                        reply = [stand_in.run(queued_one) for queued_one in queued]
+                        queued = None
+                    elif queued is not None:
+                        queued.append(command)
+                        reply = "QUEUED"
+                    else:
+                        reply = stand_in.run(command)
+                    if name == stand_in.hang_up_on:
+                        return
+                    self.wfile.write(_encode_reply(reply))
+
+            def _read_command(self):
+                line = self.rfile.readline()
+                if not line:
+                    return None
+                assert line.startswith(b"*"), line
+                args = []
+                for _ in range(int(line[1:])):
+                    length = int(self.rfile.readline()[1:])
+                    args.append(self.rfile.read(length + 2)[:-2].decode())
+                return tuple(args)
+
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def commands(self, connection: int | None = None) -> list[tuple[str, ...]]:
+        with self.lock:
+            return [
+                command
+                for number, command in self.log
+                if connection is None or number == connection
+            ]
+
+    def _live(self, key: str) -> str | None:
+        entry = self.data.get(key)
+        if entry is None or (entry[1] is not None and entry[1] <= time.monotonic()):
+            self.data.pop(key, None)
+            return None
+        return entry[0]
+
+    def run(self, command: tuple[str, ...]):
+        name, args = command[0].upper(), command[1:]
+        with self.lock:
+            if name in ("AUTH", "SELECT"):
+                return "OK"
+            if name == "GET":
+                return self._live(args[0])
+            if name == "SET":
+                key, value, options = args[0], args[1], [a.upper() for a in args[2:]]
+                if "NX" in options and self._live(key) is not None:
+                    return None
+                expires_at = None
+                if "PX" in options:
+                    ttl_ms = int(args[2 + options.index("PX") + 1])
+                    expires_at = time.monotonic() + ttl_ms / 1000
+                self.data[key] = (value, expires_at)
+                return "OK"
+            if name == "DEL":
+                return int(self.data.pop(args[0], None) is not None)
+            if name == "INCRBY":
+                current = self._live(args[0])
+                expires_at = self.data[args[0]][1] if current is not None else None
+                value = int(current or 0) + int(args[1])
+                self.data[args[0]] = (str(value), expires_at)
+                return value
+            return RuntimeError(f"unknown command '{name}'")
+
+
+def _encode_reply(reply) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, Exception):
+        return b"-ERR %s\r\n" % str(reply).encode()
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, list):
+        return b"*%d\r\n" % len(reply) + b"".join(_encode_reply(r) for r in reply)
+    if reply in ("OK", "QUEUED"):
+        return b"+%s\r\n" % reply.encode()
+    data = reply.encode()
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+class RedisCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.stand_in = RespStandIn()
+        self.addCleanup(self.stand_in.close)
+        self.cache = RedisCache(f"redis://127.0.0.1:{self.stand_in.port}/0")
+        self.addCleanup(self.cache.close)
+
+    def test_get_set_delete(self):
+        self.assertIsNone(self.cache.get("k"))
+        self.cache.set("k", "value")
+        self.assertEqual(self.cache.get("k"), "value")
+        self.cache.delete("k")
+        self.assertIsNone(self.cache.get("k"))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_set_with_ttl(self):
+        self.cache.set("k", "value", ttl=0.05)
+        self.assertEqual(
+            self.stand_in.commands()[-1], ("SET", "k", "value", "PX", "50")
+        )
+        self.assertEqual(self.cache.get("k"), "value")
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get("k"))
+
+    def test_auth_and_select_on_connect(self):
+        cache = RedisCache(f"redis://:s3cret@127.0.0.1:{self.stand_in.port}/2")
+        self.addCleanup(cache.close)
+        cache.get("k")
+        self.assertEqual(
+            self.stand_in.commands(),
+            [("AUTH", "s3cret"), ("SELECT", "2"), ("GET", "k")],
+        )
+
+    def test_incr_with_ttl_is_one_transaction(self):
+        self.assertEqual(self.cache.incr("counter", 2, ttl=0.2), 2)
+        self.assertEqual(self.cache.incr("counter", 3, ttl=0.2), 5)
+        self.assertEqual(
+            self.stand_in.commands()[:4],
+            [
+                ("MULTI",),
+                ("SET", "counter", "0", "PX", "200", "NX"),
+                ("INCRBY", "counter", "2"),
+                ("EXEC",),
+            ],
+        )
+        # The expiry set by the first call is kept: the window then restarts
+        time.sleep(0.25)
+        self.assertEqual(self.cache.incr("counter", 1, ttl=0.2), 1)
+
+    def test_incr_without_ttl(self):
+        self.assertEqual(self.cache.incr("counter"), 1)
+        self.assertEqual(self.cache.incr("counter", 4), 5)
+        self.assertEqual(self.stand_in.commands()[-1], ("INCRBY", "counter", "4"))
+
+    def test_no_resend_once_sent(self):
+        self.cache.get("warm-up")
+        self.stand_in.hang_up_on = "INCRBY"
+        with self.assertRaises(CacheError):
+            self.cache.incr("counter", 1)
+        # The server ran it once; the client must not have sent it again
+        self.assertEqual(
+            self.stand_in.commands().count(("INCRBY", "counter", "1")), 1
+        )
+        self.assertEqual(self.stand_in.data["counter"][0], "1")
+        # The next command goes over a new connection
+        self.stand_in.hang_up_on = None
+        self.assertEqual(self.cache.incr("counter", 1), 2)
+        self.assertEqual(self.stand_in.connections, 2)
+
+    def test_error_reply(self):
+        with self.assertRaises(CacheError):
+            self.cache._pipeline(("BOGUS",))
+        self.assertEqual(self.cache.get("k"), None)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs os.fork")
+    def test_reconnects_after_fork(self):
+        self.cache.set("k", "parent")
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:  # child: must open its own connection
+            try:
+                self.cache.set("k", "child")
+                os.write(write_end, self.cache.get("k").encode())
+            finally:
+                os._exit(0)
+        os.close(write_end)
+        with os.fdopen(read_end, "rb") as pipe:
+            self.assertEqual(pipe.read(), b"child")
+        os.waitpid(pid, 0)
+        # The parent's connection is still usable and was not shared
+        self.assertEqual(self.cache.get("k"), "child")
+        self.assertEqual(self.stand_in.connections, 2)
+        self.assertEqual(
+            self.stand_in.commands(connection=1),
+            [("SET", "k", "parent"), ("GET", "k")],
+        )
+        self.assertEqual(
+            self.stand_in.commands(connection=2),
+            [("SET", "k", "child"), ("GET", "k")],
+        )
+
+
+class SQLiteCacheTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "cache.db")
+        self.cache = SQLiteCache(self.path)
+        self.addCleanup(self.cache.close)
+
+    def test_get_set_delete_with_ttl(self):
+        self.cache.set("k", "value")
+        self.cache.set("short", "value", ttl=0.05)
+        self.assertEqual(self.cache.get("k"), "value")
+        self.assertEqual(self.cache.get("short"), "value")
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get("short"))
+        self.cache.delete("k")
+        self.assertIsNone(self.cache.get("k"))
+
+    def test_counter_resets_on_expiry(self):
+        self.assertEqual(self.cache.incr("counter", 2, ttl=0.1), 2)
+        self.assertEqual(self.cache.incr("counter", 3, ttl=0.1), 5)
+        time.sleep(0.15)
+        # Restarts from the amount, with a new expiry
+        self.assertEqual(self.cache.incr("counter", 1, ttl=0.1), 1)
+        self.assertEqual(self.cache.incr("counter", 1, ttl=0.1), 2)
+        time.sleep(0.15)
+        self.assertIsNone(self.cache.get("counter"))
+
+    def test_counter_shared_between_instances(self):
+        other = SQLiteCache(self.path)
+        self.addCleanup(other.close)
+        self.assertEqual(self.cache.incr("counter"), 1)
+        self.assertEqual(other.incr("counter"), 2)
+        self.assertEqual(self.cache.get("counter"), "2")
+
+    def test_evicts_least_recently_used(self):
+        cache = SQLiteCache(self.path, max_entries=10)
+        self.addCleanup(cache.close)
+        for i in range(64):
+            cache.set(f"k{i}", "value")
+        self.assertEqual(
+            cache._execute("SELECT COUNT(*) FROM cache")[0][0], 10
+        )
+        self.assertEqual(cache.get("k63"), "value")
+        self.assertIsNone(cache.get("k0"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,364 @@
+"""Span tracing of decision requests.
+
+The /metrics counters say the report phase is slow on average, not why one
+question took two minutes.  Every POST to a decision path (/decide,
+rerender, deepen) is now traced: a root span for the request, with child
+spans for the engine call, each phase, each AI SDK request and its
+attempts, backoff sleeps and budget waits, the near-duplicate and VQL memo
+lookups and the history write.  Spans are kept in memory while the request
+runs (contextvars, so they follow the request into the threadpool) and
+stored in the trace_span table once the response has been sent, linked to
+the question the request saved.
+
+Every request gets an id, taken from its X-Request-ID header or generated,
+returned in the X-Request-ID response header and sent to the AI SDK with
+each call (X-Request-ID plus a W3C traceparent), so a slow call can be
+found in the AI SDK logs.  Trace ids are always generated (a client could
+send the same request id twice); the request id is an attribute of the
+root span.
+
+``python -m backend.tracing --question-id 42`` prints a question's traces
+as OTLP/JSON (``--since-minutes`` for all recent ones), ready to post to an
+OpenTelemetry collector's /v1/traces.  The Grafana dashboard draws the
+waterfall of a question from the trace_span table of the snapshot.
+
+TRACING=0 disables the spans (request ids are still handled).  Spans older
+than TRACE_RETENTION_DAYS are deleted as new traces are stored.
+"""
+
+import argparse
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import re
+import secrets
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import delete, insert, select
+from starlette.concurrency import run_in_threadpool
+
+from backend import db
+from backend.draining import DECISION_PATHS
+from backend.questions.models import TraceSpan
+
+logger = logging.getLogger(__name__)
+
+TRACING = os.environ.get("TRACING", "1") == "1"
+TRACE_RETENTION_DAYS = float(os.environ.get("TRACE_RETENTION_DAYS", "14"))
+SERVICE_NAME = os.environ.get("OTEL_SERVICE_NAME", "hackudc-backend")
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Accepted incoming request ids (anything else is replaced)
+_REQUEST_ID = re.compile(r"^[\w.:-]{1,64}$")
+# Delete expired spans every this many stored traces
+_PRUNE_EVERY = 100
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    name: str
+    start: float = field(default_factory=time.time)
+    end: float | None = None
+    status: str = "ok"
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Trace:
+    id: str
+    spans: list[Span] = field(default_factory=list)
+    question_id: int | None = None
+
+
+_request_id: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "request_id", default=None
+)
+_trace: contextvars.ContextVar[Trace | None] = contextvars.ContextVar(
+    "trace", default=None
+)
+_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "span", default=None
+)
+
+
+def request_id() -> str | None:
+    """Id of the request being handled, if any."""
+    return _request_id.get()
+
+
+def outgoing_headers() -> dict[str, str]:
+    """Headers that tie a call to another service to this request."""
+    headers = {}
+    rid = _request_id.get()
+    if rid is not None:
+        headers[REQUEST_ID_HEADER] = rid
+    current = _span.get()
+    if current is not None:
+        headers["traceparent"] = f"00-{current.trace_id}-{current.span_id}-01"
+    return headers
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes):
+    """Time the block as a child of the current span.  A no-op outside a
+    traced request; yields the Span (or None)."""
+    trace = _trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _span.get()
+    current = Span(
+        trace_id=trace.id,
+        span_id=secrets.token_hex(8),
+        parent_id=parent.span_id if parent else None,
+        name=name,
+        attributes=attributes,
+    )
+    token = _span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.status = "error"
+        current.attributes["error"] = f"{type(exc).__name__}: {exc}"[:200]
+        raise
+    finally:
+        current.end = time.time()
+        _span.reset(token)
+        trace.spans.append(current)
+
+
+def traced(name: str):
+    """Decorator running the function in span(name)."""
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def annotate(**attributes) -> None:
+    """Add attributes to the current span, if any."""
+    current = _span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def set_question_id(question_id: int | None) -> None:
+    """Link the current trace to the question the request saved."""
+    trace = _trace.get()
+    if trace is not None:
+        trace.question_id = question_id
+
+
+def in_context(fn):
+    """*fn* bound to the current context, for threads started by hand (a
+    ThreadPoolExecutor does not copy contextvars, unlike run_in_threadpool),
+    so its spans get the right parent."""
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        # A context can't be entered by two threads at once: one copy each
+        return context.copy().run(fn, *args, **kwargs)
+
+    return wrapper
+
+
+# ── Storage ─────────────────────────────────────────────────────────────────
+
+
+class TraceStore:
+    """Writes finished traces to trace_span and reads them back as OTLP."""
+
+    def __init__(self, engine=None):
+        self._engine = engine
+        self._saved = 0
+
+    @property
+    def engine(self):
+        return self._engine or db.engine
+
+    def save(self, trace: Trace) -> None:
+        rows = [
+            {
+                "trace_id": trace.id,
+                "span_id": s.span_id,
+                "parent_span_id": s.parent_id,
+                "question_id": trace.question_id,
+                "name": s.name[:64],
+                "start_ms": s.start * 1000,
+                "duration_ms": ((s.end or s.start) - s.start) * 1000,
+                "status": s.status,
+                "attributes": json.dumps(s.attributes, default=str)
+                if s.attributes
+                else None,
+            }
+            for s in trace.spans
+        ]
+        if not rows:
+            return
+        with self.engine.begin() as connection:
+            connection.execute(insert(TraceSpan.__table__), rows)
+            self._saved += 1
+            if self._saved % _PRUNE_EVERY == 0:
+                cutoff = (time.time() - TRACE_RETENTION_DAYS * 86400) * 1000
+                connection.execute(
+                    delete(TraceSpan.__table__).where(
+                        TraceSpan.__table__.c.start_ms < cutoff
+                    )
+                )
+
+    def load(
+        self, question_id: int | None = None, since_ms: float | None = None
+    ) -> list[dict]:
+        table = TraceSpan.__table__
+        query = select(table).order_by(table.c.trace_id, table.c.start_ms)
+        if question_id is not None:
+            query = query.where(table.c.question_id == question_id)
+        if since_ms is not None:
+            query = query.where(table.c.start_ms >= since_ms)
+        with self.engine.connect() as connection:
+            return [dict(row) for row in connection.execute(query).mappings()]
+
+
+trace_store = TraceStore()
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(rows: list[dict]) -> dict:
+    """trace_span rows as an OTLP/JSON ExportTraceServiceRequest."""
+    spans = []
+    for row in rows:
+        attributes = json.loads(row["attributes"]) if row["attributes"] else {}
+        if row["question_id"] is not None:
+            attributes["question_id"] = row["question_id"]
+        start_ns = int(row["start_ms"] * 1_000_000)
+        span_json = {
+            "traceId": row["trace_id"],
+            "spanId": row["span_id"],
+            "name": row["name"],
+            # SERVER for the request itself, INTERNAL for its steps
+            "kind": 2 if row["parent_span_id"] is None else 1,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int(row["duration_ms"] * 1_000_000)),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in attributes.items()
+            ],
+            # STATUS_CODE_OK / STATUS_CODE_ERROR
+            "status": {"code": 2 if row["status"] == "error" else 1},
+        }
+        if row["parent_span_id"] is not None:
+            span_json["parentSpanId"] = row["parent_span_id"]
+        spans.append(span_json)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": SERVICE_NAME}}
+                    ]
+                },
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+            }
+        ]
+    }
+
+
+# ── Middleware ──────────────────────────────────────────────────────────────
+
+
+class TraceRequests:
+    """ASGI middleware assigning request ids and tracing decision requests
+    (see module docstring)."""
+
+    def __init__(self, app, store: TraceStore = trace_store):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        incoming = dict(scope["headers"]).get(REQUEST_ID_HEADER.lower().encode())
+        rid = incoming.decode("latin-1") if incoming else ""
+        if not _REQUEST_ID.match(rid):
+            rid = secrets.token_hex(16)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (REQUEST_ID_HEADER.encode(), rid.encode("latin-1")),
+                ]
+            await send(message)
+
+        token = _request_id.set(rid)
+        try:
+            if not (
+                TRACING
+                and scope["method"] == "POST"
+                and DECISION_PATHS.match(scope["path"])
+            ):
+                await self.app(scope, receive, send_with_id)
+                return
+            # Always a new trace id: client request ids need not be unique
+            trace = Trace(id=secrets.token_hex(16))
+            trace_token = _trace.set(trace)
+            try:
+                with span(f"POST {scope['path']}", request_id=rid):
+                    await self.app(scope, receive, send_with_id)
+            finally:
+                _trace.reset(trace_token)
+        finally:
+            _request_id.reset(token)
+        # The response has been sent: store the trace off the event loop
+        try:
+            await run_in_threadpool(self.store.save, trace)
+        except Exception as exc:
+            logger.warning("[Tracing] Could not store trace %s: %s", trace.id, exc)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Print stored decision traces as OTLP/JSON."
+    )
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--question-id", type=int)
+    group.add_argument("--since-minutes", type=float)
+    args = parser.parse_args()
+    since_ms = (
+        (time.time() - args.since_minutes * 60) * 1000
+        if args.since_minutes is not None
+        else None
+    )
+    rows = trace_store.load(question_id=args.question_id, since_ms=since_ms)
+    json.dump(to_otlp(rows), sys.stdout)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Uploaded files: size-limited streaming, image thumbnails and static serving.
+
+- UploadSizeLimit rejects a request to a limited path with 413 as soon as
+  its body passes the limit (by Content-Length, or while it streams in), so
+  an oversized upload is never buffered whole, and with 400 if its
+  Content-Length is not a number.
+- save_upload copies an upload to a temporary file in chunks, without
+  holding it in memory or writing from the event loop.
+- make_thumbnail turns an image into a fixed-size square WebP (Pillow,
+  optional; without it the upload is kept as is).  Run it in the threadpool.
+- ImmutableStaticFiles serves /uploads with its ETag plus a year-long
+  immutable Cache-Control: uploaded files get a new unique name whenever
+  they change, so a URL's content never does.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import JSONResponse
+from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+
+from .lazy import available
+
+UPLOADS_DIR = Path(__file__).resolve().parent / "uploads"
+
+# Read/write size when copying uploads
+_CHUNK_SIZE = 64 * 1024
+# Room for the multipart boundaries and headers around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+UPLOADS_CACHE_CONTROL = os.environ.get(
+    "UPLOADS_CACHE_CONTROL", "public, max-age=31536000, immutable"
+)
+
+
+class UploadTooLarge(Exception):
+    """An upload passed its size limit."""
+
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File too large. Maximum size is {limit // (1024 * 1024)} MB",
+    )
+
+
+class UploadSizeLimit:
+    """ASGI middleware limiting the request body size of some paths
+    (path -> bytes)."""
+
+    def __init__(self, app, limits: dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and not declared.isdigit():
+            response = JSONResponse(
+                {"detail": "Invalid Content-Length header"},
+                status.HTTP_400_BAD_REQUEST,
+            )
+            await response(scope, receive, send)
+            return
+        if declared is not None and int(declared) > limit:
+            error = _too_large(limit - MULTIPART_OVERHEAD)
+            response = JSONResponse({"detail": error.detail}, error.status_code)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            received += len(message.get("body", b""))
+            if received > limit:
+                # FastAPI passes HTTPExceptions from body parsing through
+                raise _too_large(limit - MULTIPART_OVERHEAD)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def save_upload(file: UploadFile, directory: Path, max_size: int) -> Path:
+    """Copy *file* in chunks to a new temporary file in *directory* and
+    return its path. Raises UploadTooLarge (and removes the copy) once more
+    than *max_size* bytes were read."""
+    fd, name = tempfile.mkstemp(dir=directory, suffix=".part")
+    path = Path(name)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge
+                await run_in_threadpool(out.write, chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path
+
+
+def images_supported() -> bool:
+    """Whether Pillow is installed (optional: uploads are stored unprocessed
+    without it)."""
+    return available("PIL")
+
+
+def make_thumbnail(source: Path, destination: Path, size: int) -> None:
+    """Write *source* as a *size* x *size* WebP to *destination* (centre
+    crop, EXIF orientation applied). Raises ValueError if *source* is not an
+    image. Blocking and CPU-bound."""
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(source) as image:
+            # JPEG: decode at a reduced scale close to the target size
+            image.draft("RGB", (size * 2, size * 2))
+            image = ImageOps.exif_transpose(image)
+            thumbnail = ImageOps.fit(
+                image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB"),
+                (size, size),
+                Image.Resampling.LANCZOS,
+            )
+    except (OSError, Image.DecompressionBombError) as exc:
+        raise ValueError(f"Not a valid image: {exc}") from exc
+    thumbnail.save(destination, "WEBP", quality=85, method=4)
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles that marks responses as cacheable forever (see module
+    docstring); ETag and If-None-Match are handled by StaticFiles."""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = UPLOADS_CACHE_CONTROL
+        return response
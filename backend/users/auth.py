@@ -3,10 +3,11 @@ from typing import Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from ..db import get_session
+from ..db import get_async_session
+from .cache import user_cache
+from .crud import get_user_by_id_async
 from .models import User
 
 import os
@@ -20,6 +21,9 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/login")
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    # jose pulls in cryptography: imported on first use (backend/lazy.py)
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -30,9 +34,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_async_session),
 ) -> User:
+    from jose import JWTError, jwt
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -47,8 +54,10 @@ def get_current_user(
     except (JWTError, ValueError):
         raise credentials_exception
 
-    statement = select(User).where(User.id == user_id)
-    user = session.exec(statement).first()
+    user = user_cache.get(user_id)
     if user is None:
-        raise credentials_exception
+        user = await get_user_by_id_async(session, user_id)
+        if user is None:
+            raise credentials_exception
+        user_cache.put(user)
     return user
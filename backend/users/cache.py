@@ -0,0 +1,99 @@
+"""In-process cache of authenticated users, keyed by user id.
+
+get_current_user used to load the user from the database on every
+authenticated request.  It now keeps each user's column values for
+USER_CACHE_TTL_SECONDS, up to USER_CACHE_SIZE users (least recently used
+dropped first).  update_user and update_user_profile_image invalidate the
+entry; other workers see a change at the latest when their entry expires.
+Set USER_CACHE_SIZE=0 to disable.
+
+Hits return a fresh detached User per request, so a route may change it and
+add it to its session (an UPDATE, as for a loaded user) without touching the
+cached copy.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy.orm import make_transient_to_detached
+
+from .. import metrics
+from .models import User
+
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", "60"))
+
+
+class UserCache:
+    """Bounded LRU of user column values with a TTL (see module docstring)."""
+
+    def __init__(
+        self, size: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL_SECONDS
+    ):
+        self.size = size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Touched from the event loop and from run_sync threads
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[int, tuple[float, dict]] = OrderedDict()
+
+    def get(self, user_id: int) -> User | None:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            values = entry[1]
+        user = User(**values)
+        make_transient_to_detached(user)
+        return user
+
+    def put(self, user: User) -> None:
+        if self.size <= 0:
+            return
+        values = user.model_dump()
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+user_cache = UserCache()
+
+metrics.register(
+    "user_cache_hits_total",
+    "counter",
+    "Authenticated requests served from the user cache",
+    lambda: user_cache.hits,
+)
+metrics.register(
+    "user_cache_misses_total",
+    "counter",
+    "Authenticated requests that loaded the user from the database",
+    lambda: user_cache.misses,
+)
+metrics.register(
+    "user_cache_hit_ratio",
+    "gauge",
+    "Share of user lookups served from the user cache",
+    lambda: user_cache.hit_rate,
+)
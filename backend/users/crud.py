@@ -1,7 +1,17 @@
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .cache import user_cache
 from .models import User
 from .schemas import UserCreate, UserUpdate
-from .utils import hash_password, verify_password
+from .utils import (
+    PasswordHashBusy,
+    hash_password,
+    hash_password_async,
+    needs_rehash,
+    verify_password,
+    verify_password_async,
+)
 
 
 def get_user_by_username(session: Session, username: str) -> User | None:
@@ -12,9 +22,8 @@ def get_user_by_email(session: Session, email: str) -> User | None:
     return session.exec(select(User).where(User.email == email)).first()
 
 
-def create_user(session: Session, user_create: UserCreate) -> User:
-    hashed = hash_password(user_create.password)
-    user = User(
+def _new_user(user_create: UserCreate, hashed: str) -> User:
+    return User(
         username=user_create.username,
         email=user_create.email,
         hashed_password=hashed,
@@ -23,6 +32,10 @@ def create_user(session: Session, user_create: UserCreate) -> User:
         date_of_birth=user_create.date_of_birth,
         user_preferences=user_create.user_preferences,
     )
+
+
+def create_user(session: Session, user_create: UserCreate) -> User:
+    user = _new_user(user_create, hash_password(user_create.password))
     session.add(user)
     session.commit()
     session.refresh(user)
@@ -37,9 +50,20 @@ def authenticate_user(session: Session, identifier: str, password: str) -> User
         return None
     if not verify_password(password, user.hashed_password):
         return None
+    if needs_rehash(user.hashed_password):
+        _set_password_hash(session, user, hash_password(password))
     return user
 
 
+def _set_password_hash(session: Session, user: User, hashed: str) -> None:
+    """Store a password hash made with the current parameters."""
+    user.hashed_password = hashed
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    user_cache.invalidate(user.id)
+
+
 def update_user(session: Session, user: User, updates: UserUpdate) -> User:
     """Apply partial updates to an existing user and persist them."""
     update_data = updates.model_dump(exclude_unset=True)
@@ -47,6 +71,7 @@ def update_user(session: Session, user: User, updates: UserUpdate) -> User:
         setattr(user, field, value)
     session.add(user)
     session.commit()
+    user_cache.invalidate(user.id)
     session.refresh(user)
     return user
 
@@ -56,5 +81,68 @@ def update_user_profile_image(session: Session, user: User, image_path: str) ->
     user.profile_image = image_path
     session.add(user)
     session.commit()
+    user_cache.invalidate(user.id)
     session.refresh(user)
     return user
+
+
+# ── Async variants ──────────────────────────────────────────────────────────
+# Used by the API routes with backend.db.get_async_session.  Password hashing
+# is CPU-bound, so it runs in the hashing process pool (users/utils.py) and
+# may raise PasswordHashBusy when that pool's queue is full.
+
+
+async def get_user_by_username_async(
+    session: AsyncSession, username: str
+) -> User | None:
+    return (await session.exec(select(User).where(User.username == username))).first()
+
+
+async def get_user_by_email_async(session: AsyncSession, email: str) -> User | None:
+    return (await session.exec(select(User).where(User.email == email))).first()
+
+
+async def get_user_by_id_async(session: AsyncSession, user_id: int) -> User | None:
+    return (await session.exec(select(User).where(User.id == user_id))).first()
+
+
+async def create_user_async(session: AsyncSession, user_create: UserCreate) -> User:
+    hashed = await hash_password_async(user_create.password)
+    user = _new_user(user_create, hashed)
+    session.add(user)
+    await session.commit()
+    await session.refresh(user)
+    return user
+
+
+async def authenticate_user_async(
+    session: AsyncSession, identifier: str, password: str
+) -> User | None:
+    user = await get_user_by_username_async(
+        session, identifier
+    ) or await get_user_by_email_async(session, identifier)
+    if not user:
+        return None
+    if not await verify_password_async(password, user.hashed_password):
+        return None
+    if needs_rehash(user.hashed_password):
+        try:
+            hashed = await hash_password_async(password)
+        except PasswordHashBusy:
+            return user  # upgrade on a later login
+        await session.run_sync(_set_password_hash, user, hashed)
+    return user
+
+
+async def update_user_async(
+    session: AsyncSession, user: User, updates: UserUpdate
+) -> User:
+    """Apply partial updates to an existing user and persist them."""
+    return await session.run_sync(update_user, user, updates)
+
+
+async def update_user_profile_image_async(
+    session: AsyncSession, user: User, image_path: str
+) -> User:
+    """Update the user's profile image path."""
+    return await session.run_sync(update_user_profile_image, user, image_path)
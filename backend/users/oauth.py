@@ -0,0 +1,155 @@
+"""HTTP client for social login (Google and GitHub).
+
+All calls share one pooled requests.Session, so the TLS connections to
+Google and GitHub stay open between logins.  Google's signing certificates
+are kept for their Cache-Control max-age (hours), so verifying a Google ID
+token needs no request at all in the steady state.  For GitHub, the code is
+exchanged for a token, then the profile and the emails are fetched
+concurrently.
+
+The endpoints can be pointed elsewhere (e.g. local stub servers) with
+GOOGLE_CERTS_URL, GITHUB_OAUTH_URL and GITHUB_API_URL.
+"""
+
+import asyncio
+import os
+import re
+import threading
+import time
+
+import requests
+from google.auth import exceptions as google_exceptions
+from google.auth.transport import requests as google_requests
+from google.oauth2 import id_token as google_id_token
+from requests.adapters import HTTPAdapter
+from starlette.concurrency import run_in_threadpool
+
+GOOGLE_CLIENT_ID = os.environ.get("GOOGLE_CLIENT_ID", "")
+GOOGLE_CERTS_URL = os.environ.get(
+    "GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs"
+)
+GITHUB_CLIENT_ID = os.environ.get("GITHUB_CLIENT_ID", "")
+GITHUB_CLIENT_SECRET = os.environ.get("GITHUB_CLIENT_SECRET", "")
+GITHUB_OAUTH_URL = os.environ.get("GITHUB_OAUTH_URL", "https://github.com/login/oauth")
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+
+OAUTH_TIMEOUT = float(os.environ.get("OAUTH_TIMEOUT", "10"))
+OAUTH_POOL_SIZE = int(os.environ.get("OAUTH_POOL_SIZE", "20"))
+
+_GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class OAuthError(Exception):
+    """The provider rejected the credential or code."""
+
+
+def _new_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=OAUTH_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class _CachingRequest(google_requests.Request):
+    """google-auth transport on the shared session that keeps successful GET
+    responses (the signing certificates) for their Cache-Control max-age."""
+
+    def __init__(self, session: requests.Session):
+        super().__init__(session=session)
+        self._cache: dict[str, tuple[float, object]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, url, method="GET", body=None, headers=None, timeout=None, **kw):
+        if method != "GET":
+            return super().__call__(url, method, body, headers, timeout, **kw)
+        with self._lock:
+            cached = self._cache.get(url)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        response = super().__call__(
+            url, method, body, headers, timeout or OAUTH_TIMEOUT, **kw
+        )
+        max_age = _MAX_AGE.search(response.headers.get("cache-control", ""))
+        if response.status == 200 and max_age:
+            ttl = int(max_age.group(1)) - int(response.headers.get("age", "0") or 0)
+            if ttl > 0:
+                with self._lock:
+                    self._cache[url] = (time.monotonic() + ttl, response)
+        return response
+
+
+class OAuthClient:
+    """Verifies Google ID tokens and resolves GitHub OAuth codes (see module
+    docstring)."""
+
+    def __init__(self):
+        self.session = _new_session()
+        self._google_request = _CachingRequest(self.session)
+
+    # -----------------------------
+    # GOOGLE
+    # -----------------------------
+    def _verify_google(self, credential: str) -> dict:
+        idinfo = google_id_token.verify_token(
+            credential,
+            self._google_request,
+            audience=GOOGLE_CLIENT_ID,
+            certs_url=GOOGLE_CERTS_URL,
+        )
+        if idinfo.get("iss") not in _GOOGLE_ISSUERS:
+            raise OAuthError("Wrong issuer")
+        return idinfo
+
+    async def verify_google(self, credential: str) -> dict:
+        """Claims of a Google ID token; raises OAuthError if it is invalid."""
+        try:
+            # Blocking only when the certificates have expired
+            return await run_in_threadpool(self._verify_google, credential)
+        except (ValueError, google_exceptions.GoogleAuthError) as exc:
+            raise OAuthError(str(exc)) from exc
+
+    # -----------------------------
+    # GITHUB
+    # -----------------------------
+    def _post_json(self, url: str, **kwargs):
+        return self.session.post(url, timeout=OAUTH_TIMEOUT, **kwargs).json()
+
+    def _get_json(self, url: str, **kwargs):
+        return self.session.get(url, timeout=OAUTH_TIMEOUT, **kwargs).json()
+
+    async def github_user(self, code: str) -> tuple[dict, object]:
+        """Exchange a GitHub OAuth code and return the user's profile and
+        emails; raises OAuthError if GitHub rejects the code."""
+        token_data = await run_in_threadpool(
+            self._post_json,
+            f"{GITHUB_OAUTH_URL}/access_token",
+            json={
+                "client_id": GITHUB_CLIENT_ID,
+                "client_secret": GITHUB_CLIENT_SECRET,
+                "code": code,
+            },
+            headers={"Accept": "application/json"},
+        )
+        gh_access_token = token_data.get("access_token")
+        if not gh_access_token:
+            raise OAuthError("GitHub authentication failed")
+
+        headers = {
+            "Authorization": f"Bearer {gh_access_token}",
+            "Accept": "application/json",
+        }
+        # Profile and emails (in case the email is private) in parallel
+        gh_user, emails = await asyncio.gather(
+            run_in_threadpool(
+                self._get_json, f"{GITHUB_API_URL}/user", headers=headers
+            ),
+            run_in_threadpool(
+                self._get_json, f"{GITHUB_API_URL}/user/emails", headers=headers
+            ),
+        )
+        return gh_user, emails
+
+
+oauth_client = OAuthClient()
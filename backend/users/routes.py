@@ -1,57 +1,85 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from ..db import get_session
+from ..db import get_async_session
 from .schemas import UserCreate, UserRead, UserUpdate, LoginData, GoogleAuthRequest
 from .crud import (
-    create_user,
-    get_user_by_username,
-    get_user_by_email,
-    authenticate_user,
-    update_user,
-    update_user_profile_image,
+    create_user_async,
+    get_user_by_username_async,
+    get_user_by_email_async,
+    authenticate_user_async,
+    update_user_async,
+    update_user_profile_image_async,
 )
 from .auth import create_access_token, get_current_user
+from .utils import PasswordHashBusy
 from .schemas import TokenWithUser
+from ..uploads import (
+    UPLOADS_DIR,
+    UploadTooLarge,
+    images_supported,
+    make_thumbnail,
+    save_upload,
+)
 
 import os
 import uuid
 from pathlib import Path
-import requests as http_requests
-from google.oauth2 import id_token as google_id_token
-from google.auth.transport import requests as google_requests
-
-GOOGLE_CLIENT_ID = os.environ.get("GOOGLE_CLIENT_ID", "")
-GITHUB_CLIENT_ID = os.environ.get("GITHUB_CLIENT_ID", "")
-GITHUB_CLIENT_SECRET = os.environ.get("GITHUB_CLIENT_SECRET", "")
 
 # Directory for uploaded profile images
-UPLOAD_DIR = Path(__file__).resolve().parent.parent / "uploads" / "profile_images"
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+# (created by the app lifespan)
+UPLOAD_DIR = UPLOADS_DIR / "profile_images"
 
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5 MB
+# Side of the square WebP profile images are stored as (with Pillow)
+PROFILE_IMAGE_SIZE = int(os.environ.get("PROFILE_IMAGE_SIZE", "256"))
 
 router = APIRouter()
 
 
+def _hash_busy() -> HTTPException:
+    """503 for when the password hashing pool is saturated (login burst)."""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many logins in progress, try again shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+def _remove_profile_image(relative_path: str | None) -> None:
+    if relative_path:
+        (UPLOADS_DIR.parent / relative_path).unlink(missing_ok=True)
+
+
 @router.post("/register", response_model=UserRead)
-def register(user_in: UserCreate, session: Session = Depends(get_session)):
+async def register(
+    user_in: UserCreate, session: AsyncSession = Depends(get_async_session)
+):
     # simple uniqueness checks
-    if get_user_by_username(session, user_in.username):
+    if await get_user_by_username_async(session, user_in.username):
         raise HTTPException(status_code=400, detail="Username already registered")
-    if get_user_by_email(session, user_in.email):
+    if await get_user_by_email_async(session, user_in.email):
         raise HTTPException(status_code=400, detail="Email already registered")
-    user = create_user(session, user_in)
+    try:
+        user = await create_user_async(session, user_in)
+    except PasswordHashBusy:
+        raise _hash_busy()
     return user
 
 
 @router.post("/login", response_model=TokenWithUser)
-def login(data: LoginData, session: Session = Depends(get_session)):
+async def login(
+    data: LoginData, session: AsyncSession = Depends(get_async_session)
+):
     identifier = data.username or data.email
     if not identifier:
         raise HTTPException(status_code=400, detail="Provide username or email")
-    user = authenticate_user(session, identifier, data.password)
+    try:
+        user = await authenticate_user_async(session, identifier, data.password)
+    except PasswordHashBusy:
+        raise _hash_busy()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
@@ -64,21 +92,24 @@ def login(data: LoginData, session: Session = Depends(get_session)):
 
 
 @router.post("/logout")
-def logout(current_user=Depends(get_current_user)):
+async def logout(current_user=Depends(get_current_user)):
     """Logout endpoint - token is invalidated on frontend"""
     return {"message": "Successfully logged out"}
 
 
 @router.post("/auth/google")
-def google_auth(data: GoogleAuthRequest, session: Session = Depends(get_session)):
+async def google_auth(
+    data: GoogleAuthRequest, session: AsyncSession = Depends(get_async_session)
+):
     """Verify Google ID token. If user exists, log them in.
     If not, return needs_registration with the email/name so the frontend
     can redirect to the register page with pre-filled data."""
+    # requests and google-auth: imported on first use (backend/lazy.py)
+    from .oauth import OAuthError, oauth_client
+
     try:
-        idinfo = google_id_token.verify_oauth2_token(
-            data.credential, google_requests.Request(), GOOGLE_CLIENT_ID
-        )
-    except Exception:
+        idinfo = await oauth_client.verify_google(data.credential)
+    except OAuthError:
         raise HTTPException(status_code=401, detail="Invalid Google token")
 
     email = idinfo.get("email")
@@ -87,7 +118,7 @@ def google_auth(data: GoogleAuthRequest, session: Session = Depends(get_session)
     if not email:
         raise HTTPException(status_code=400, detail="Google token missing email")
 
-    user = get_user_by_email(session, email)
+    user = await get_user_by_email_async(session, email)
     if user:
         # Existing user — log them in
         access_token = create_access_token({"sub": str(user.id)})
@@ -108,19 +139,19 @@ def google_auth(data: GoogleAuthRequest, session: Session = Depends(get_session)
 
 
 @router.get("/me", response_model=UserRead)
-def get_me(current_user=Depends(get_current_user)):
+async def get_me(current_user=Depends(get_current_user)):
     """Return the currently authenticated user's profile."""
     return current_user
 
 
 @router.put("/me", response_model=UserRead)
-def update_me(
+async def update_me(
     updates: UserUpdate,
     current_user=Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
     """Update the currently authenticated user's profile fields."""
-    updated = update_user(session, current_user, updates)
+    updated = await update_user_async(session, current_user, updates)
     return updated
 
 
@@ -128,9 +159,10 @@ def update_me(
 async def upload_profile_image(
     file: UploadFile = File(...),
     current_user=Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
-    """Upload or replace the current user's profile image."""
+    """Upload or replace the current user's profile image. The upload is
+    streamed to disk and stored as a PROFILE_IMAGE_SIZE px square WebP."""
     # Validate extension
     ext = Path(file.filename).suffix.lower() if file.filename else ""
     if ext not in ALLOWED_EXTENSIONS:
@@ -139,78 +171,65 @@ async def upload_profile_image(
             detail=f"File type '{ext}' not allowed. Use: {', '.join(ALLOWED_EXTENSIONS)}",
         )
 
-    # Read and validate size
-    contents = await file.read()
-    if len(contents) > MAX_FILE_SIZE:
+    # Stream to a temporary file, aborting once it passes the size limit
+    try:
+        upload_path = await save_upload(file, UPLOAD_DIR, MAX_FILE_SIZE)
+    except UploadTooLarge:
         raise HTTPException(
-            status_code=400,
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
             detail=f"File too large. Maximum size is {MAX_FILE_SIZE // (1024*1024)} MB",
         )
 
-    # Delete old image if it exists
-    if current_user.profile_image:
-        old_path = Path(__file__).resolve().parent.parent / current_user.profile_image
-        if old_path.exists():
-            old_path.unlink()
+    # Save with unique filename (a new URL, so it can be cached forever)
+    if not images_supported():
+        unique_name = f"{current_user.id}_{uuid.uuid4().hex}{ext}"
+        await run_in_threadpool(upload_path.rename, UPLOAD_DIR / unique_name)
+    else:
+        unique_name = f"{current_user.id}_{uuid.uuid4().hex}.webp"
+        try:
+            await run_in_threadpool(
+                make_thumbnail,
+                upload_path,
+                UPLOAD_DIR / unique_name,
+                PROFILE_IMAGE_SIZE,
+            )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="File is not a valid image")
+        finally:
+            upload_path.unlink(missing_ok=True)
 
-    # Save with unique filename
-    unique_name = f"{current_user.id}_{uuid.uuid4().hex}{ext}"
-    file_path = UPLOAD_DIR / unique_name
-    file_path.write_bytes(contents)
+    # Delete old image if it exists
+    await run_in_threadpool(_remove_profile_image, current_user.profile_image)
 
     # Store relative path in DB
     relative_path = f"uploads/profile_images/{unique_name}"
-    updated_user = update_user_profile_image(session, current_user, relative_path)
+    updated_user = await update_user_profile_image_async(
+        session, current_user, relative_path
+    )
     return updated_user
 
 
 @router.delete("/me/profile-image", response_model=UserRead)
-def delete_profile_image(
+async def delete_profile_image(
     current_user=Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
     """Remove the current user's profile image."""
-    if current_user.profile_image:
-        old_path = Path(__file__).resolve().parent.parent / current_user.profile_image
-        if old_path.exists():
-            old_path.unlink()
-    updated_user = update_user_profile_image(session, current_user, None)
+    await run_in_threadpool(_remove_profile_image, current_user.profile_image)
+    updated_user = await update_user_profile_image_async(session, current_user, None)
     return updated_user
+
+
 @router.post("/auth/github")
-def github_auth(code: str, session: Session = Depends(get_session)):
+async def github_auth(code: str, session: AsyncSession = Depends(get_async_session)):
     """Exchange GitHub OAuth code for access token, fetch user info.
     If user exists, log them in. Otherwise return needs_registration."""
-    # Exchange code for access token
-    token_res = http_requests.post(
-        "https://github.com/login/oauth/access_token",
-        json={
-            "client_id": GITHUB_CLIENT_ID,
-            "client_secret": GITHUB_CLIENT_SECRET,
-            "code": code,
-        },
-        headers={"Accept": "application/json"},
-        timeout=10,
-    )
-    token_data = token_res.json()
-    gh_access_token = token_data.get("access_token")
-    if not gh_access_token:
-        raise HTTPException(status_code=401, detail="GitHub authentication failed")
-
-    # Fetch GitHub user profile
-    user_res = http_requests.get(
-        "https://api.github.com/user",
-        headers={"Authorization": f"Bearer {gh_access_token}", "Accept": "application/json"},
-        timeout=10,
-    )
-    gh_user = user_res.json()
+    from .oauth import OAuthError, oauth_client
 
-    # Fetch emails (in case email is private)
-    emails_res = http_requests.get(
-        "https://api.github.com/user/emails",
-        headers={"Authorization": f"Bearer {gh_access_token}", "Accept": "application/json"},
-        timeout=10,
-    )
-    emails = emails_res.json()
+    try:
+        gh_user, emails = await oauth_client.github_user(code)
+    except OAuthError:
+        raise HTTPException(status_code=401, detail="GitHub authentication failed")
     primary_email = None
     if isinstance(emails, list):
         for em in emails:
@@ -227,7 +246,7 @@ def github_auth(code: str, session: Session = Depends(get_session)):
     if not email:
         raise HTTPException(status_code=400, detail="Could not retrieve email from GitHub")
 
-    user = get_user_by_email(session, email)
+    user = await get_user_by_email_async(session, email)
     if user:
         access_token = create_access_token({"sub": str(user.id)})
         return {
@@ -1,21 +1,169 @@
+"""Password hashing (PBKDF2-HMAC).
+
+Hashes are stored as ``pbkdf2_<digest>$<iterations>$<salt>$<hexhash>``, so the
+parameters can change (PASSWORD_HASH_DIGEST, PASSWORD_HASH_ITERATIONS) without
+invalidating existing hashes: a hash with other parameters still verifies and
+is replaced on the user's next login (needs_rehash).  Hashes from before this
+format (``<salt>$<hexhash>``, SHA-256 with 100 000 iterations) are read the
+same way.
+
+Each hash takes tens of milliseconds of CPU, so the API computes them in a
+process pool of PASSWORD_HASH_WORKERS processes (default: the cores divided
+among the WEB_CONCURRENCY API workers, each of which has its own pool)
+instead of the event loop's threadpool, where a login burst would hold up
+unrelated requests.  At most PASSWORD_HASH_QUEUE hashes may be running or
+waiting; beyond that the *_async functions raise PasswordHashBusy (the routes
+answer 503).  PASSWORD_HASH_WORKERS=0 computes them in the threadpool.
+"""
+
+import asyncio
 import hashlib
+import logging
+import multiprocessing
+import os
 import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+PASSWORD_HASH_DIGEST = os.environ.get("PASSWORD_HASH_DIGEST", "sha256")
+PASSWORD_HASH_ITERATIONS = int(os.environ.get("PASSWORD_HASH_ITERATIONS", "100000"))
+_WEB_CONCURRENCY = max(int(os.environ.get("WEB_CONCURRENCY", "1")), 1)
+PASSWORD_HASH_WORKERS = int(
+    os.environ.get(
+        "PASSWORD_HASH_WORKERS", str(max((os.cpu_count() or 1) // _WEB_CONCURRENCY, 1))
+    )
+)
+PASSWORD_HASH_QUEUE = int(
+    os.environ.get("PASSWORD_HASH_QUEUE", str(max(PASSWORD_HASH_WORKERS, 1) * 16))
+)
+
+# Parameters of hashes stored without them (the original salt$hexhash format)
+_LEGACY_DIGEST = "sha256"
+_LEGACY_ITERATIONS = 100_000
+
+
+class PasswordHashBusy(Exception):
+    """PASSWORD_HASH_QUEUE hashes are already running or waiting."""
+
+
+def _pbkdf2(password: str, salt: str, digest: str, iterations: int) -> str:
+    return hashlib.pbkdf2_hmac(
+        digest, password.encode(), salt.encode(), iterations
+    ).hex()
+
+
+def _parse(hashed: str) -> tuple[str, int, str, str] | None:
+    """(digest, iterations, salt, hexhash) of a stored hash, or None."""
+    parts = hashed.split("$")
+    if len(parts) == 2:
+        return _LEGACY_DIGEST, _LEGACY_ITERATIONS, parts[0], parts[1]
+    if len(parts) == 4 and parts[0].startswith("pbkdf2_") and parts[1].isdigit():
+        return parts[0].removeprefix("pbkdf2_"), int(parts[1]), parts[2], parts[3]
+    return None
+
+
+def _hash(password: str, salt: str, digest: str, iterations: int) -> str:
+    pwd_hash = _pbkdf2(password, salt, digest, iterations)
+    return f"pbkdf2_{digest}${iterations}${salt}${pwd_hash}"
 
 
 def hash_password(password: str, salt: str | None = None) -> str:
-    """Hash a password with PBKDF2-HMAC-SHA256 and return salt$hexhash."""
+    """Hash a password with PBKDF2-HMAC using the configured parameters."""
     if salt is None:
         salt = secrets.token_hex(16)
-    pwd_hash = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), 100_000)
-    return f"{salt}${pwd_hash.hex()}"
+    return _hash(password, salt, PASSWORD_HASH_DIGEST, PASSWORD_HASH_ITERATIONS)
 
 
 def verify_password(password: str, hashed: str) -> bool:
+    parsed = _parse(hashed)
+    if parsed is None:
+        return False
+    digest, iterations, salt, hexhash = parsed
     try:
-        salt, hexhash = hashed.split("$", 1)
-    except ValueError:
+        test = _pbkdf2(password, salt, digest, iterations)
+    except ValueError:  # unsupported digest
         return False
-    test = hashlib.pbkdf2_hmac(
-        "sha256", password.encode(), salt.encode(), 100_000
-    ).hex()
     return secrets.compare_digest(test, hexhash)
+
+
+def needs_rehash(hashed: str) -> bool:
+    """Whether *hashed* was made with other parameters than the configured
+    ones (checked after a successful verify_password)."""
+    parsed = _parse(hashed)
+    return parsed is None or parsed[:2] != (
+        PASSWORD_HASH_DIGEST,
+        PASSWORD_HASH_ITERATIONS,
+    )
+
+
+# ── Process pool ────────────────────────────────────────────────────────────
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_pending = 0
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that runs threads (history writer,
+            # exporters) could copy their held locks into the workers
+            _pool = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+async def _run(fn, *args):
+    global _pending
+    with _pool_lock:
+        if _pending >= PASSWORD_HASH_QUEUE:
+            raise PasswordHashBusy
+        _pending += 1
+    try:
+        if PASSWORD_HASH_WORKERS > 0:
+            try:
+                return await asyncio.get_running_loop().run_in_executor(
+                    _get_pool(), fn, *args
+                )
+            except BrokenProcessPool as exc:
+                # A worker died; start a new pool on the next call
+                logger.error("Password hashing pool failed, restarting: %s", exc)
+                shutdown_hash_pool()
+        return await run_in_threadpool(fn, *args)
+    finally:
+        with _pool_lock:
+            _pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password in the hashing pool."""
+    # Parameters are passed along: the workers' settings may be stale
+    return await _run(
+        _hash,
+        password,
+        secrets.token_hex(16),
+        PASSWORD_HASH_DIGEST,
+        PASSWORD_HASH_ITERATIONS,
+    )
+
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    """verify_password in the hashing pool."""
+    return await _run(verify_password, password, hashed)
+
+
+def shutdown_hash_pool() -> None:
+    """Stop the hashing processes (started again on the next hash)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
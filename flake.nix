@@ -21,6 +21,13 @@
         cryptography
         google-auth
         python-multipart
+        numpy
+        duckdb
+        psycopg2
+        aiosqlite
+        asyncpg
+        zstandard
+        pillow
       ];
     in
     {
@@ -8,16 +8,40 @@ import Sidebar from './Sidebar';
 import Stepper from './Stepper';
 
 const API_BASE = import.meta.env.VITE_API_BASE || 'http://localhost:8000';
+const HISTORY_PAGE_SIZE = 50;
+
+// History lists are newest first: by date_time, then id
+const isOlder = (a, b) => a.date_time < b.date_time || (a.date_time === b.date_time && a.id < b.id);
+
+const insertByRecency = (items, question) => {
+    const index = items.findIndex((q) => isOlder(q, question));
+    return index === -1 ? [...items, question] : [...items.slice(0, index), question, ...items.slice(index)];
+};
+
+// One page of question history, optionally of one folder
+const fetchHistoryPage = async ({ cursor = null, folderId = null } = {}) => {
+    const params = new URLSearchParams({ limit: HISTORY_PAGE_SIZE });
+    if (cursor) params.set('cursor', cursor);
+    if (folderId !== null) params.set('folder_id', folderId);
+    const res = await authFetch(`${API_BASE}/questions/history?${params}`);
+    if (!res.ok) throw new Error('Failed to load history');
+    return res.json();
+};
 
 function MainScreen() {
     const [history, setHistory] = useState([]);
+    const [historyCursor, setHistoryCursor] = useState(null);
     const [folders, setFolders] = useState([]);
+    // Contents of the folders opened in the sidebar: { [folderId]: { items, cursor } }
+    const [folderContents, setFolderContents] = useState({});
     const [selectedQuestion, setSelectedQuestion] = useState(null);
     const [loading, setLoading] = useState(false);
     const [metadataLoading, setMetadataLoading] = useState(false);
     const [metadata, setMetadata] = useState(null);
     const [executionResult, setExecutionResult] = useState(null);
     const [error, setError] = useState(null);
+    // A liked answer to a near-duplicate question, offered instead of a new run
+    const [similarOffer, setSimilarOffer] = useState(null);
     const [anonymousMode, setAnonymousMode] = useState(false);
     const [profileOpen, setProfileOpen] = useState(false);
     const [aboutOpen, setAboutOpen] = useState(false);
@@ -52,21 +76,78 @@ function MainScreen() {
             .catch(() => { /* keep localStorage version */ });
     }, []);
 
-    // Fetch question history on mount
+    // Fetch the first page of question history (newest first, no answer bodies)
     const fetchHistory = useCallback(async () => {
         const user = getUser();
         if (!user?.id) return;
         try {
-            const res = await authFetch(`${API_BASE}/questions/user/${user.id}`);
-            if (res.ok) {
-                const data = await res.json();
-                setHistory(data.reverse()); // newest first
-            }
+            const data = await fetchHistoryPage();
+            setHistory(data.items);
+            setHistoryCursor(data.next_cursor);
         } catch (err) {
             console.warn('Could not load history', err);
         }
     }, []);
 
+    // Merge the newest page into the loaded history: the older pages already
+    // loaded (and the cursor after them) stay as they are
+    const refreshHistory = async () => {
+        try {
+            const data = await fetchHistoryPage();
+            const fresh = new Set(data.items.map((q) => q.id));
+            const oldest = data.items.at(-1);
+            setHistory((prev) => [
+                ...data.items,
+                ...prev.filter((q) => !fresh.has(q.id) && oldest && isOlder(q, oldest)),
+            ]);
+        } catch (err) {
+            console.warn('Could not refresh history', err);
+        }
+    };
+
+    // Append the next page of question history
+    const loadMoreHistory = async () => {
+        if (!historyCursor) return;
+        try {
+            const data = await fetchHistoryPage({ cursor: historyCursor });
+            setHistory((prev) => [...prev, ...data.items]);
+            setHistoryCursor(data.next_cursor);
+        } catch (err) {
+            console.warn('Could not load more history', err);
+        }
+    };
+
+    // Load a folder's questions when it is opened (first page), or its next page
+    const loadFolder = async (folderId, more = false) => {
+        const loaded = folderContents[folderId];
+        if (loaded && !more) return;
+        if (more && !loaded?.cursor) return;
+        try {
+            const data = await fetchHistoryPage({ folderId, cursor: more ? loaded.cursor : null });
+            setFolderContents((prev) => ({
+                ...prev,
+                [folderId]: {
+                    items: more ? [...(prev[folderId]?.items || []), ...data.items] : data.items,
+                    cursor: data.next_cursor,
+                },
+            }));
+        } catch (err) {
+            console.warn('Could not load folder', err);
+        }
+    };
+
+    // Apply *update* to the items of every loaded folder
+    const updateFolderContents = (update) => {
+        setFolderContents((prev) =>
+            Object.fromEntries(
+                Object.entries(prev).map(([folderId, contents]) => [
+                    folderId,
+                    { ...contents, items: update(contents.items, Number(folderId)) },
+                ])
+            )
+        );
+    };
+
     useEffect(() => {
         fetchHistory();
     }, [fetchHistory]);
@@ -121,7 +202,9 @@ function MainScreen() {
         try {
             await deleteFolder(folderId);
             await loadFolders();
-            await fetchHistory(); // refresh questions since folder_id may have changed
+            // Its questions are unassigned, not deleted
+            setHistory((prev) => prev.map((q) => (q.folder_id === folderId ? { ...q, folder_id: null } : q)));
+            setFolderContents(({ [folderId]: _deleted, ...rest }) => rest);
         } catch (err) {
             console.warn('Could not delete folder', err);
         }
@@ -129,8 +212,20 @@ function MainScreen() {
 
     const handleMoveQuestion = async (questionId, folderId) => {
         try {
-            await moveQuestionToFolder(questionId, folderId);
-            await fetchHistory(); // refresh to reflect new folder assignment
+            const moved = await moveQuestionToFolder(questionId, folderId);
+            const summary = {
+                id: moved.id,
+                title: moved.title,
+                folder_id: moved.folder_id,
+                like: moved.like,
+                model_llm: moved.model_llm,
+                date_time: moved.date_time,
+            };
+            setHistory((prev) => prev.map((q) => (q.id === questionId ? { ...q, folder_id: folderId } : q)));
+            updateFolderContents((items, id) => {
+                const others = items.filter((q) => q.id !== questionId);
+                return id === folderId ? insertByRecency(others, summary) : others;
+            });
         } catch (err) {
             console.warn('Could not move question', err);
         }
@@ -149,7 +244,8 @@ function MainScreen() {
                     setExecutionResult(null);
                     setError(null);
                 }
-                await fetchHistory();
+                setHistory((prev) => prev.filter((q) => q.id !== questionId));
+                updateFolderContents((items) => items.filter((q) => q.id !== questionId));
             }
         } catch (err) {
             console.warn('Could not delete question', err);
@@ -190,9 +286,11 @@ function MainScreen() {
     };
 
     // Handle stepper submission — call decision engine (Phase 2)
-    const handleSubmit = async ({ question, restrictions, metadata: metadataFromStepper, llmModel, selectedDatasets, saveToHistory = true, deepthink = false }) => {
+    const handleSubmit = async (submission) => {
+        const { question, restrictions, metadata: metadataFromStepper, llmModel, selectedDatasets, saveToHistory = true, deepthink = false, similarPolicy = 'offer' } = submission;
         setLoading(true);
         setError(null);
+        setSimilarOffer(null);
         try {
             // Build a rich prompt from stepper data
             let prompt = question;
@@ -209,6 +307,7 @@ function MainScreen() {
                     exclude_user_info: anonymousMode,
                     save_to_history: saveToHistory,
                     deepthink: deepthink,
+                    similar_policy: similarPolicy,
                 }),
             });
 
@@ -216,6 +315,13 @@ function MainScreen() {
                 const data = await res.json();
                 if (data.status === 'error') {
                     setError(data.error || 'Decision engine returned an error');
+                } else if (data.status === 'similar') {
+                    // Let the user open the earlier answer or run the question anyway
+                    setSimilarOffer({
+                        questionId: data.similar_question_id,
+                        similarity: data.similarity,
+                        submission,
+                    });
                 } else {
                     setSelectedQuestion({
                         id: data.question_id,
@@ -226,7 +332,7 @@ function MainScreen() {
                         temporary: !saveToHistory,
                     });
                     // Refresh sidebar history so the new question appears
-                    if (saveToHistory) await fetchHistory();
+                    if (saveToHistory) await refreshHistory();
                 }
             } else {
                 const err = await res.json().catch(() => ({}));
@@ -241,14 +347,40 @@ function MainScreen() {
 
     const handleNewChat = () => {
         setSelectedQuestion(null);
+        setSimilarOffer(null);
         setMetadata(null);
         setExecutionResult(null);
         setError(null);
     };
 
-    const handleSelectQuestion = (q) => {
+    const handleSelectQuestion = async (q) => {
         setSelectedQuestion(q);
         setError(null);
+        // History entries don't carry the answer body; fetch it on demand
+        if (q.answer === undefined) {
+            try {
+                const res = await authFetch(`${API_BASE}/questions/${q.id}/answer`);
+                if (res.ok) {
+                    const data = await res.json();
+                    setSelectedQuestion((current) =>
+                        current?.id === q.id ? { ...current, answer: data.answer, restrictions: data.restrictions } : current
+                    );
+                }
+            } catch (err) {
+                console.warn('Could not load answer', err);
+            }
+        }
+    };
+
+    const handleOpenSimilar = () => {
+        const { questionId, submission } = similarOffer;
+        setSimilarOffer(null);
+        const known = history.find((q) => q.id === questionId);
+        handleSelectQuestion(known ? { ...known } : { id: questionId, title: submission.question, like: true });
+    };
+
+    const handleAskAnyway = () => {
+        handleSubmit({ ...similarOffer.submission, similarPolicy: 'off' });
     };
 
     const renderContent = () => {
@@ -263,7 +395,9 @@ function MainScreen() {
                     temporary={selectedQuestion.temporary}
                     onLikeChange={(newLike) => {
                         setSelectedQuestion(prev => ({ ...prev, like: newLike }));
-                        setHistory(prev => prev.map(q => q.id === selectedQuestion.id ? { ...q, like: newLike } : q));
+                        const withLike = (items) => items.map(q => q.id === selectedQuestion.id ? { ...q, like: newLike } : q);
+                        setHistory(withLike);
+                        updateFolderContents(withLike);
                     }}
                 />
             );
@@ -300,6 +434,28 @@ function MainScreen() {
                         {error}
                     </div>
                 )}
+                {similarOffer && (
+                    <div className="max-w-2xl mx-auto mb-4 px-4 py-3 rounded-lg bg-[#f47721]/10 border border-[#f47721] text-sm text-gray-200 flex items-center justify-between gap-4">
+                        <span>
+                            You liked the answer to a very similar question
+                            {similarOffer.similarity != null && ` (${Math.round(similarOffer.similarity * 100)}% match)`}.
+                        </span>
+                        <div className="flex gap-2 shrink-0">
+                            <button
+                                onClick={handleOpenSimilar}
+                                className="px-3 py-1.5 rounded-lg text-xs font-medium bg-[#f47721] text-white hover:bg-[#d9661a] transition-colors"
+                            >
+                                Open that answer
+                            </button>
+                            <button
+                                onClick={handleAskAnyway}
+                                className="px-3 py-1.5 rounded-lg text-xs font-medium border border-[#444] text-gray-300 hover:text-white hover:border-[#666] transition-colors"
+                            >
+                                Ask anyway
+                            </button>
+                        </div>
+                    </div>
+                )}
                 <Stepper
                     onSubmit={handleSubmit}
                     onFetchMetadata={handleFetchMetadata}
@@ -318,7 +474,12 @@ function MainScreen() {
             <Sidebar
                 history={history}
                 folders={folders}
+                folderContents={folderContents}
+                onOpenFolder={(folderId) => loadFolder(folderId)}
+                onLoadMoreFolder={(folderId) => loadFolder(folderId, true)}
                 onSelectQuestion={handleSelectQuestion}
+                hasMoreHistory={Boolean(historyCursor)}
+                onLoadMoreHistory={loadMoreHistory}
                 onNewChat={handleNewChat}
                 onCreateFolder={handleCreateFolder}
                 onRenameFolder={handleRenameFolder}
@@ -1,7 +1,7 @@
 import { useEffect, useRef, useState } from 'react';
 import { clearAuth } from '../utils/auth';
 
-function Sidebar({ history, folders, onSelectQuestion, onNewChat, onCreateFolder, onRenameFolder, onDeleteFolder, onMoveQuestion, onDeleteQuestion }) {
+function Sidebar({ history, folders, folderContents, onOpenFolder, onLoadMoreFolder, onSelectQuestion, hasMoreHistory, onLoadMoreHistory, onNewChat, onCreateFolder, onRenameFolder, onDeleteFolder, onMoveQuestion, onDeleteQuestion }) {
     const [collapsed, setCollapsed] = useState(false);
     const [openFolders, setOpenFolders] = useState({});
     const [creatingFolder, setCreatingFolder] = useState(false);
@@ -21,8 +21,10 @@ function Sidebar({ history, folders, onSelectQuestion, onNewChat, onCreateFolder
         globalThis.location.href = '/login';
     };
 
-    // Toggle folder open/close
+    // Toggle folder open/close; a folder's questions are loaded when it is
+    // first opened (history pages only hold the newest questions)
     const toggleFolder = (folderId) => {
+        if (!openFolders[folderId]) onOpenFolder(folderId);
         setOpenFolders((prev) => ({ ...prev, [folderId]: !prev[folderId] }));
     };
 
@@ -46,17 +48,8 @@ function Sidebar({ history, folders, onSelectQuestion, onNewChat, onCreateFolder
         return () => document.removeEventListener('mousedown', handleClick);
     }, [contextMenu]);
 
-    // Categorize questions
-    const questionsByFolder = {};
-    const unfiledQuestions = [];
-    for (const q of history) {
-        if (q.folder_id) {
-            if (!questionsByFolder[q.folder_id]) questionsByFolder[q.folder_id] = [];
-            questionsByFolder[q.folder_id].push(q);
-        } else {
-            unfiledQuestions.push(q);
-        }
-    }
+    // Folders list their own loaded contents; Recent the loaded unfiled questions
+    const unfiledQuestions = history.filter((q) => !q.folder_id);
 
     // Create folder handler
     const handleCreateFolder = () => {
@@ -203,8 +196,9 @@ function Sidebar({ history, folders, onSelectQuestion, onNewChat, onCreateFolder
                     <>
                         {/* Render folders */}
                         {folders.map((folder) => {
-                            const isOpen = openFolders[folder.id] !== false; // default open
-                            const folderQuestions = questionsByFolder[folder.id] || [];
+                            const isOpen = Boolean(openFolders[folder.id]);
+                            const contents = folderContents[folder.id];
+                            const folderQuestions = contents?.items || [];
                             const isDragOver = dropTarget === folder.id;
 
                             return (
@@ -251,9 +245,11 @@ function Sidebar({ history, folders, onSelectQuestion, onNewChat, onCreateFolder
                                             </span>
                                         )}
 
-                                        <span className="text-xs text-gray-500 mr-1">
-                                            {folderQuestions.length}
-                                        </span>
+                                        {contents && (
+                                            <span className="text-xs text-gray-500 mr-1">
+                                                {folderQuestions.length}{contents.cursor ? '+' : ''}
+                                            </span>
+                                        )}
 
                                         {/* Action buttons (visible on hover) */}
                                         <div className="hidden group-hover:flex items-center gap-0.5">
@@ -288,7 +284,7 @@ function Sidebar({ history, folders, onSelectQuestion, onNewChat, onCreateFolder
                                     {/* Folder contents */}
                                     {isOpen && (
                                         <div className="ml-4 border-l border-[#333] pl-1">
-                                            {folderQuestions.length === 0 && (
+                                            {contents && folderQuestions.length === 0 && (
                                                 <p className="text-xs text-gray-600 px-2 py-1 italic">
                                                     Drag questions here
                                                 </p>
@@ -322,6 +318,14 @@ function Sidebar({ history, folders, onSelectQuestion, onNewChat, onCreateFolder
                                                     </button>
                                                 </div>
                                             ))}
+                                            {contents?.cursor && (
+                                                <button
+                                                    onClick={() => onLoadMoreFolder(folder.id)}
+                                                    className="w-full text-xs text-gray-500 hover:text-white px-3 py-1 text-left transition-colors"
+                                                >
+                                                    Load older questions
+                                                </button>
+                                            )}
                                         </div>
                                     )}
                                 </div>
@@ -383,6 +387,15 @@ function Sidebar({ history, folders, onSelectQuestion, onNewChat, onCreateFolder
                                 </div>
                             </div>
                         )}
+
+                        {hasMoreHistory && (
+                            <button
+                                onClick={onLoadMoreHistory}
+                                className="w-full text-xs text-gray-400 hover:text-white px-2 py-2 text-center transition-colors"
+                            >
+                                Load older questions
+                            </button>
+                        )}
                     </>
                 )}
             </nav>
@@ -425,7 +438,10 @@ function Sidebar({ history, folders, onSelectQuestion, onNewChat, onCreateFolder
                         </>
                     )}
                     {contextMenu.type === 'question' && (() => {
-                        const contextQuestion = history.find((q) => q.id === contextMenu.id);
+                        const contextQuestion = [
+                            ...history,
+                            ...Object.values(folderContents).flatMap((contents) => contents.items),
+                        ].find((q) => q.id === contextMenu.id);
                         const isInFolder = contextQuestion?.folder_id != null;
                         return (
                             <>